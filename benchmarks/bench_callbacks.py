@@ -0,0 +1,53 @@
+"""
+Benchmark of how many rows/second collect_data can hand to user code,
+comparing a per-row callback_function, run by each kind of callback
+executor, with a block_callback called once per packet.
+
+Run with the package installed:
+
+    python benchmarks/bench_callbacks.py
+"""
+import time
+
+import fakeljm
+from labjackcontroller.labtools import LabjackReader
+
+NUM_CHANNELS = 4
+FREQUENCY = 10000
+SCANS_PER_READ = 1000
+
+
+def row_callback(row):
+    return row[0]
+
+
+class BlockCounter(object):
+    def __init__(self):
+        self.rows = 0
+
+    def __call__(self, block, start_row, device_time, host_time):
+        self.rows += len(block)
+
+
+def bench(seconds, **kwargs) -> float:
+    reader = LabjackReader("T7")
+    channels = ["AIN%d" % i for i in range(NUM_CHANNELS)]
+    start = time.perf_counter()
+    reader.collect_data(channels, [10.0] * NUM_CHANNELS, seconds, FREQUENCY,
+                        scans_per_read=SCANS_PER_READ, resolution=1,
+                        **kwargs)
+    return reader.max_row / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    fakeljm.install()
+
+    counter = BlockCounter()
+    print("%d channels, %d scans/packet" % (NUM_CHANNELS, SCANS_PER_READ))
+    for executor in ["process", "thread", "inline"]:
+        print("callback_function (%s): %9.0f rows/second"
+              % (executor, bench(100, callback_function=row_callback,
+                                 callback_executor=executor)))
+    print("block_callback:    %19.0f rows/second"
+          % bench(100, block_callback=counter))
+    assert counter.rows == 100 * FREQUENCY
@@ -0,0 +1,65 @@
+"""
+Benchmark of keeping a CSV of a run up to date as it grows: rewriting the
+whole run with DataFrame.to_csv at every update, as phoStreamLabjackToCSV
+used to, against appending only the new rows with CSVWriter, and reading
+them back with pd.read_csv against CSVTailReader.
+
+Run with the package installed:
+
+    python benchmarks/bench_csv.py
+"""
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from labjackcontroller.sinks import CSVWriter
+from labjackcontroller.tail import CSVTailReader
+
+NUM_CHANNELS = 8
+ROWS_PER_UPDATE = 2500
+NUM_UPDATES = 40
+COLUMNS = ["AIN%d" % i for i in range(NUM_CHANNELS)] + ["Time",
+                                                        "System Time"]
+
+
+def bench_rewrite(path: str, block: np.ndarray) -> float:
+    start = time.perf_counter()
+    rows = []
+    for _ in range(NUM_UPDATES):
+        rows.append(block)
+        pd.DataFrame(np.concatenate(rows), columns=COLUMNS) \
+            .to_csv(path, index=False)
+        pd.read_csv(path)
+    return NUM_UPDATES * len(block) / (time.perf_counter() - start)
+
+
+def bench_append(path: str, block: np.ndarray) -> float:
+    writer = CSVWriter(path, thresholds={"AIN0": 2.5},
+                       chunk_rows=ROWS_PER_UPDATE)
+    writer.open({"columns": COLUMNS})
+    tail = CSVTailReader(path)
+
+    start = time.perf_counter()
+    for i in range(NUM_UPDATES):
+        writer.write_block(block, i * len(block))
+        # Wait for the background thread, to time the whole round trip.
+        while tail.rows_read < (i + 1) * len(block):
+            tail.read()
+    elapsed = time.perf_counter() - start
+    writer.close()
+    return NUM_UPDATES * len(block) / elapsed
+
+
+if __name__ == "__main__":
+    block = np.random.uniform(-10, 10, (ROWS_PER_UPDATE, len(COLUMNS)))
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "run.csv")
+        print("%d columns, %d rows per update, %d updates"
+              % (len(COLUMNS), ROWS_PER_UPDATE, NUM_UPDATES))
+        print("Rewrite and re-read: %12.0f rows/second"
+              % bench_rewrite(path, block))
+        print("Append and tail:     %12.0f rows/second"
+              % bench_append(path, block))
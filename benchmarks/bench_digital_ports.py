@@ -0,0 +1,56 @@
+"""
+Benchmark of streaming digital lines as port state registers rather than
+one stream address per line: the bytes each scan costs, the scan rate
+calculate_max_speed allows, and how fast collect_data can unpack the
+registers back into lines.
+
+Run with the package installed:
+
+    python benchmarks/bench_digital_ports.py
+"""
+import time
+
+import fakeljm
+from labjackcontroller.labtools import LabjackReader, calculate_max_speed, \
+    merge_digital_lines
+
+# Each stream address is one 16-bit sample per scan on the wire, which
+# LJM hands to the host as a float64.
+WIRE_BYTES = 2
+HOST_BYTES = 8
+
+CONFIGURATIONS = [
+    ["AIN0"] + ["FIO%d" % i for i in range(4)],
+    ["AIN0", "AIN1"] + ["EIO%d" % i for i in range(8)],
+    ["AIN0"] + ["FIO%d" % i for i in range(8)]
+    + ["EIO%d" % i for i in range(8)],
+    ["DIO%d" % i for i in range(23)],
+]
+
+
+def bench_collect_data(channels, digital_ports) -> float:
+    reader = LabjackReader("T7")
+    start = time.perf_counter()
+    reader.collect_data(channels, [10.0], 2, 100000, scans_per_read=10000,
+                        resolution=1, digital_ports=digital_ports)
+    elapsed = time.perf_counter() - start
+    return reader.max_row / elapsed
+
+
+if __name__ == "__main__":
+    fakeljm.install()
+
+    print("%-28s %9s %11s %11s %13s %16s"
+          % ("Channels", "Addresses", "Wire B/scan", "Host B/scan",
+             "Max rate (Hz)", "Ingest (scans/s)"))
+    for channels in CONFIGURATIONS:
+        label = "%s..%s (%d)" % (channels[0], channels[-1], len(channels))
+        for digital_ports in [None, "unpacked"]:
+            scan_list = channels if digital_ports is None \
+                else merge_digital_lines(channels)[0]
+            print("%-28s %9d %11d %11d %13.0f %16.0f"
+                  % (label if digital_ports is None else "  as port states",
+                     len(scan_list), WIRE_BYTES * len(scan_list),
+                     HOST_BYTES * len(scan_list),
+                     calculate_max_speed("T7", len(scan_list), 10, 1),
+                     bench_collect_data(channels, digital_ports)))
@@ -0,0 +1,63 @@
+"""
+Benchmark of the EnvelopePyramid collect_data keeps with envelope=True: what
+it costs per packet to maintain, and how long a query takes as the run
+grows, against computing the same envelope from the recorded rows.
+
+Run with the package installed:
+
+    python benchmarks/bench_envelope.py
+"""
+import time
+
+import numpy as np
+
+from labjackcontroller.storage import EnvelopePyramid
+
+NUM_CHANNELS = 8
+FREQUENCY = 100000
+SCANS_PER_READ = 50000
+MAX_POINTS = 2000
+RUN_PACKETS = [20, 200, 2000]
+
+
+def bench_add(packet: np.ndarray, num_packets: int) -> float:
+    pyramid = EnvelopePyramid(NUM_CHANNELS, FREQUENCY)
+    start = time.perf_counter()
+    for _ in range(num_packets):
+        pyramid.add(packet)
+    return num_packets * len(packet) / (time.perf_counter() - start)
+
+
+def bench_query(pyramid: EnvelopePyramid, repeats=100) -> float:
+    end_time = pyramid.rows_added / FREQUENCY
+    start = time.perf_counter()
+    for _ in range(repeats):
+        pyramid.query(0, 0, end_time, MAX_POINTS)
+    return (time.perf_counter() - start) / repeats
+
+
+def bench_raw(data: np.ndarray) -> float:
+    start = time.perf_counter()
+    num_bins = len(data) // MAX_POINTS
+    bins = data[:num_bins * MAX_POINTS, 0].reshape(MAX_POINTS, num_bins)
+    bins.min(axis=1), bins.max(axis=1), bins.mean(axis=1)
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    packet = np.random.uniform(-10, 10, (SCANS_PER_READ, NUM_CHANNELS))
+
+    print("%d channels, %d scans/packet" % (NUM_CHANNELS, SCANS_PER_READ))
+    print("Pyramid upkeep:  %14.0f scans/second" % bench_add(packet, 40))
+    print("%12s %18s %18s" % ("Run scans", "Query (ms)", "From rows (ms)"))
+    for num_packets in RUN_PACKETS:
+        pyramid = EnvelopePyramid(NUM_CHANNELS, FREQUENCY)
+        for _ in range(num_packets):
+            pyramid.add(packet)
+        # Only the first channel is summarised from rows, and the rows of
+        # the longest run would not fit in memory, so repeat the packet.
+        raw = np.tile(packet, (min(num_packets, 200), 1))
+        print("%12d %18.3f %18.3f"
+              % (pyramid.rows_added, bench_query(pyramid) * 1000,
+                 bench_raw(raw) * 1000 * num_packets / min(num_packets,
+                                                           200)))
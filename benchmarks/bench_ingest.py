@@ -0,0 +1,100 @@
+"""
+Benchmark of how many scans/second LabjackReader can move from stream packets
+into its storage, comparing the per-row loop collect_data used to run against
+the block ingest path.
+
+Run with the package installed:
+
+    python benchmarks/bench_ingest.py
+"""
+import ctypes
+import time
+
+import numpy as np
+
+import fakeljm
+from labjackcontroller.labtools import LabjackReader, _time_func
+from labjackcontroller.storage import SampleBuffer
+
+NUM_CHANNELS = 8
+FREQUENCY = 100000
+SCANS_PER_READ = 50000
+NUM_PACKETS = 40
+
+
+def legacy_ingest(data_arr, max_index, curr_data, packet_num, start):
+    """
+    The loop collect_data ran per packet before block ingestion.
+    """
+    step_size = NUM_CHANNELS
+    size = len(data_arr)
+    for i in range(0, len(curr_data), step_size):
+        if max_index >= size:
+            break
+
+        curr_time = (SCANS_PER_READ / FREQUENCY) \
+            * (packet_num + (i / len(curr_data)))
+
+        data_arr[max_index: max_index + step_size] = \
+            curr_data[i:i + step_size]
+        max_index += step_size
+
+        data_arr[max_index] = curr_time
+        max_index += 1
+        data_arr[max_index] = _time_func() - start
+        max_index += 1
+    return max_index
+
+
+def bench_legacy(packet) -> float:
+    size = NUM_PACKETS * SCANS_PER_READ * (NUM_CHANNELS + 2)
+    data_arr = (ctypes.c_double * size)()
+    max_index = 0
+
+    start = _time_func()
+    for packet_num in range(NUM_PACKETS):
+        max_index = legacy_ingest(data_arr, max_index, packet, packet_num,
+                                  start)
+    return NUM_PACKETS * SCANS_PER_READ / (_time_func() - start)
+
+
+def bench_block(packet) -> float:
+    reader = LabjackReader("T7")
+    reader._storage = SampleBuffer(NUM_PACKETS * SCANS_PER_READ,
+                                   NUM_CHANNELS + 2)
+    reader._scan_width = NUM_CHANNELS
+    reader._scan_times = np.arange(SCANS_PER_READ) / FREQUENCY
+    reader._packet_times = np.empty(SCANS_PER_READ)
+
+    start = _time_func()
+    for packet_num in range(NUM_PACKETS):
+        scans, device_time = reader._packet_block(packet, packet_num,
+                                                  SCANS_PER_READ / FREQUENCY)
+        reader._store_block(scans, device_time, _time_func() - start)
+    return NUM_PACKETS * SCANS_PER_READ / (_time_func() - start)
+
+
+def bench_collect_data() -> float:
+    reader = LabjackReader("T7")
+    channels = ["AIN%d" % i for i in range(NUM_CHANNELS)]
+    seconds = 2
+    start = time.perf_counter()
+    reader.collect_data(channels, [1.0] * NUM_CHANNELS, seconds, FREQUENCY,
+                        scans_per_read=SCANS_PER_READ, resolution=1)
+    elapsed = time.perf_counter() - start
+    return reader.max_row / elapsed
+
+
+if __name__ == "__main__":
+    fakeljm.install()
+
+    packet = (ctypes.c_double * (SCANS_PER_READ * NUM_CHANNELS))()
+    np.ctypeslib.as_array(packet)[:] = np.random.uniform(-10, 10,
+                                                         len(packet))
+
+    print("%d channels, %d scans/packet" % (NUM_CHANNELS, SCANS_PER_READ))
+    print("Per-row loop:   %14.0f scans/second" % bench_legacy(packet))
+    print("Block ingest:   %14.0f scans/second"
+          % bench_block(np.ctypeslib.as_array(packet)))
+    print("collect_data:   %14.0f scans/second (fake device)"
+          % bench_collect_data())
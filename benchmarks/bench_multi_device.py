@@ -0,0 +1,58 @@
+"""
+Benchmark of the aggregate scans/second MultiLabjackReader records as the
+number of devices grows, against reading the same devices one after another.
+
+Each fake device blocks for READ_DELAY seconds per packet, like a device
+pacing its stream, so the devices only keep up with each other if they are
+read in parallel.
+
+Run with the package installed:
+
+    python benchmarks/bench_multi_device.py
+"""
+import time
+
+import fakeljm
+from labjackcontroller.labtools import LabjackReader, MultiLabjackReader
+
+NUM_CHANNELS = 4
+FREQUENCY = 10000
+SCANS_PER_READ = 1000
+READ_DELAY = 0.01
+SECONDS = 1.0
+DEVICE_COUNTS = [1, 2, 4, 8, 16]
+
+
+def bench_sequential(num_devices: int) -> float:
+    channels = ["AIN%d" % i for i in range(NUM_CHANNELS)]
+    readers = [LabjackReader("T7") for _ in range(num_devices)]
+    start = time.perf_counter()
+    for reader in readers:
+        reader.collect_data(channels, [1.0] * NUM_CHANNELS, SECONDS,
+                            FREQUENCY, scans_per_read=SCANS_PER_READ)
+    elapsed = time.perf_counter() - start
+    return sum(reader.max_row for reader in readers) / elapsed
+
+
+def bench_multi(num_devices: int) -> float:
+    channels = ["AIN%d" % i for i in range(NUM_CHANNELS)]
+    multi = MultiLabjackReader(["T7"] * num_devices)
+    start = time.perf_counter()
+    multi.collect_data(channels, [1.0] * NUM_CHANNELS, SECONDS, FREQUENCY,
+                       scans_per_read=SCANS_PER_READ)
+    elapsed = time.perf_counter() - start
+    multi.to_array()
+    return sum(reader.max_row for reader in multi.readers) / elapsed
+
+
+if __name__ == "__main__":
+    fakeljm.install(read_delay=READ_DELAY)
+
+    print("%d channels, %d scans/packet, %.0f ms/packet per device"
+          % (NUM_CHANNELS, SCANS_PER_READ, READ_DELAY * 1000))
+    print("%8s %20s %20s" % ("Devices", "Sequential scans/s",
+                             "Multi scans/s"))
+    for num_devices in DEVICE_COUNTS:
+        print("%8d %20.0f %20.0f" % (num_devices,
+                                     bench_sequential(num_devices),
+                                     bench_multi(num_devices)))
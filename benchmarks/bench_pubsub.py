@@ -0,0 +1,79 @@
+"""
+Benchmark of what publishing a stream costs the thread reading it, as the
+number of subscribers grows, and with one subscriber that never reads.
+Blocks are published every BLOCK_INTERVAL seconds, a stream of 1 million
+scans/second, and the share of rows the subscribers that do read received
+is reported too.
+
+Run with the package installed:
+
+    python benchmarks/bench_pubsub.py
+"""
+import os
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from labjackcontroller.pubsub import Publisher, Subscriber
+
+NUM_CHANNELS = 8
+SCANS_PER_READ = 10000
+NUM_BLOCKS = 200
+BLOCK_INTERVAL = 0.01
+SUBSCRIBER_COUNTS = [0, 1, 4]
+METADATA = {"channels": ["AIN%d" % i for i in range(NUM_CHANNELS)],
+            "columns": ["AIN%d" % i for i in range(NUM_CHANNELS)]
+            + ["Time", "System Time"],
+            "scan_rate": 100000.0}
+
+
+def drain(subscriber: Subscriber, counts: list) -> None:
+    for block in subscriber:
+        counts.append(len(block.rows))
+
+
+def bench(address: str, num_subscribers: int, stalled: bool) -> tuple:
+    block = np.random.uniform(-10, 10, (SCANS_PER_READ, NUM_CHANNELS + 2))
+    with Publisher(address) as publisher:
+        subscribers = [Subscriber(address) for _ in range(num_subscribers)]
+        if stalled:
+            subscribers.append(Subscriber(address))
+        while publisher.num_subscribers < len(subscribers):
+            time.sleep(0.001)
+
+        counts = [[] for _ in range(num_subscribers)]
+        threads = [threading.Thread(target=drain, args=(subscriber, count))
+                   for subscriber, count in zip(subscribers, counts)]
+        for thread in threads:
+            thread.start()
+
+        publisher.open(METADATA)
+        start = time.perf_counter()
+        elapsed = 0.0
+        for i in range(NUM_BLOCKS):
+            time.sleep(max(0.0, start + i * BLOCK_INTERVAL
+                           - time.perf_counter()))
+            write_start = time.perf_counter()
+            publisher.write_block(block, i * SCANS_PER_READ)
+            elapsed += time.perf_counter() - write_start
+        publisher.close()
+        for thread in threads:
+            thread.join()
+
+    received = min((sum(count) for count in counts), default=0)
+    return 1000 * elapsed / NUM_BLOCKS, received / (NUM_BLOCKS
+                                                    * SCANS_PER_READ)
+
+
+if __name__ == "__main__":
+    address = "unix:" + os.path.join(tempfile.mkdtemp(), "bench.sock")
+    print("%d channels, %d scans/block" % (NUM_CHANNELS, SCANS_PER_READ))
+    for stalled in (False, True):
+        for num_subscribers in SUBSCRIBER_COUNTS:
+            cost, received = bench(address, num_subscribers, stalled)
+            print("%d subscribers%s: %6.3f ms/block published,"
+                  " %3.0f%% of rows received"
+                  % (num_subscribers, " + 1 stalled" if stalled else "",
+                     cost, 100 * received))
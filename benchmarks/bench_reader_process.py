@@ -0,0 +1,71 @@
+"""
+Benchmark of how far reading falls behind a stream while the rest of the
+program is busy with pure Python work, recording on a thread of the same
+process against recording with a ReaderProcess.
+
+Each fake packet takes READ_DELAY seconds to arrive, like a device pacing
+its stream, but the fake device only starts timing a packet once the last
+one is read. The time taken to read SECONDS of packets, beyond SECONDS, is
+how far behind a real device's stream reading would have fallen, as scans
+waiting in its buffer.
+
+Run with the package installed:
+
+    python benchmarks/bench_reader_process.py
+"""
+import threading
+import time
+
+import fakeljm
+from labjackcontroller.labtools import LabjackReader
+from labjackcontroller.process import ReaderProcess
+
+FREQUENCY = 10000
+SCANS_PER_READ = 100
+READ_DELAY = SCANS_PER_READ / FREQUENCY
+SECONDS = 3
+
+
+def busy(until: float) -> None:
+    """
+    Hold the GIL as analysis or plotting code would.
+    """
+    while time.perf_counter() < until:
+        sum(i * i for i in range(20000))
+
+
+def bench_thread() -> float:
+    reader = LabjackReader("T7")
+    result = []
+
+    def run() -> None:
+        result.extend(reader.collect_data(["AIN0"], [10.0], SECONDS,
+                                          FREQUENCY,
+                                          scans_per_read=SCANS_PER_READ))
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    busy(time.perf_counter() + SECONDS)
+    thread.join()
+    return result[0] - SECONDS
+
+
+def bench_process() -> float:
+    # Fork, so the child uses the fake library too.
+    process = ReaderProcess("T7", start_method="fork")
+    process.start(["AIN0"], [10.0], FREQUENCY, seconds=SECONDS,
+                  scans_per_read=SCANS_PER_READ)
+    busy(time.perf_counter() + SECONDS)
+    process.wait()
+    return process.status()["total_time"] - SECONDS
+
+
+if __name__ == "__main__":
+    fakeljm.install(read_delay=READ_DELAY)
+
+    print("Packets every %.0f ms, parent busy in Python"
+          % (1000 * READ_DELAY))
+    print("Thread:        %8.0f ms behind after %d s"
+          % (1000 * bench_thread(), SECONDS))
+    print("ReaderProcess: %8.0f ms behind after %d s"
+          % (1000 * bench_process(), SECONDS))
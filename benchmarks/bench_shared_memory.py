@@ -0,0 +1,49 @@
+"""
+Benchmark of reading a run from another process: calling to_dataframe on a
+LabjackReader shared through a multiprocessing BaseManager, as the demos
+used to, which pickles the whole run through a socket, against attaching to
+the run's shared memory with LabjackReader.attach.
+
+Run with the package installed:
+
+    python benchmarks/bench_shared_memory.py
+"""
+import time
+from multiprocessing.managers import BaseManager
+
+import fakeljm
+from labjackcontroller.labtools import LabjackReader
+
+NUM_CHANNELS = 8
+FREQUENCY = 100000
+SECONDS = 2
+NUM_READS = 10
+STORAGE = "shm:bench_shared_memory"
+
+
+def bench(read) -> float:
+    start = time.perf_counter()
+    for _ in range(NUM_READS):
+        frame = read()
+    assert len(frame) == FREQUENCY * SECONDS
+    return (time.perf_counter() - start) / NUM_READS
+
+
+if __name__ == "__main__":
+    fakeljm.install()
+    BaseManager.register("LabjackReader", LabjackReader)
+
+    with BaseManager() as manager:
+        # The manager's process records into shared memory, so the run can
+        # be read both through the proxy and by attaching.
+        shared = manager.LabjackReader("T7")
+        shared.collect_data(["AIN%d" % i for i in range(NUM_CHANNELS)],
+                            [10.0] * NUM_CHANNELS, SECONDS, FREQUENCY,
+                            scans_per_read=FREQUENCY // 10, storage=STORAGE)
+        attached = LabjackReader.attach(STORAGE)
+
+        print("%d channels, %d rows" % (NUM_CHANNELS, FREQUENCY * SECONDS))
+        print("BaseManager proxy: %10.2f ms/read"
+              % (1000 * bench(shared.to_dataframe)))
+        print("Shared memory:     %10.2f ms/read"
+              % (1000 * bench(attached.to_dataframe)))
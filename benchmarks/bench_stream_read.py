@@ -0,0 +1,60 @@
+"""
+Microbenchmark of LJMLibrary.stream_read against a stand-in LJM library,
+comparing the reusable double buffers it reads into with allocating a new
+ctypes array (and backlog integers) on every read, as it used to.
+
+Run with the package installed:
+
+    python benchmarks/bench_stream_read.py
+"""
+import ctypes
+import time
+
+import fakeljm
+from labjackcontroller.labtools import LJMLibrary
+
+NUM_CHANNELS = 8
+NUM_READS = 200000
+
+
+def legacy_stream_read(library, handle, packet_size):
+    """
+    The body of stream_read before buffers were reused between reads.
+    """
+    packet_data = (ctypes.c_double * packet_size)()
+    dev_buffer_backlog = ctypes.c_int32(0)
+    ljm_buffer_backlog = ctypes.c_int32(0)
+
+    library.staticlib.LJM_eStreamRead(handle,
+                                      ctypes.byref(packet_data),
+                                      ctypes.byref(dev_buffer_backlog),
+                                      ctypes.byref(ljm_buffer_backlog))
+    return packet_data, dev_buffer_backlog.value, ljm_buffer_backlog.value
+
+
+def reads_per_second(read) -> float:
+    start = time.perf_counter()
+    for _ in range(NUM_READS):
+        read()
+    return NUM_READS / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    fakeljm.install()
+    library = LJMLibrary()
+    handle = library.connection_open("T7", "ANY", "ANY")
+
+    for scans_per_read in [1, 16, 256]:
+        packet_size = scans_per_read * NUM_CHANNELS
+        library.stream_start(handle, ["AIN%d" % i
+                                      for i in range(NUM_CHANNELS)],
+                             1000, scans_per_read)
+
+        legacy = reads_per_second(lambda: legacy_stream_read(library, handle,
+                                                             packet_size))
+        reused = reads_per_second(lambda: library.stream_read(handle))
+        print("%4d scans/read: allocating %10.0f reads/s,"
+              " reused buffers %10.0f reads/s"
+              % (scans_per_read, legacy, reused))
+
+        library.stream_stop(handle)
@@ -0,0 +1,139 @@
+"""
+A stand-in for the LJM C library, used to benchmark labjackcontroller without
+a LabJack device or the LJM library installed.
+
+Calling `install` swaps the staticlib of the LJMLibrary singleton for a
+FakeStaticLib, whose stream produces packets as fast as they are asked for.
+"""
+import ctypes
+import time
+
+import numpy as np
+from labjack.ljm import constants as ljm_constants, \
+    errorcodes as ljm_errorcodes
+
+from labjackcontroller.labtools import LJMLibrary, Singleton
+
+
+class FakeStaticLib(object):
+    """
+    Implements the subset of LJM functions labjackcontroller calls.
+
+    Parameters
+    ----------
+    read_delay : float, optional
+        Seconds each LJM_eStreamRead blocks for, emulating a device that
+        paces the stream. Sleeping releases the GIL, like the real library.
+    trigger_delay : float, optional
+        Seconds after a triggered stream starts before its trigger comes.
+    """
+
+    def __init__(self, read_delay=0.0, trigger_delay=0.0):
+        self.read_delay = read_delay
+        self.trigger_delay = trigger_delay
+        self.num_reads = 0
+        self.library_config = {}
+        self._next_handle = 1
+        self._streams = {}
+        self._templates = {}
+        self._triggers = {}
+
+    def LJM_OpenS(self, device_type, connection_type, identifier, handle):
+        handle._obj.value = self._next_handle
+        self._next_handle += 1
+        return ljm_errorcodes.NOERROR
+
+    def LJM_Close(self, handle):
+        return ljm_errorcodes.NOERROR
+
+    def LJM_CloseAll(self):
+        return ljm_errorcodes.NOERROR
+
+    def LJM_GetHandleInfo(self, handle, device_type, connection_type,
+                          serial_num, ipv4_address, port, max_packet_size):
+        device_type._obj.value = 7
+        connection_type._obj.value = 1
+        serial_num._obj.value = 470000000 + handle
+        max_packet_size._obj.value = 64
+        return ljm_errorcodes.NOERROR
+
+    def LJM_NumberToIP(self, number, ip_str):
+        return ljm_errorcodes.NOERROR
+
+    def LJM_NamesToAddresses(self, num_frames, names, addresses, types):
+        for i, name in enumerate(names._obj):
+            addresses._obj[i] = i
+        return ljm_errorcodes.NOERROR
+
+    def LJM_WriteLibraryConfigS(self, setting, value):
+        self.library_config[setting.decode()] = value.value
+        return ljm_errorcodes.NOERROR
+
+    def LJM_eWriteName(self, handle, name, value):
+        if name == b'STREAM_TRIGGER_INDEX':
+            self._triggers[handle] = value.value
+        return ljm_errorcodes.NOERROR
+
+    def LJM_eWriteNames(self, handle, num_frames, names, values, error_addr):
+        return ljm_errorcodes.NOERROR
+
+    def LJM_eStreamStart(self, handle, scans_per_read, num_addrs, scan_list,
+                         frequency):
+        self._streams[handle] = (scans_per_read.value, num_addrs.value,
+                                 time.perf_counter())
+        return ljm_errorcodes.NOERROR
+
+    def LJM_eStreamStop(self, handle):
+        self._streams.pop(handle, None)
+        return ljm_errorcodes.NOERROR
+
+    def LJM_eStreamRead(self, handle, data, dev_backlog, ljm_backlog):
+        # Before a triggered stream's trigger, wait for it, or return no
+        # scans if LJM is set to return all or none.
+        if self._triggers.get(handle):
+            wait = self._streams[handle][2] + self.trigger_delay \
+                - time.perf_counter()
+            if wait > 0:
+                if self.library_config.get("LJM_STREAM_SCANS_RETURN") \
+                        == ljm_constants.STREAM_SCANS_RETURN_ALL_OR_NONE:
+                    return ljm_errorcodes.NO_SCANS_RETURNED
+                time.sleep(wait)
+
+        if self.read_delay:
+            time.sleep(self.read_delay)
+
+        # Copy in pre-generated samples so that producing a packet costs
+        # about as little as receiving one from the real library does.
+        data = data._obj
+        template = self._templates.get(len(data))
+        if template is None:
+            template = np.random.uniform(-10, 10, len(data))
+            self._templates[len(data)] = template
+        ctypes.memmove(data, template.ctypes.data, template.nbytes)
+
+        self.num_reads += 1
+        return ljm_errorcodes.NOERROR
+
+
+def install(read_delay=0.0, trigger_delay=0.0) -> FakeStaticLib:
+    """
+    Make every LJMLibrary in this process use a new FakeStaticLib.
+
+    Parameters
+    ----------
+    read_delay, trigger_delay : float, optional
+        See FakeStaticLib.
+
+    Returns
+    -------
+    FakeStaticLib
+        The library now in use.
+    """
+    fake = FakeStaticLib(read_delay=read_delay, trigger_delay=trigger_delay)
+    library = Singleton._instances.get(LJMLibrary)
+    if library is None:
+        library = LJMLibrary.__new__(LJMLibrary)
+        Singleton._instances[LJMLibrary] = library
+    library._staticlib = fake
+    return fake
+
@@ -11,7 +11,6 @@ import pandas as pd
 import matplotlib.pyplot as plt
 from labjackcontroller.labtools import LabjackReader
 
-from multiprocessing.managers import BaseManager
 from multiprocessing import Process
 
 import time
@@ -23,15 +22,15 @@ from bokeh.palettes import Spectral11 as SpectralColorScheme
 from bokeh.plotting import figure, show, gridplot
 
 ## Function definitions:
-def backup(labjack: LabjackReader, basename: str, num_seconds: int) -> None:
+def backup(storage: str, basename: str, num_seconds: int) -> None:
 	"""
 	Simple function to backup all data into a pickle.
 
 	Parameters
 	----------
-	labjack: LabjackReader
-		A LabjackReader that is collecting data at the
-		time of this function's call.
+	storage: str
+		The shared memory a LabjackReader is collecting
+		data into, such as "shm:<name>".
 	basename: str
 		The name of the file to write to.
 		If it does not exist yet, it will be created.
@@ -46,6 +45,14 @@ def backup(labjack: LabjackReader, basename: str, num_seconds: int) -> None:
 
 	"""
 	start_time = time.time()
+	# Wait for the run to start, then read its data straight from shared memory.
+	labjack = None
+	while labjack is None:
+		try:
+			labjack = LabjackReader.attach(storage)
+		except (FileNotFoundError, ValueError):
+			time.sleep(0.1)
+
 	# Write data until time is up.
 	while time.time() - start_time <= num_seconds:
 		time.sleep(0.25) # Waste a second before updating the .csv again
@@ -167,33 +174,24 @@ analog_voltages = [10.0, 10.0, 10.0, 10.0]  # i.e. read input analog_voltages fr
 # should_discretize_analog_channel = [True] * num_channels
 should_discretize_analog_channel = [True, True, True, True, False, False, False, False]
 
-# BaseManagers can be used to share complex objects, attributes and all, across multiple processes.
-BaseManager.register('LabjackReader', LabjackReader)
+# Data is collected into shared memory, which other processes can read while it is recorded without copying it.
+storage = "shm:labjack_demo"
 
 def labjackAcqMain():
-	manager = BaseManager()
-	manager.start()
-
-	# Instantiate a shared LabjackReader
-	my_lj = manager.LabjackReader(device_type, connection_type=connection_type)
-
-	## declare the functions we want to run in parallel:
-	#    Declare a data-gathering process
-	data_proc = Process(target=my_lj.collect_data,
-						args=(channels, analog_voltages, duration, freq),
-						kwargs={'resolution': 1, 'scans_per_read': 1})
+	my_lj = LabjackReader(device_type, connection_type=connection_type)
 
 	#    Declare a data backup process
-	backup_proc = Process(target=backup, args=(my_lj, "backup", duration))
+	backup_proc = Process(target=backup, args=(storage, "backup", duration))
 
 
 	## BEGIN MAIN RUN:
-	# Start all threads, and join when finished.
-	data_proc.start()
+	# Start the backup process, collect data in this one, and join when finished.
+	# The shared memory lasts as long as this process, so data is collected here rather than in a child process.
 	backup_proc.start()
+	my_lj.collect_data(channels, analog_voltages, duration, freq,
+					   resolution=1, scans_per_read=1, storage=storage)
 
-	## .join() waits for both processes to be complete before moving on with the code's execution
-	data_proc.join()
+	## .join() waits for the backup process to be complete before moving on with the code's execution
 	backup_proc.join()
 
 	datarun = my_lj.to_dataframe()
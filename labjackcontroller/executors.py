@@ -0,0 +1,228 @@
+import collections
+import threading
+from multiprocessing import Pool
+
+import numpy as np
+
+"""
+A module that provides CallbackExecutor, which runs a per-row callback on
+recorded data without letting a slow callback hold up the stream.
+"""
+
+
+def _call_rows(callback, rows: list) -> None:
+    """
+    Call a callback once per row. Runs in a pool process for the "process"
+    executor, so must be a module-level function.
+    """
+    for row in rows:
+        callback(row)
+
+
+class CallbackExecutor(object):
+    """
+    Calls a function once per recorded row, from a bounded queue.
+
+    Rows are queued a block at a time by submit, and taken off the queue in
+    batches by worker threads. At most max_pending rows wait in the queue;
+    what happens to new rows once it is full is decided by overflow_policy.
+
+    Attributes
+    ----------
+    completed : int
+        The number of rows the callback has been called with.
+    dropped : int
+        The number of rows discarded by the "drop_oldest" policy.
+    coalesced : int
+        The number of rows discarded by the "coalesce" policy.
+    """
+
+    # The most rows a worker takes off the queue at once.
+    batch_rows = 1024
+
+    def __init__(self, callback, mode="process", num_workers=4,
+                 max_pending=65536, overflow_policy="block") -> None:
+        """
+        Parameters
+        ----------
+        callback
+            A callable object taking one row, as a list of floats.
+        mode : str, optional
+            Where callback runs. "inline" calls it from submit, on the
+            thread collecting data. "thread" calls it from num_workers
+            threads. "process" calls it from a pool of num_workers
+            processes, which requires callback to be picklable, and so
+            defined at module level.
+        num_workers : int, optional
+            The number of threads or processes callback runs on.
+        max_pending : int, optional
+            The most rows that can wait for callback at once.
+        overflow_policy : str, optional
+            What to do with rows submitted while max_pending rows are
+            already waiting. "block" waits for workers to make room,
+            holding up the thread that submitted them. "drop_oldest"
+            discards the rows that have waited longest. "coalesce"
+            discards every waiting row but the newest, so callback next
+            sees the latest data.
+
+        Raises
+        ------
+        ValueError
+            If an option is not valid.
+        """
+        if mode not in ("inline", "thread", "process"):
+            raise ValueError("Invalid callback executor %s." % str(mode))
+        if overflow_policy not in ("block", "drop_oldest", "coalesce"):
+            raise ValueError("Invalid overflow policy %s."
+                             % str(overflow_policy))
+        if num_workers <= 0:
+            raise ValueError("Invalid number of workers.")
+        if max_pending <= 0:
+            raise ValueError("Invalid number of pending rows.")
+
+        self.callback = callback
+        self.mode = mode
+        self.max_pending = max_pending
+        self.overflow_policy = overflow_policy
+        self.completed = 0
+        self.dropped = 0
+        self.coalesced = 0
+
+        self._pending = collections.deque()
+        self._condition = threading.Condition()
+        self._closing = False
+        self._error = None
+        self._pool = None
+        self._workers = []
+
+        if mode == "process":
+            self._pool = Pool(processes=num_workers)
+        if mode != "inline":
+            for _ in range(num_workers):
+                worker = threading.Thread(target=self._run, daemon=True)
+                worker.start()
+                self._workers.append(worker)
+
+    @property
+    def stats(self) -> dict:
+        """
+        The counters of this executor, as a dict with the keys "completed",
+        "dropped" and "coalesced".
+        """
+        return {"completed": self.completed, "dropped": self.dropped,
+                "coalesced": self.coalesced}
+
+    def submit(self, block: np.ndarray) -> None:
+        """
+        Queue every row of a block for callback.
+
+        Parameters
+        ----------
+        block : numpy.ndarray
+            A 2D array of rows. It is copied, so may be reused afterwards.
+
+        Returns
+        -------
+        None
+
+        Raises
+        ------
+        Exception
+            The first exception raised by callback, if any.
+        """
+        if self._error is not None:
+            raise self._error
+
+        rows = np.asarray(block).tolist()
+        if self.mode == "inline":
+            _call_rows(self.callback, rows)
+            self.completed += len(rows)
+            return
+
+        with self._condition:
+            if self.overflow_policy == "block":
+                offset = 0
+                while offset < len(rows):
+                    while len(self._pending) >= self.max_pending \
+                            and self._error is None:
+                        self._condition.wait()
+                    room = max(self.max_pending - len(self._pending),
+                               len(rows) - offset if self._error else 0)
+                    self._pending.extend(rows[offset:offset + room])
+                    offset += room
+                    self._condition.notify_all()
+            else:
+                self._pending.extend(rows)
+                excess = len(self._pending) - self.max_pending
+                if excess > 0 and self.overflow_policy == "drop_oldest":
+                    for _ in range(excess):
+                        self._pending.popleft()
+                    self.dropped += excess
+                elif excess > 0:
+                    self.coalesced += len(self._pending) - 1
+                    newest = self._pending.pop()
+                    self._pending.clear()
+                    self._pending.append(newest)
+                self._condition.notify_all()
+
+    def close(self) -> dict:
+        """
+        Wait for every queued row to be handed to callback, then stop the
+        workers.
+
+        Returns
+        -------
+        dict
+            The final stats of this executor.
+
+        Raises
+        ------
+        Exception
+            The first exception raised by callback, if any.
+        """
+        with self._condition:
+            self._closing = True
+            self._condition.notify_all()
+        for worker in self._workers:
+            worker.join()
+        self._workers = []
+
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+
+        if self._error is not None:
+            raise self._error
+        return self.stats
+
+    def _run(self) -> None:
+        """
+        Hand batches of queued rows to callback until close is called.
+        """
+        while True:
+            with self._condition:
+                while not self._pending and not self._closing:
+                    self._condition.wait()
+                if not self._pending:
+                    return
+
+                batch = [self._pending.popleft() for _ in
+                         range(min(len(self._pending), self.batch_rows))]
+                self._condition.notify_all()
+
+            if self._error is not None:
+                continue
+            try:
+                if self._pool is not None:
+                    self._pool.apply(_call_rows, (self.callback, batch))
+                else:
+                    _call_rows(self.callback, batch)
+            except Exception as e:
+                with self._condition:
+                    self._error = e
+                    self._condition.notify_all()
+                continue
+
+            with self._condition:
+                self.completed += len(batch)
@@ -1,21 +1,28 @@
-import labjack.ljm as ljm
 from labjack.ljm import constants as ljm_constants, \
                         errorcodes as ljm_errorcodes
 from labjack.ljm.ljm import LJMError
 
-from multiprocessing import Process, Pool
+from multiprocessing import Process
 
 import numpy as np
 import pandas as pd
-from typing import List, Tuple, Union
-from math import ceil
+from typing import Iterator, List, Tuple, Union
 import sys
 import time
 import datetime
 import ctypes
+import asyncio
+import collections
+import contextlib
+import threading
+import re
 import warnings
 from ctypes import c_int32
 from colorama import init, Fore
+
+from .executors import CallbackExecutor
+from .storage import ColumnarSampleBuffer, Envelope, EnvelopePyramid, \
+    GapIndex, HostClock, SampleBuffer, parse_storage
 init()
 
 """
@@ -24,6 +31,109 @@ Labjack T-series devices.
 """
 
 
+_DIGITAL_CHANNEL = re.compile(r"^(DIO|FIO|EIO|CIO|MIO)(\d+)$")
+
+# The first DIO number, and the number of lines, of each digital port.
+_DIGITAL_PORTS = {"DIO": (0, 23), "FIO": (0, 8), "EIO": (8, 8),
+                  "CIO": (16, 4), "MIO": (20, 3)}
+
+# State registers that hold a range of DIO lines as the bits of one value,
+# as (name, first line, last line + 1). Registers for a single port come
+# before the wider registers spanning two ports, so they are preferred.
+_DIGITAL_STATE_REGISTERS = [("FIO_STATE", 0, 8), ("EIO_STATE", 8, 16),
+                            ("CIO_STATE", 16, 20), ("MIO_STATE", 20, 23),
+                            ("FIO_EIO_STATE", 0, 16),
+                            ("CIO_MIO_STATE", 16, 23)]
+
+
+def is_digital_channel(name: str) -> bool:
+    """
+    Whether a channel name refers to a single digital I/O line, such as
+    "DIO3" or "FIO0", whose values can only be 0 or 1.
+
+    Parameters
+    ----------
+    name : str
+        The name of a channel on a LabJack device.
+
+    Returns
+    -------
+    bool
+        True if name is a digital line.
+    """
+    return _DIGITAL_CHANNEL.match(name) is not None
+
+
+def merge_digital_lines(inputs: List[str]) \
+        -> Tuple[List[str], np.ndarray, np.ndarray]:
+    """
+    Replace digital lines in a list of channels by the state registers of
+    their ports, so that a stream reads each group of lines as one value.
+
+    A group of lines is only merged when at least two of them are
+    requested. Lines from both FIO and EIO (or CIO and MIO) are read as
+    FIO_EIO_STATE (or CIO_MIO_STATE), so each group costs a single stream
+    address.
+
+    Parameters
+    ----------
+    inputs : List[str]
+        Names of channels on a LabJack device.
+
+    Returns
+    -------
+    scan_list : List[str]
+        The channels to stream, in the order of inputs. A state register
+        takes the place of the first line it replaces.
+    source : numpy.ndarray
+        For each channel of inputs, the index of the channel of scan_list
+        its value is read from.
+    shift : numpy.ndarray
+        For each channel of inputs, the bit of its value in the state
+        register read, or -1 if it is read directly.
+
+    Examples
+    --------
+    >>> merge_digital_lines(["AIN0", "FIO0", "FIO1", "EIO2"])
+    (['AIN0', 'FIO_EIO_STATE'], array([0, 1, 1, 1]), array([-1,  0,  1, 10]))
+    """
+    lines = {}
+    for i, name in enumerate(inputs):
+        match = _DIGITAL_CHANNEL.match(name)
+        if match:
+            first, count = _DIGITAL_PORTS[match.group(1)]
+            if int(match.group(2)) < count:
+                lines[i] = first + int(match.group(2))
+
+    registers = {}
+    for name, first, end in _DIGITAL_STATE_REGISTERS[4:]:
+        members = [i for i in lines if first <= lines[i] < end]
+        if len(members) < 2:
+            continue
+
+        # Use a single port's register when every line is on that port.
+        for port, port_first, port_end in _DIGITAL_STATE_REGISTERS:
+            if all(port_first <= lines[i] < port_end for i in members):
+                name, first = port, port_first
+                break
+        for i in members:
+            registers[i] = (name, lines[i] - first)
+
+    scan_list = []
+    source = np.empty(len(inputs), dtype=np.intp)
+    shift = np.full(len(inputs), -1, dtype=np.int64)
+    for i, name in enumerate(inputs):
+        if i in registers:
+            name, shift[i] = registers[i]
+            if name in scan_list:
+                source[i] = scan_list.index(name)
+                continue
+        source[i] = len(scan_list)
+        scan_list.append(name)
+
+    return scan_list, source, shift
+
+
 def calculate_max_speed(device: str, num_channels: int, gain: int,
                         resolution: int) -> float:
     """
@@ -117,6 +227,38 @@ def _time_ns_func():
 
 _time_func = time.time if sys.version_info < (3, 7, 0) else _time_ns_func
 
+# The DIO extended feature that detects each edge a stream can trigger on:
+# frequency in, measuring between rising or between falling edges.
+_TRIGGER_EDGES = {"rising": 3, "falling": 4}
+
+# The number of triggered streams running in this process. The LJM settings
+# they read with apply to every stream in the process, so the defaults are
+# only put back once the last of them ends.
+_triggered_streams = 0
+_triggered_streams_lock = threading.Lock()
+
+
+StreamBlock = collections.namedtuple("StreamBlock", ["rows", "device_time",
+                                                   "host_time", "backlog"])
+StreamBlock.__doc__ = """
+One packet of a stream, as produced by LabjackReader.iter_blocks and
+LabjackReader.astream.
+
+Attributes
+----------
+rows : numpy.ndarray
+    A (scans x channels) array of the values read, without time columns.
+device_time : numpy.ndarray
+    The time in seconds of each scan, by the device's stream clock,
+    relative to the start of the stream.
+host_time : float
+    The time in seconds, relative to the start of the stream, at which the
+    host received the packet.
+backlog : Tuple[int, int]
+    The number of scans left in the device's buffer and in LJM's buffer
+    after this packet was read.
+"""
+
 
 class Singleton(type):
     _instances = {}
@@ -128,6 +270,33 @@ class Singleton(type):
         return cls._instances[cls]
 
 
+class _StreamBuffers(object):
+    """
+    Preallocated memory that LJM_eStreamRead writes into for one handle.
+
+    Two packet buffers are alternated between, so that the packet returned
+    by one read stays intact while the next read happens. Every argument
+    passed to the LJM library is built once, here, rather than per read.
+    """
+    __slots__ = ("packets", "packet_refs", "views", "index",
+                 "dev_backlog", "ljm_backlog", "dev_backlog_ref",
+                 "ljm_backlog_ref")
+
+    def __init__(self, packet_size: int) -> None:
+        self.packets = [(ctypes.c_double * packet_size)() for _ in range(2)]
+        self.packet_refs = [ctypes.byref(packet) for packet in self.packets]
+        self.views = [np.frombuffer(packet, dtype=np.float64)
+                      for packet in self.packets]
+        for view in self.views:
+            view.flags.writeable = False
+        self.index = 0
+
+        self.dev_backlog = c_int32(0)
+        self.ljm_backlog = c_int32(0)
+        self.dev_backlog_ref = ctypes.byref(self.dev_backlog)
+        self.ljm_backlog_ref = ctypes.byref(self.ljm_backlog)
+
+
 class LJMLibrary(metaclass=Singleton):
     """
     A singleton class that interfaces with Labjack's LJM C wrapper. Used to
@@ -509,7 +678,7 @@ class LJMLibrary(metaclass=Singleton):
         """
         return self._staticlib
 
-    def stream_read(self, handle: int) -> Tuple[ctypes.c_double, int, int]:
+    def stream_read(self, handle: int) -> Tuple[np.ndarray, int, int]:
         """
         Returns data from a LabJack device with an open connection that is
         currently streaming.
@@ -521,9 +690,12 @@ class LJMLibrary(metaclass=Singleton):
 
         Returns
         -------
-        packet_data : c_double
-            A c_double array with stream data. All channels are ordered
-            sequentially.
+        packet_data : numpy.ndarray
+            A read-only 1D array with stream data. All channels are ordered
+            sequentially. The array is a view of a buffer that is reused by
+            later reads: it stays valid through the next call of this method
+            for the same handle, and is overwritten by the call after that.
+            Copy it to keep it for longer.
         device_buffer_backlog : int
             The number of scans left in the device buffer, as measured from
             when data was last collected from the device. This should usually
@@ -542,34 +714,39 @@ class LJMLibrary(metaclass=Singleton):
         Exception
             If the handle specified does not have a connection to close.
         LJMError
-            If the LJM library cannot read from the device.
+            If the LJM library cannot read from the device. Its errorCode is
+            LJME_NO_SCANS_RETURNED if the library setting
+            stream_scans_return is "all_or_none" and a whole packet has not
+            arrived yet.
         """
 
         self._validate_handle(handle, stream_mode=True)
 
-        # Initialize variables that we'll populate with results
-        packet_data = (ctypes.c_double * self._ljm_buffer[handle])()
-        dev_buffer_backlog = ctypes.c_int32(0)
-        ljm_buffer_backlog = ctypes.c_int32(0)
+        # Read into the buffer not holding the packet we returned last time,
+        # and only swap to it once it holds a packet, so that the last
+        # packet stays valid through reads that fail.
+        buffers = self._ljm_buffer[handle]
+        index = buffers.index ^ 1
 
         # Actually read data from the device
-        error = self.staticlib.LJM_eStreamRead(handle,
-                                               ctypes.byref(packet_data),
-                                               ctypes.byref(dev_buffer_backlog),
-                                               ctypes.byref(ljm_buffer_backlog))
+        error = self.staticlib \
+            .LJM_eStreamRead(handle, buffers.packet_refs[index],
+                             buffers.dev_backlog_ref, buffers.ljm_backlog_ref)
         # Handle errors if they occured
         if error != ljm_errorcodes.NOERROR:
             raise LJMError(error)
+        buffers.index = index
 
-        return packet_data, dev_buffer_backlog.value, \
-            ljm_buffer_backlog.value
+        return buffers.views[buffers.index], buffers.dev_backlog.value, \
+            buffers.ljm_backlog.value
 
     def stream_start(self, handle: int, scan_list: List[str], frequency: float,
                      scans_per_read: int) -> float:
         """
         Based on the LJM function LJM_eStreamStart. Creates a buffer that the
         LJM device can record data, and then makes the device start streaming
-        into this buffer.
+        into this buffer. The buffers stream_read returns packets in are also
+        allocated here, once per stream.
 
         Parameters
         ----------
@@ -603,7 +780,7 @@ class LJMLibrary(metaclass=Singleton):
         frequency = ctypes.c_double(frequency)
         num_addrs = len(scan_list)
         scan_list = self._names_to_modbus_addresses(scan_list)
-        self._ljm_buffer[handle] = scans_per_read * num_addrs
+        self._ljm_buffer[handle] = _StreamBuffers(scans_per_read * num_addrs)
 
         error = self.staticlib.LJM_eStreamStart(handle,
                                                 c_int32(scans_per_read),
@@ -650,6 +827,47 @@ class LJMLibrary(metaclass=Singleton):
         if error != ljm_errorcodes.NOERROR:
             raise LJMError(error)
 
+    def write_names(self, handle: int, names: List[str],
+                    values: List[float]) -> None:
+        """
+        Based on the LJM function LJM_eWriteNames. Writes values to multiple
+        named registers of a device in one operation.
+
+        Parameters
+        ----------
+        handle : int
+            A valid handle to a LJM device that has an opened connection.
+        names : List[str]
+            Names of the registers to write to, such as "AIN0_RANGE".
+        values : List[float]
+            Values corresponding element-wise to the registers in names.
+
+        Returns
+        -------
+        None
+
+        Raises
+        ------
+        Exception
+            If the handle specified does not have an open connection.
+        LJMError
+            If the LJM library cannot write to the device.
+        """
+        self._validate_handle(handle)
+
+        num_frames = len(names)
+        names = (ctypes.c_char_p * num_frames)(*[name.encode("ascii")
+                                                 for name in names])
+        values = (ctypes.c_double * num_frames)(*values[:num_frames])
+        error_address = c_int32(-1)
+
+        error = self.staticlib.LJM_eWriteNames(handle, c_int32(num_frames),
+                                               ctypes.byref(names),
+                                               ctypes.byref(values),
+                                               ctypes.byref(error_address))
+        if error != ljm_errorcodes.NOERROR:
+            raise LJMError(error)
+
     def modify_settings(self, **kwargs):
         """
         Based on the LJM function writeLibraryConfigS. Writes a configuration
@@ -671,7 +889,17 @@ class LJMLibrary(metaclass=Singleton):
                 LJME_TRANSACTION_ID_ERR occurs.
             stream_timeout: float
                 How long in MS the LJM waits for a packet to be sent or
-                received.
+                received. 0 waits forever, and None restores the LJM
+                default of a timeout calculated from the scan rate.
+            stream_scans_return: str
+                How much LJM_eStreamRead waits for. Is one of the following:
+
+                "all"
+                    Wait until a whole packet has arrived. Is the LJM
+                    default setting.
+                "all_or_none"
+                    Return a whole packet if one has arrived, else fail
+                    immediately with LJME_NO_SCANS_RETURNED.
 
         Returns
         -------
@@ -683,9 +911,9 @@ class LJMLibrary(metaclass=Singleton):
 
         for kwarg in kwargs:
             # Handle simple boolean settings first.
-            setting = (b'LJM_ALLOWS_AUTO_MULTIPLE_FEEDBACKS' if kwarg is "multiple_feedbacks" else
-                       b'LJM_OLD_FIRMWARE_CHECK' if kwarg is "ensure_updated" else
-                       b'LJM_RETRY_ON_TRANSACTION_ID_MISMATCH' if kwarg is "retry_on_transaction_err" else
+            setting = (b'LJM_ALLOWS_AUTO_MULTIPLE_FEEDBACKS' if kwarg == "multiple_feedbacks" else
+                       b'LJM_OLD_FIRMWARE_CHECK' if kwarg == "ensure_updated" else
+                       b'LJM_RETRY_ON_TRANSACTION_ID_MISMATCH' if kwarg == "retry_on_transaction_err" else
                        None)
 
             if setting is not None:
@@ -700,6 +928,153 @@ class LJMLibrary(metaclass=Singleton):
                     raise LJMError(error)
                 continue
 
+            # Now, handle settings with other values.
+            if kwarg == "stream_timeout":
+                if kwargs[kwarg] is None:
+                    setting = b'LJM_STREAM_RECEIVE_TIMEOUT_MODE'
+                    value = ljm_constants \
+                        .STREAM_RECEIVE_TIMEOUT_MODE_CALCULATED
+                else:
+                    setting = b'LJM_STREAM_RECEIVE_TIMEOUT_MS'
+                    value = kwargs[kwarg]
+            elif kwarg == "stream_scans_return":
+                setting = b'LJM_STREAM_SCANS_RETURN'
+                value = (ljm_constants.STREAM_SCANS_RETURN_ALL
+                         if kwargs[kwarg] == "all" else
+                         ljm_constants.STREAM_SCANS_RETURN_ALL_OR_NONE
+                         if kwargs[kwarg] == "all_or_none" else
+                         None)
+                if value is None:
+                    raise ValueError("Expected an argument that was either"
+                                     " \"all\" or \"all_or_none\"")
+            else:
+                continue
+
+            error = self.staticlib.LJM_WriteLibraryConfigS(
+                setting, ctypes.c_double(value))
+            if error != ljm_errorcodes.NOERROR:
+                raise LJMError(error)
+
+
+class AsyncBlockStream(object):
+    """
+    An asynchronous iterator over the packets of a stream, as returned by
+    LabjackReader.astream.
+
+    The stream is started and read on a dedicated thread, which hands each
+    packet to the event loop as a StreamBlock. At most max_blocks packets
+    wait to be consumed; beyond that, the reading thread waits too, and the
+    device's own buffer absorbs the difference.
+
+    The stream stops when the iterator is exhausted or closed, or when the
+    task iterating it is cancelled. Use it with "async with" to be sure the
+    stream stops however iteration ends.
+    """
+
+    def __init__(self, blocks: Iterator[StreamBlock], max_blocks: int) -> None:
+        if max_blocks <= 0:
+            raise ValueError("Invalid number of blocks to queue.")
+
+        self._blocks = blocks
+        self._slots = threading.BoundedSemaphore(max_blocks)
+        self._stopping = threading.Event()
+        self._queue = None
+        self._thread = None
+        self._done = False
+
+    def __aiter__(self) -> "AsyncBlockStream":
+        return self
+
+    async def __anext__(self) -> StreamBlock:
+        if self._done:
+            raise StopAsyncIteration
+        if self._thread is None:
+            self._queue = asyncio.Queue()
+            # The thread holds no reference to this object, so that it is
+            # collected, and the stream stopped, once nothing iterates it.
+            self._thread = threading.Thread(
+                target=self._run,
+                args=(self._blocks, self._queue, self._slots, self._stopping,
+                      asyncio.get_event_loop()),
+                daemon=True)
+            self._thread.start()
+
+        try:
+            block = await self._queue.get()
+        except BaseException:
+            # Cancelled, most likely; stop the stream in the background.
+            self._stop()
+            raise
+
+        if block is None or isinstance(block, BaseException):
+            self._done = True
+            if block is None:
+                raise StopAsyncIteration
+            raise block
+
+        self._slots.release()
+        return block
+
+    async def __aenter__(self) -> "AsyncBlockStream":
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        """
+        Stop the stream, and wait for the reading thread to finish.
+
+        Returns
+        -------
+        None
+        """
+        self._stop()
+        self._done = True
+        if self._thread is not None:
+            await asyncio.get_event_loop().run_in_executor(None,
+                                                           self._thread.join)
+
+    def __del__(self) -> None:
+        self._stop()
+
+    def _stop(self) -> None:
+        # The reading thread notices this after its current read.
+        self._stopping.set()
+
+    @staticmethod
+    def _run(blocks: Iterator[StreamBlock], blocks_queue: asyncio.Queue,
+             slots: threading.BoundedSemaphore, stopping: threading.Event,
+             loop: asyncio.AbstractEventLoop) -> None:
+        """
+        Read packets and pass copies of them to the event loop, until the
+        stream ends or is stopped. Ends by passing None, or the exception
+        that ended the stream.
+        """
+        result = None
+        try:
+            for block in blocks:
+                while not slots.acquire(timeout=0.1):
+                    if stopping.is_set():
+                        return
+                if stopping.is_set():
+                    return
+
+                # The arrays are reused by the next read, so copy them.
+                block = StreamBlock(block.rows.copy(),
+                                    block.device_time.copy(),
+                                    block.host_time, block.backlog)
+                loop.call_soon_threadsafe(blocks_queue.put_nowait, block)
+        except Exception as e:
+            result = e
+        finally:
+            blocks.close()
+            try:
+                loop.call_soon_threadsafe(blocks_queue.put_nowait, result)
+            except RuntimeError:
+                # The event loop has already been closed.
+                pass
+
 
 class LabjackReader(object):
     """
@@ -719,16 +1094,54 @@ class LabjackReader(object):
     # Keep track of the input channels we're reading.
     _input_channels = []
 
-    # Declare a data storage handle, is a ctypes.c_int with some number
-    # (in other words, is a C array)
-    _data_arr = None
+    # Declare a data storage handle, is a SampleBuffer holding a
+    # (rows x channels + 2) NumPy array. It also tracks how many rows
+    # are populated.
+    _storage = None
 
-    # Also, specify the largest index that is populated.
-    _max_index = 0
+    # The number of rows a run will collect, or None if it runs until stop
+    # is called.
+    _rows_to_collect = None
+
+    # Set to end a run once the packet being read is stored.
+    _stop_requested = False
+
+    # An event shared with other readers, such as by MultiLabjackReader,
+    # that also ends a run once set. Unlike a stop, starting a stream does
+    # not reset it, so it ends runs that had not started yet when it was set.
+    _shared_stop = None
+
+    # The trigger the current stream waits for, if any.
+    _trigger = None
+
+    # The EnvelopePyramid kept during the last run, if it kept one.
+    _envelope = None
+
+    # The HostClock fitted during the last run, and the host time its fit
+    # is relative to.
+    _host_clock = None
+    _start_time = None
+
+    # How the callback executor of the last run fared.
+    _callback_stats = None
+
+    # When digital lines are streamed as port state registers: the number
+    # of channels streamed, where each column's value comes from, the
+    # columns to unpack a bit of, the bit of each, and space to unpack into.
+    _scan_width = 0
+    _unpack_source = None
+    _unpack_columns = None
+    _unpack_shift = None
+    _unpack_rows = None
 
     # There will be an int handle for the LabJack device
     _handle = -1
 
+    # The LJMLibrary used to talk to the device, or None for a read-only
+    # reader made by attach, along with the storage it was attached to.
+    _ljm_reference = None
+    _attached_to = None
+
     _connection_open = False
 
     # For administrative purposes, we will also keep track of the
@@ -805,18 +1218,78 @@ class LabjackReader(object):
         self.device_identifier = device_identifier
         self._ljm_reference = LJMLibrary()
 
+    @classmethod
+    def attach(cls, storage: str) -> "LabjackReader":
+        """
+        Get a read-only LabjackReader for data recorded, or being recorded,
+        by collect_data into storage outside of its process' memory. No
+        device connection is made.
+
+        Parameters
+        ----------
+        storage : str
+            The same specification given to collect_data, such as
+            "mmap:<path>" or "shm:<name>".
+
+        Returns
+        -------
+        LabjackReader
+            A reader whose to_array and to_dataframe return the data in
+            storage. Rows recorded after attaching also become visible.
+
+        Raises
+        ------
+        ValueError
+            If storage is not a specification of storage that can be
+            attached to, or holds no data recorded by a LabjackReader.
+
+        Examples
+        --------
+        Read a file a crashed or still-running run recorded into:
+
+        >>> reader = LabjackReader.attach("mmap:/data/session.buf")
+        >>> reader.to_dataframe()
+
+        Follow a run another process records into shared memory:
+
+        >>> reader = LabjackReader.attach("shm:session")
+        >>> rows, cursor = reader.read_since(0)
+        """
+        storage_kind, storage_location = parse_storage(storage)
+        if storage_kind == "mmap":
+            storage = SampleBuffer.open_mmap(storage_location)
+        elif storage_kind == "shm":
+            storage = SampleBuffer.open_shm(storage_location)
+        else:
+            raise ValueError("Only storage outside of a process' memory can"
+                             " be attached to.")
+
+        reader = cls.__new__(cls)
+        reader.device_type = reader.connection_type = None
+        reader.device_identifier = None
+        reader._attached_to = "%s:%s" % (storage_kind, storage_location)
+        reader._storage = storage
+        reader._input_channels = reader._storage.channels
+        return reader
+
     def __enter__(self):
-        self.open(verbose=False)
+        if self._attached_to is None:
+            self.open(verbose=False)
         return self
 
     def __exit__(self, exc_type, exc_value, traceback):
         self.close()
 
     def __str__(self):
+        if self._attached_to is not None:
+            return self.__repr__()
         return self.__repr__() + " Max packet size in bytes: %i" \
                % (self._meta_max_packet_size)
 
     def __repr__(self):
+        if self._attached_to is not None:
+            return "LabjackReader(attached to %s)" % self._attached_to
+
         # Make sure we have a connection open.
         self.open(verbose=False)
 
@@ -847,20 +1320,22 @@ class LabjackReader(object):
     @property
     def max_row(self) -> int:
         """
-        Get the number of rows that currently exist.
+        Get the number of rows that currently exist. When recording into a
+        ring buffer, this counts every row recorded during the run, including
+        those that have since been overwritten.
         """
         if self.max_index < 1:
             return -1
         # Else...
-        return int(self.max_index / (len(self._input_channels) + 1))
+        return self._storage.rows_written
 
     @property
     def max_index(self) -> int:
         """
         Get or set the largest index value that has been filled.
         """
-        if self._max_index is not None and self._max_index:
-            return self._max_index
+        if self._storage is not None and self._storage.rows_written:
+            return self._storage.rows_written * self._storage.width
         else:
             return -1
 
@@ -871,8 +1346,61 @@ class LabjackReader(object):
         if value < -1:
             raise ValueError("Invalid value provided, must be greater than or"
                              " equal to -1.")
+        if self._storage is None:
+            raise ValueError("No data has been recorded yet.")
 
-        self._max_index = value
+        self._storage.rows_written = max(value, 0) // self._storage.width
+
+    @property
+    def host_clock(self) -> Union[HostClock, None]:
+        """
+        Get the fit of host time against scan number made during the last
+        run, or None. Its predict method gives the host time of any scan.
+        """
+        return self._host_clock
+
+    @property
+    def envelope(self) -> Union[EnvelopePyramid, None]:
+        """
+        Get the EnvelopePyramid kept by the last collect_data run with
+        envelope=True, or None.
+        """
+        return self._envelope
+
+    @property
+    def callback_stats(self) -> Union[dict, None]:
+        """
+        Get how many rows callback_function was called with ("completed")
+        during the last collect_data run, and how many were discarded by
+        overflow_policy ("dropped" and "coalesced"), or None before any
+        run. All are 0 for a run without a callback_function.
+        """
+        return self._callback_stats
+
+    @property
+    def gaps(self) -> np.ndarray:
+        """
+        Get the runs of scans skipped during the run, as a structured array
+        with the fields start_row, length and device_time. See
+        labjackcontroller.storage.GapIndex.
+        """
+        if self._storage is None:
+            return np.empty(0, dtype=GapIndex.dtype)
+        return self._storage.gaps.to_array()
+
+    def __array__(self, dtype=None, copy=None) -> np.ndarray:
+        """
+        Let NumPy (and libraries built on it) use all recorded data as an
+        array. Is a read-only view unless a copy or another dtype is asked
+        for.
+        """
+        data = self.to_array(mode="all")
+        if data is None:
+            data = np.empty((0, len(self._input_channels) + 2))
+
+        if dtype is not None and np.dtype(dtype) != data.dtype:
+            return data.astype(dtype)
+        return data.copy() if copy else data
 
     def _reshape_data(self, from_row: int, to_row: int) -> np.ndarray:
         """
@@ -888,22 +1416,156 @@ class LabjackReader(object):
         Returns
         -------
         array_like: numpy.ndarray
-            A 2D array, starting at from_row, of data points, where
-            every row is one data point across all channels.
+            A read-only 2D view, starting at from_row, of data points, where
+            every row is one data point across all channels. No data is
+            copied.
         """
-        if (self._data_arr is not None and self.max_index != -1
+        if (self._storage is not None and self.max_index != -1
            and from_row >= 0):
-            row_width = len(self._input_channels) + 2
-            max_index = min(self.max_index, row_width * to_row)
-
-            start_index = from_row * row_width
-
-            return np.array(self._data_arr[start_index:max_index]) \
-                .reshape((ceil((max_index - start_index) / row_width),
-                         row_width))
+            return self._storage.view(from_row, to_row)
         # Else...
         return None
 
+    def _packet_block(self, packet, packet_num: int,
+                      packet_duration: float) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Turn one packet returned by the stream into a block of rows.
+
+        Parameters
+        ----------
+        packet: array_like
+            The flat data of one stream read, with all channels of a scan
+            ordered sequentially.
+        packet_num: int
+            The number of packets read before this one during the current
+            stream.
+        packet_duration: float
+            The time in seconds the device takes to record one full packet.
+
+        Returns
+        -------
+        scans : numpy.ndarray
+            The packet as a (scans x channels) array, with state registers
+            unpacked into lines.
+        device_time : numpy.ndarray
+            The device time of every scan.
+
+        Both are only valid until the next call.
+        """
+        # View the packet as (scans x channels); this does not copy.
+        scans = np.asarray(packet).reshape((-1, self._scan_width))
+        if self._unpack_source is not None:
+            scans = self._unpack_ports(scans)
+
+        # We will manually calculate the times each entry occurs at.
+        # The stream itself is timed by the same clock that runs
+        # CORE_TIMER, and it is officially advised we use the stream
+        # clocking instead.
+        # See https://forums.labjack.com/index.php?showtopic=6992
+        device_time = self._packet_times[:len(scans)]
+        np.add(self._scan_times[:len(scans)], packet_num * packet_duration,
+               out=device_time)
+        return scans, device_time
+
+    def _store_block(self, scans: np.ndarray, device_time: np.ndarray,
+                     host_time: Union[np.ndarray, float]) -> Tuple[int, int]:
+        """
+        Write a block of rows to storage, up to the number of rows the run
+        is meant to collect.
+
+        Returns
+        -------
+        first_row : int
+            The index of the first row the block was written to.
+        num_rows : int
+            The number of rows written.
+        """
+        if self._rows_to_collect is not None:
+            num_rows = max(0, self._rows_to_collect
+                           - self._storage.rows_written)
+            scans = scans[:num_rows]
+            device_time = device_time[:num_rows]
+            if not np.isscalar(host_time):
+                host_time = host_time[:num_rows]
+
+        # The buffer ensures that this block won't overflow it.
+        return self._storage.write(scans, device_time, host_time)
+
+    def _unpack_ports(self, scans: np.ndarray) -> np.ndarray:
+        """
+        Expand the state registers in a block of scans into one column per
+        digital line requested.
+
+        Parameters
+        ----------
+        scans: numpy.ndarray
+            A (scans x streamed channels) block of a packet.
+
+        Returns
+        -------
+        numpy.ndarray
+            A (scans x channels) block, only valid until the next call. A
+            skipped (-9999) state becomes -9999 in each of its lines.
+        """
+        rows = self._unpack_rows[:len(scans)]
+        np.take(scans, self._unpack_source, axis=1, out=rows)
+
+        states = rows[:, self._unpack_columns]
+        bits = (states.astype(np.int64) >> self._unpack_shift) & 1
+        rows[:, self._unpack_columns] = np.where(states == -9999.0, states,
+                                                 bits)
+        return rows
+
+    def _open_sinks(self, sinks: list, frequency: float,
+                    scans_per_read: int, resolution: int) -> None:
+        """
+        Tell every sink about the run that is starting.
+        """
+        if not self._meta_serial_number:
+            self._meta_device, self._meta_connection, \
+                self._meta_serial_number, self._meta_ip_addr, \
+                self._meta_port, self._meta_max_packet_size = \
+                self._ljm_reference.connection_info(self._handle)
+
+        metadata = {"channels": list(self._input_channels),
+                    "columns": list(self._input_channels)
+                    + ["Time", "System Time"],
+                    "scan_rate": frequency,
+                    "scans_per_read": scans_per_read,
+                    "resolution": resolution,
+                    "device_type": self._meta_device,
+                    "serial_number": self._meta_serial_number}
+        for sink in sinks:
+            sink.open(metadata)
+
+    @contextlib.contextmanager
+    def _closing(self, closeables: list):
+        """
+        Close every sink or callback executor when leaving the context,
+        however it is left.
+        """
+        try:
+            yield
+        finally:
+            for closeable in closeables:
+                closeable.close()
+
+    def stop(self) -> None:
+        """
+        Ask a running collect_data to finish once it has stored the packet
+        it is currently reading. This is the way to end a run started with
+        seconds=None.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        None
+        """
+        self._stop_requested = True
+
     def _close_stream(self, verbose=False) -> None:
         """
         Close a streaming connection to the LabJack.
@@ -930,8 +1592,20 @@ class LabjackReader(object):
                       " stream running.")
             pass
 
+        if self._trigger is not None:
+            # Put back the LJM defaults a triggered stream changed, unless
+            # another triggered stream in this process still needs them.
+            global _triggered_streams
+            self._trigger = None
+            with _triggered_streams_lock:
+                _triggered_streams -= 1
+                if not _triggered_streams:
+                    self._ljm_reference.modify_settings(
+                        stream_scans_return="all", stream_timeout=None)
+
     def _setup(self, inputs, inputs_max_voltages, resolution,
-               frequency, scans_per_read=-1) -> Tuple[int, int]:
+               frequency, scans_per_read=-1, trigger=None,
+               trigger_edge="rising") -> Tuple[int, int]:
         """
         Set up a connection to the LabJack for streaming
 
@@ -951,6 +1625,11 @@ class LabjackReader(object):
         scans_per_read: int, optional
             Number of data points contained in a packet sent by the LabJack
             device. -1 indicates the maximum possible sample rate.
+        trigger: str, optional
+            T7 only. The DIO_EF the stream waits for an edge on before it
+            starts sampling, such as "DIO_EF0".
+        trigger_edge: str, optional
+            The edge of trigger to start on, "rising" or "falling".
 
         Returns
         -------
@@ -999,8 +1678,9 @@ class LabjackReader(object):
         values = []
 
         if self.device_type == "T7":
-            # Ensure triggered stream is disabled.
-            self.modify_settings(triggered_stream=None)
+            # Arm the stream to start on the trigger, or ensure triggered
+            # stream is disabled.
+            self.modify_settings(triggered_stream=trigger)
 
             # Enabling internally-clocked stream.
             self.modify_settings(stream_clock="internal")
@@ -1008,67 +1688,254 @@ class LabjackReader(object):
             names.append("AIN_ALL_NEGATIVE_CH")
             values.append(ljm_constants.GND)
 
+            if trigger is not None:
+                # Have the trigger's line detect edges. Its extended
+                # feature must be disabled while it is reconfigured.
+                line = "DIO%s_EF_" % trigger[len("DIO_EF"):]
+                names.extend([line + "ENABLE", line + "INDEX",
+                              line + "ENABLE"])
+                values.extend([0, _TRIGGER_EDGES[trigger_edge], 1])
+
+                # Until the trigger, no scans arrive at all; rather than
+                # have a read time out waiting for them, return without
+                # scans whenever a whole packet has not arrived.
+                global _triggered_streams
+                with _triggered_streams_lock:
+                    _triggered_streams += 1
+                    self._trigger = trigger
+                    self._ljm_reference.modify_settings(
+                        stream_scans_return="all_or_none", stream_timeout=0)
+
         names.extend([element + "_RANGE" for element in ain_inputs])
         values.extend(inputs_max_voltages)
 
         # Write the analog inputs' negative channels (when applicable),
         # ranges, stream settling time and stream resolution configuration.
-        num_frames = len(names)
-        ljm.eWriteNames(self._handle, num_frames, names, values)
+        self._ljm_reference.write_names(self._handle, names, values)
 
         # Configure and start stream
         return (self._ljm_reference.stream_start(self._handle, inputs,
                                                  frequency, scans_per_read),
                 scans_per_read)
 
-    def open(self, verbose=True) -> None:
+    def _start_stream(self, inputs: List[str],
+                      inputs_max_voltages: List[float], frequency: int,
+                      scans_per_read=-1, resolution=4,
+                      digital_ports="unpacked", trigger=None,
+                      trigger_edge="rising",
+                      verbose=False) -> Tuple[List[str], int, int]:
         """
-        Open a connection to the LabJack to allow for streaming or other
-        device communication.
-
-        Parameters
-        ----------
-        verbose : bool, optional
-            Sends information about the attempt to open the device to standard
-            out.
+        Validate the parameters of a stream, configure the device for it and
+        start it. See collect_data for the parameters.
 
         Returns
         -------
-        None
-
+        columns : List[str]
+            The name of each column of the rows the stream produces, not
+            counting time columns.
+        frequency : int
+            The actual scan rate the device starts at
+        scans_per_read : int
+            The actual number of scans per packet
         """
-        if not self._connection_open:
-            # Open our device.
-            self._handle = self._ljm_reference.connection_open(self.device_type,
-                                                         self.connection_type,
-                                                         self.device_identifier)
-            self._connection_open = True
-
-            if verbose:
-                print(self)
+        self.modify_settings(stream_settling_time="auto")
 
-    def close(self):
-        """
-        Close a connection to the LabJack, allowing others to connect to this
-        object's labjack via the connections used by this object.
+        if not len(inputs):
+            raise ValueError("Needed a non-empty string collection of channels.")
+        for channel in inputs:
+            if not isinstance(channel, str):
+                raise TypeError("Expected a string name for each channel,"
+                                " not %s" % str(channel))
 
-        Parameters
-        ----------
-        None
+        # Input validation for inputs_max_voltages
+        if not len(inputs_max_voltages):
+            raise ValueError("Needed a non-empty numerical collection of values.")
+        for channel in inputs:
+            if not isinstance(channel, str):
+                raise TypeError("Expected a numerical value, not %s"
+                                % str(channel))
 
-        Returns
-        -------
-        None
+        # Input validation for frequency
+        if frequency <= 0:
+            raise ValueError("Invalid frequency provided for frequency.")
 
-        """
-        self._close_stream()
-        self._ljm_reference.connection_close(self._handle)
-        self._connection_open = False
+        if digital_ports not in ("unpacked", "packed", None):
+            raise ValueError("Invalid digital_ports %s." % str(digital_ports))
 
-    def modify_settings(self, **kwargs):
-        """
-        Based on the LJM function eWriteName. Writes a configuration value to
-        our Labjack device.
+        if trigger is not None:
+            if self.device_type != "T7":
+                raise ValueError("Triggered streams are only supported on"
+                                 " the T7.")
+            if not re.match(r"^DIO_EF[0-7]$", str(trigger)):
+                raise ValueError("Expected a trigger in the range"
+                                 " DIO_EF0....DIO_EF7")
+            if trigger_edge not in _TRIGGER_EDGES:
+                raise ValueError("Invalid trigger edge %s."
+                                 % str(trigger_edge))
+
+        # Open a connection.
+        self.open(verbose=verbose)
+
+        # Close the stream if it was already open; this is done
+        # to prevent unexpected termination from last time messing
+        # up the connection this time.
+        self._close_stream()
+
+        if digital_ports is None:
+            scan_list = list(inputs)
+        else:
+            scan_list, source, shift = merge_digital_lines(inputs)
+        columns = scan_list if digital_ports == "packed" else list(inputs)
+
+        frequency, scans_per_read = self._setup(scan_list,
+                                                inputs_max_voltages,
+                                                resolution,
+                                                frequency,
+                                                scans_per_read=scans_per_read,
+                                                trigger=trigger,
+                                                trigger_edge=trigger_edge)
+
+        self._input_channels = columns
+
+        # Prepare to split state registers back into lines.
+        self._scan_width = len(scan_list)
+        if len(scan_list) < len(columns):
+            self._unpack_source = source
+            self._unpack_columns = np.flatnonzero(shift >= 0)
+            self._unpack_shift = shift[self._unpack_columns]
+            self._unpack_rows = np.empty((scans_per_read, len(columns)))
+        else:
+            self._unpack_source = None
+            self._unpack_rows = None
+
+        # Device time of every scan in a packet, relative to the first scan
+        # of that packet, and space to offset them into.
+        self._scan_times = np.arange(scans_per_read) / frequency
+        self._packet_times = np.empty(scans_per_read)
+
+        self._stop_requested = False
+        return columns, frequency, scans_per_read
+
+    def _read_blocks(self, frequency: int, scans_per_read: int,
+                     start: Union[float, None] = None) \
+            -> Iterator[StreamBlock]:
+        """
+        Read packets from a stream started by _start_stream until stop is
+        called, and stop the stream once done.
+
+        Parameters
+        ----------
+        frequency : int
+            The actual scan rate of the stream.
+        scans_per_read : int
+            The actual number of scans per packet.
+        start : float, optional
+            The time host times are relative to. Defaults to the time of
+            the first read.
+
+        Yields
+        ------
+        StreamBlock
+            Each packet read. Its arrays are only valid until the next one.
+        """
+        if start is None:
+            start = _time_func()
+
+        # How long to wait before asking a triggered stream for a packet
+        # again, when the last attempt found none.
+        poll_interval = scans_per_read / frequency / 8
+
+        packet_num = 0
+        try:
+            while not self._stop_requested and not (
+                    self._shared_stop is not None
+                    and self._shared_stop.is_set()):
+                # Read all rows of data off of the latest packet in the
+                # stream.
+                try:
+                    packet, dev_backlog, ljm_backlog = \
+                        self._ljm_reference.stream_read(self._handle)
+                except LJMError as e:
+                    # A triggered stream has no packet before the trigger,
+                    # nor whenever the next has not fully arrived yet.
+                    if self._trigger is None or e.errorCode \
+                            != ljm_errorcodes.NO_SCANS_RETURNED:
+                        raise
+                    time.sleep(poll_interval)
+                    continue
+
+                # The host time is taken once for the whole packet, as
+                # every scan in it arrived with the same read.
+                host_time = _time_func() - start
+                scans, device_time = self._packet_block(
+                    packet, packet_num, scans_per_read / frequency)
+                packet_num += 1
+
+                yield StreamBlock(scans, device_time, host_time,
+                                  (dev_backlog, ljm_backlog))
+        finally:
+            self._close_stream()
+
+    def open(self, verbose=True) -> None:
+        """
+        Open a connection to the LabJack to allow for streaming or other
+        device communication.
+
+        Parameters
+        ----------
+        verbose : bool, optional
+            Sends information about the attempt to open the device to standard
+            out.
+
+        Returns
+        -------
+        None
+
+        Raises
+        ------
+        RuntimeError
+            If this is a read-only reader made by attach, which has no
+            device.
+
+        """
+        if self._attached_to is not None:
+            raise RuntimeError("A reader attached to %s has no device to"
+                               " open." % self._attached_to)
+        if not self._connection_open:
+            # Open our device.
+            self._handle = self._ljm_reference.connection_open(self.device_type,
+                                                         self.connection_type,
+                                                         self.device_identifier)
+            self._connection_open = True
+
+            if verbose:
+                print(self)
+
+    def close(self):
+        """
+        Close a connection to the LabJack, allowing others to connect to this
+        object's labjack via the connections used by this object. Does
+        nothing for a read-only reader made by attach.
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        None
+
+        """
+        if self._attached_to is not None:
+            return
+        self._close_stream()
+        self._ljm_reference.connection_close(self._handle)
+        self._connection_open = False
+
+    def modify_settings(self, **kwargs):
+        """
+        Based on the LJM function eWriteName. Writes a configuration value to
+        our Labjack device.
 
         Parameters
         ----------
@@ -1206,8 +2073,10 @@ class LabjackReader(object):
                             .LJM_eWriteName(self._handle,
                                             b'STREAM_TRIGGER_INDEX',
                                             ctypes.c_double(value))
-                        # TODO: LJM_STREAM_SCANS_RETURN_ALL? See
-                        # https://labjack.com/support/software/api/ljm/function-reference/ljmestreamstart#triggered
+                        # A stream waiting on a trigger returns no scans
+                        # until it comes, so it must be read with
+                        # stream_scans_return="all_or_none". collect_data's
+                        # trigger argument sets that up.
                     else:
                         raise ValueError("Expected an argument in the range"
                                          "DIO_EF0....DIO_EF7")
@@ -1383,9 +2252,7 @@ class LabjackReader(object):
                     buffer_size = ret[1]
                     ljm_buffer_size = max(ljm_buffer_size, ret[2])
 
-                    for element in ret[0]:
-                        if element == -9999.0:
-                            num_skips += 1
+                    num_skips += np.count_nonzero(ret[0] == -9999.0)
 
                     max_buffer_size = max(max_buffer_size, buffer_size)
                     iterations += len(ret[0])
@@ -1464,13 +2331,28 @@ class LabjackReader(object):
     def collect_data(self,
                      inputs: List[str],
                      inputs_max_voltages: List[float],
-                     seconds: float,
+                     seconds: Union[float, None],
                      frequency: int,
                      scans_per_read=-1,
                      resolution=4,
                      verbose=False,
                      callback_function=None,
-                     num_threads=4) -> Tuple[float, float]:
+                     num_threads=4,
+                     ring_rows=None,
+                     storage=None,
+                     sinks=None,
+                     layout="interleaved",
+                     analog_dtype=np.float32,
+                     pack_digital=False,
+                     digital_ports="unpacked",
+                     block_callback=None,
+                     callback_executor="process",
+                     max_pending=65536,
+                     overflow_policy="block",
+                     host_time="stored",
+                     trigger=None,
+                     trigger_edge="rising",
+                     envelope=False) -> Tuple[float, float]:
         """
         Collect data from the LabJack device.
 
@@ -1485,10 +2367,11 @@ class LabjackReader(object):
         inputs_max_voltages : sequence of real values
             Maximum voltages corresponding element-wise to the channels
             listed in inputs. Only applicable for analog (AIN) channels.
-        seconds : float
+        seconds : Union[float, None]
             Duration of the data run in seconds. The run will last at least as
             long as this value, and will try to stop streaming when this time
-            has been met.
+            has been met. If None, the run lasts until stop is called, and
+            ring_rows must be given.
         frequency : int
             Number of times per second (Hz) the device will get a data point
             for each of the channels specified.
@@ -1506,22 +2389,124 @@ class LabjackReader(object):
             from the method to_array.
         num_threads : optional
             Only taken into consideration when callback_function is not None.
-            The number of threads in a pool used to call the callback function.
-            As long as your system can handle it, more is better.
+            The number of threads or processes used to call the callback
+            function. As long as your system can handle it, more is better.
+        ring_rows : int, optional
+            If given, record into a circular buffer of this many rows instead
+            of one sized for the whole run. Once full, the oldest rows are
+            overwritten, so memory use stays constant however long the run
+            lasts.
+        storage : str, optional
+            Where to record data. None, the default, keeps it in this
+            process' memory. "mmap:<path>" records into a memory-mapped file
+            at path instead, so the length of a run is bounded by disk space
+            rather than RAM. The file can be read, even while it is being
+            written or after a crash, with LabjackReader.attach.
+            "shm:<name>" records into a shared memory segment with the
+            given name, which other processes can read without copying,
+            while it is being written, with LabjackReader.attach. The
+            segment lasts until the run's data is replaced or this process
+            exits. Needs Python 3.8 or later.
+        sinks : sequence of Sink, optional
+            Objects, such as a labjackcontroller.sinks.HDF5Writer, that are
+            handed every packet's rows as they are recorded. See
+            labjackcontroller.sinks.Sink.
+        layout : str, optional
+            How recorded data is kept in memory. "interleaved", the default,
+            stores every value as a float64 in one array, and to_array
+            returns views of it. "columnar" stores analog channels as
+            analog_dtype, digital channels as uint8 (or bits, if
+            pack_digital) and each time column as its own float64 array,
+            which uses a fraction of the memory. to_array and to_dataframe
+            then build their float64 output on demand, as copies. Only
+            supported with in-memory storage.
+        analog_dtype : numpy.dtype, optional
+            The type analog channels are stored as in the columnar layout.
+            Defaults to float32.
+        pack_digital : bool, optional
+            In the columnar layout, store the digital channels of each row
+            as bits of one integer. Skipped digital values then read back as
+            0 rather than -9999.
+        digital_ports : str, optional
+            How to stream digital lines, such as "FIO0" or "EIO3". If two or
+            more lines of a port are requested, "unpacked", the default,
+            streams the port's state register (such as FIO_STATE) in place
+            of them, and splits its bits back into one column per line as
+            rows are recorded. Fewer stream addresses mean a higher maximum
+            scan rate. "packed" streams the same registers, but records
+            them as they are, with one column per register; to_array then
+            has the columns of merge_digital_lines(inputs)[0]. None streams
+            every line on its own.
+        block_callback : optional
+            A callable object called once per packet read, on the thread
+            collecting data, as block_callback(block, start_row,
+            device_time, host_time). block is a read-only 2D NumPy array of
+            the rows just recorded, in the format of to_array, and is only
+            valid during the call. start_row is the number of its first row
+            counted from the start of the run, device_time is the device
+            time of that row, and host_time the time in seconds since the
+            start of the run at which the packet was received. Unlike
+            callback_function, this costs one call per packet rather than
+            per row, and nothing is pickled, but the call delays the next
+            read, so it should return well within one packet's duration.
+        callback_executor : str, optional
+            Where callback_function runs. "process", the default, uses a
+            pool of num_threads processes. "thread" uses num_threads
+            threads, and so does not need callback_function to be
+            picklable. "inline" calls it on the thread collecting data.
+            See labjackcontroller.executors.CallbackExecutor.
+        max_pending : int, optional
+            The most rows that can wait for callback_function at once.
+        overflow_policy : str, optional
+            What to do with new rows once max_pending rows are waiting for
+            callback_function. "block", the default, waits for room, which
+            delays reading the stream. "drop_oldest" discards the rows that
+            have waited longest, and "coalesce" every waiting row but the
+            newest, so a slow callback can never hold up the stream.
+        host_time : str, optional
+            How the "System Time" column is produced. The host clock is
+            read once per packet, and a line fitted through those readings
+            against scan number (see the host_clock property) gives the
+            host time of every scan, free of the jitter of when packets
+            happen to arrive. "stored", the default, computes and stores it
+            as rows are recorded. "export" does not store it, saving 8 bytes
+            per row, and computes it whenever rows are read, from the fit
+            at that time. Only supported with in-memory storage.
+        trigger : str, optional
+            T7 only. Arm the stream, and start sampling on an edge of a
+            digital line rather than as soon as the stream is set up, so
+            the device decides when the run starts. One of "DIO_EF0"
+            through "DIO_EF7", which trigger on DIO0 through DIO7. Until
+            the edge, the run waits for it, for as long as it takes or
+            until stop is called; seconds counts from the edge. Device time
+            is relative to the edge, while host time is relative to the
+            start of the wait, so the first row's host time tells when the
+            trigger came.
+        trigger_edge : str, optional
+            The edge of the trigger line to start on, "rising", the
+            default, or "falling".
+        envelope : bool, optional
+            Keep a min/max/mean pyramid of every channel, updated as each
+            packet is recorded, so query_envelope can summarise any span of
+            the run in a bounded number of points, such as to plot it. It
+            takes a quarter to half as much memory as the rows do in the
+            interleaved layout, and is kept in this process' memory
+            whatever the storage.
 
         Returns
         -------
         tot_time : float
             The total amount of time actually spent collecting data
         num_skips : float
-            The number of skipped data points.
+            The number of skipped scans. Where they are is given by the
+            gaps property.
 
         Notes
         -----
-        `callback_function` gets passed to a `multiprocessing` thread pool.
-        At this time, this means it must be pickleable and not have local
-        scope. Future versions of this library may be able to work around
-        this limitation.
+        With the default callback_executor of "process", `callback_function`
+        gets passed to a `multiprocessing` pool. This means it must be
+        pickleable and not have local scope. Use "thread" or "inline" to
+        work around this limitation.
 
         Examples
         --------
@@ -1548,142 +2533,169 @@ class LabjackReader(object):
         >>> reader.collect_data(["AIN0"], [10.0], 60.5, 10000,
                                 callback_function=new_callback)
 
-        """
-
-        self.modify_settings(stream_settling_time="auto")
+        Stream indefinitely, keeping only the last minute of data, until
+        another thread calls reader.stop():
 
-        if not len(inputs):
-            raise ValueError("Needed a non-empty string collection of channels.")
-        for channel in inputs:
-            if not isinstance(channel, str):
-                raise TypeError("Expected a string name for each channel,"
-                                " not %s" % str(channel))
+        >>> reader.collect_data(["AIN0"], [10.0], None, 10000,
+                                ring_rows=60 * 10000)
 
-        # Input validation for inputs_max_voltages
-        if not len(inputs_max_voltages):
-            raise ValueError("Needed a non-empty numerical collection of values.")
-        for channel in inputs:
-            if not isinstance(channel, str):
-                raise TypeError("Expected a numerical value, not %s"
-                                % str(channel))
+        Print the mean of each packet of AIN0 as it arrives:
 
-        # Input validation for seconds
-        if seconds <= 0:
-            raise ValueError("Invalid duration for data collection.")
+        >>> def print_mean(block, start_row, device_time, host_time):
+        >>>     print("%f s: %f" % (device_time, block[:, 0].mean()))
+        >>> reader.collect_data(["AIN0"], [10.0], 60.5, 10000,
+                                block_callback=print_mean)
 
-        # Input validation for frequency
-        if frequency <= 0:
-            raise ValueError("Invalid frequency provided for frequency.")
+        Save everything to an HDF5 file from a background thread as it is
+        recorded:
 
-        # Open a connection.
-        self.open(verbose=verbose)
+        >>> from labjackcontroller.sinks import HDF5Writer
+        >>> reader.collect_data(["AIN0"], [10.0], 3600, 10000,
+                                sinks=[HDF5Writer("run.h5")])
 
-        # Close the stream if it was already open; this is done
-        # to prevent unexpected termination from last time messing
-        # up the connection this time.
-        self._close_stream()
+        Keep a long recording of analog and digital channels in less memory:
 
-        num_addrs = len(inputs)
+        >>> reader.collect_data(["AIN0", "DIO2"], [10.0], 3600, 10000,
+                                layout="columnar")
 
-        # Create a RawArray for multiple processes; this array
-        # stores our data.
-        size = int(seconds * frequency * (len(inputs) + 2))
+        """
 
-        frequency, scans_per_read = self._setup(inputs, inputs_max_voltages,
-                                                resolution,
-                                                frequency,
-                                                scans_per_read=scans_per_read)
+        # Input validation for seconds
+        if seconds is None and ring_rows is None:
+            raise ValueError("Runs without a duration need ring_rows to be"
+                             " specified.")
+        if seconds is not None and seconds <= 0:
+            raise ValueError("Invalid duration for data collection.")
+        if ring_rows is not None and ring_rows <= 0:
+            raise ValueError("Invalid number of rows for a ring buffer.")
+
+        storage_kind, storage_location = parse_storage(storage)
+        if layout not in ("interleaved", "columnar"):
+            raise ValueError("Invalid layout %s." % str(layout))
+        if layout == "columnar" and storage_kind != "memory":
+            raise ValueError("The columnar layout only supports in-memory"
+                             " storage.")
+        if host_time not in ("stored", "export"):
+            raise ValueError("Invalid host_time %s." % str(host_time))
+        if host_time == "export" and storage_kind != "memory":
+            raise ValueError("Exporting host times only supports in-memory"
+                             " storage.")
+
+        # The run ends once this many rows are recorded, if it has a
+        # duration.
+        rows_to_collect = None if seconds is None \
+            else int(seconds * frequency)
+
+        columns, frequency, scans_per_read = \
+            self._start_stream(inputs, inputs_max_voltages, frequency,
+                               scans_per_read=scans_per_read,
+                               resolution=resolution,
+                               digital_ports=digital_ports, trigger=trigger,
+                               trigger_edge=trigger_edge, verbose=verbose)
+        num_addrs = len(columns)
+        self._rows_to_collect = rows_to_collect
+        size = (self._rows_to_collect or 0) * (num_addrs + 2)
 
         if verbose:
             print("[%26s] %15s / %15s %5s  %15s %15s"
                   % ("Time", "Max Index", "Total Indices", "%",
                      "Scans on Device", "Scans on LJM"))
 
-        self._input_channels = inputs
-
-        total_skip = 0  # Total skipped samples
-
-        packet_num = 0
-        self.max_index = 0
-        step_size = len(inputs)
-
-        self._data_arr = (ctypes.c_double * size)(size)
-
-        all_waiting = []
-        with Pool(processes=num_threads) as threadpool:
-            start = _time_func()
-            while self.max_index < size:
-                # Read all rows of data off of the latest packet in the stream.
-                ret = self._ljm_reference.stream_read(self._handle)
-                curr_data = ret[0]
+        total_skip = 0  # Total skipped scans
+
+        self._host_clock = HostClock(frequency)
+        exported_clock = self._host_clock if host_time == "export" else None
+        self._envelope = EnvelopePyramid(num_addrs, frequency) if envelope \
+            else None
+
+        num_rows = self._rows_to_collect if ring_rows is None else ring_rows
+        if storage_kind == "mmap":
+            self._storage = SampleBuffer.create_mmap(
+                storage_location, num_rows, num_addrs + 2,
+                ring=ring_rows is not None, channels=columns,
+                scan_rate=frequency)
+        elif storage_kind == "shm":
+            self._storage = SampleBuffer.create_shm(
+                storage_location, num_rows, num_addrs + 2,
+                ring=ring_rows is not None, channels=columns,
+                scan_rate=frequency)
+        elif layout == "columnar":
+            self._storage = ColumnarSampleBuffer(
+                num_rows, num_addrs + 2, ring=ring_rows is not None,
+                channels=columns, scan_rate=frequency,
+                digital=[is_digital_channel(name) for name in columns],
+                analog_dtype=analog_dtype, pack_digital=pack_digital,
+                host_clock=exported_clock)
+        else:
+            self._storage = SampleBuffer(num_rows, num_addrs + 2,
+                                         ring=ring_rows is not None,
+                                         channels=columns,
+                                         scan_rate=frequency,
+                                         host_clock=exported_clock)
+
+        sinks = list(sinks or [])
+        if sinks:
+            self._open_sinks(sinks, frequency, scans_per_read, resolution)
+
+        executors = []
+        if callback_function:
+            executors.append(CallbackExecutor(callback_function,
+                                              mode=callback_executor,
+                                              num_workers=num_threads,
+                                              max_pending=max_pending,
+                                              overflow_policy=overflow_policy))
+
+        start = _time_func()
+        self._start_time = start
+        blocks = self._read_blocks(frequency, scans_per_read, start=start)
+        with self._closing([blocks] + sinks + executors):
+            for curr_data, device_time, arrival_time, backlog in blocks:
+                # Fit the packet's arrival against its last scan, and map
+                # every scan onto the host clock with the result.
+                first_scan = self._storage.rows_written
+                self._host_clock.add(first_scan + len(curr_data) - 1,
+                                     arrival_time)
+                first_row, num_rows = self._store_block(
+                    curr_data, device_time,
+                    self._host_clock.stamp(first_scan, len(curr_data))
+                    if exported_clock is None else 0.0)
+                if self._envelope is not None:
+                    self._envelope.add(curr_data[:num_rows])
+
+                # Skipped scans are indicated by -9999 values. Missed
+                # samples occur after a device's stream buffer overflows
+                # and are reported after auto-recover mode ends. Storage
+                # finds and indexes them as it writes each block.
+                curr_skip = self._storage.gaps.num_skipped - total_skip
+                if curr_skip:
+                    total_skip += curr_skip
+                    print("Scans Skipped = %0.0f" % curr_skip)
+
+                if (sinks or executors or block_callback) and num_rows:
+                    block = self._storage.view(first_row, first_row + num_rows)
+                    for sink in sinks:
+                        sink.write_block(block, first_row)
+                    for executor in executors:
+                        executor.submit(block)
+                    if block_callback:
+                        block_callback(block, first_row, block[0, -2],
+                                       arrival_time)
 
                 if verbose:
                     print("[%26s] %15d / %15d %4.1d%% %15d %15d"
                           % (datetime.datetime.now(), self.max_index, size,
                              ((float(self.max_index) / float(size)) * 100
-                             if self.max_index else 0), ret[1], ret[2]))
-
-                for i in range(0, len(curr_data), step_size):
-                    # Ensure that this packet won't overflow our buffer.
-                    if self._max_index >= size:
-                        break
-
-                    # We will manually calculate the times each entry occurs
-                    # at.
-                    # The stream itself is timed by the same clock that runs
-                    # CORE_TIMER, and it is officially advised we use the
-                    # stream clocking instead.
-                    # See https://forums.labjack.com/index.php?showtopic=6992
-                    curr_time = (scans_per_read / frequency) * (packet_num + (i / len(curr_data)))
-
-                    # We get a giant 1D list back, so work with what we have.
-                    self._data_arr[self._max_index: self._max_index + step_size] =\
-                        curr_data[i:i + step_size]
-                    self._max_index += step_size
-
-                    # Put in the time as well
-                    self._data_arr[self._max_index] = curr_time
-                    self._max_index += 1
-                    self._data_arr[self._max_index] = _time_func() - start
-                    self._max_index += 1
-
-                    if callback_function:
-                        all_waiting.append(threadpool.apply_async(callback_function,
-                                            (self._data_arr[self._max_index - step_size - 2: self._max_index],)))
-
-                if callback_function:
-                    for waiting_thread in all_waiting:
-                        if waiting_thread.ready():
-                            waiting_thread.get()
-            
-            # Outside of data gathering. Close all.
-            while callback_function and len(all_waiting):
-                for i in range(len(all_waiting)):
-                    if all_waiting[i].ready():
-                        all_waiting[i].get()
-                        del all_waiting[i]
-                        break
+                             if self.max_index and size else 0),
+                             backlog[0], backlog[1]))
 
-            packet_num += 1
-
-            # Count the skipped samples which are indicated by -9999 values
-            # Missed samples occur after a device's stream buffer overflows
-            # and are reported after auto-recover mode ends.
-            curr_skip = 0
-            for value in curr_data:
-                if value == -9999.0:
-                    curr_skip += 1
-
-            total_skip += curr_skip
-
-            ainStr = ""
-            for j in range(0, num_addrs):
-                ainStr += "%s = %0.5f, " % (inputs[j], curr_data[j])
-            if curr_skip:
-                print("Scans Skipped = %0.0f" % (curr_skip/num_addrs))
+                if self._rows_to_collect is not None \
+                        and self._storage.rows_written \
+                        >= self._rows_to_collect:
+                    break
 
         # We are done, record the actual ending time.
         end = _time_func()
+        self._storage.flush()
 
         total_time = end - start
         if verbose:
@@ -1696,14 +2708,205 @@ class LabjackReader(object):
                   % (self.max_index, total_time, frequency,
                      (self.max_index / total_time),
                      (self.max_index * num_addrs / total_time),
-                     (total_skip / num_addrs)))
+                     total_skip))
 
-        # Close the connection.
-        self._close_stream()
+        self._callback_stats = executors[0].stats if executors \
+            else {"completed": 0, "dropped": 0, "coalesced": 0}
 
-        return total_time, (total_skip / num_addrs)
+        return total_time, total_skip
 
-    def to_array(self, mode="all", **kwargs) -> Union[List[List[float]], None]:
+    def astream(self, inputs: List[str], inputs_max_voltages: List[float],
+                frequency: int, scans_per_read=-1, resolution=4,
+                digital_ports="unpacked", max_blocks=16, trigger=None,
+                trigger_edge="rising", verbose=False) -> AsyncBlockStream:
+        """
+        Stream from the LabJack device as an asynchronous iterator of
+        packets, for use from an asyncio event loop.
+
+        Nothing is recorded to this reader's storage; every packet is handed
+        to the consumer as a StreamBlock, and is its own copy. The stream
+        runs until the iterator is closed, the task iterating it is
+        cancelled, or stop is called.
+
+        Parameters
+        ----------
+        inputs, inputs_max_voltages, frequency, scans_per_read, resolution
+            See collect_data.
+        digital_ports : str, optional
+            See collect_data.
+        max_blocks : int, optional
+            The most packets that can wait to be consumed. Once reached,
+            packets wait in the device's buffer instead.
+        trigger, trigger_edge : str, optional
+            See collect_data.
+        verbose : bool, optional
+            Print information about opening the device.
+
+        Returns
+        -------
+        AsyncBlockStream
+            An asynchronous iterator of StreamBlock.
+
+        Examples
+        --------
+        Print the mean of every packet of AIN0 until the task is cancelled:
+
+        >>> async def monitor(reader):
+        >>>     async with reader.astream(["AIN0"], [10.0], 1000) as stream:
+        >>>         async for block in stream:
+        >>>             print(block.host_time, block.rows[:, 0].mean())
+        """
+        return AsyncBlockStream(
+            self.iter_blocks(inputs, inputs_max_voltages, frequency,
+                             scans_per_read=scans_per_read,
+                             resolution=resolution,
+                             digital_ports=digital_ports, trigger=trigger,
+                             trigger_edge=trigger_edge, verbose=verbose),
+            max_blocks)
+
+    def iter_blocks(self, inputs: List[str],
+                    inputs_max_voltages: List[float], frequency: int,
+                    seconds: Union[float, None] = None, scans_per_read=-1,
+                    resolution=4, digital_ports="unpacked", sinks=None,
+                    trigger=None, trigger_edge="rising",
+                    verbose=False) -> Iterator[StreamBlock]:
+        """
+        Stream from the LabJack device as a generator of packets.
+
+        The device is only read when the next packet is asked for, so the
+        caller sets the pace; packets not yet asked for wait in the
+        device's and LJM's buffers, as StreamBlock.backlog shows. Nothing is
+        recorded to this reader's storage, and the arrays of each block are
+        reused for the next one, so a pipeline built on this runs in
+        constant memory. Copy anything that needs to be kept.
+
+        The stream stops once seconds have been read, stop is called, or
+        the generator is closed.
+
+        Parameters
+        ----------
+        inputs, inputs_max_voltages, frequency
+            See collect_data.
+        seconds : float, optional
+            How long to stream for. By default, streams until stopped.
+        scans_per_read, resolution, digital_ports
+            See collect_data.
+        sinks : sequence of Sink, optional
+            Objects that are handed every packet's rows, with time columns,
+            as in collect_data. Use these to keep a record of the stream,
+            such as with a labjackcontroller.sinks.HDF5Writer.
+        trigger, trigger_edge : str, optional
+            See collect_data. The first packet is yielded once the trigger
+            has come.
+        verbose : bool, optional
+            Print information about opening the device.
+
+        Yields
+        ------
+        StreamBlock
+            Each packet read, only valid until the next is asked for.
+
+        Examples
+        --------
+        Track the peak of AIN0 over ten minutes, holding one packet at a
+        time in memory:
+
+        >>> peak = -np.inf
+        >>> for block in reader.iter_blocks(["AIN0"], [10.0], 10000, 600):
+        >>>     peak = max(peak, block.rows[:, 0].max())
+        """
+        if seconds is not None and seconds <= 0:
+            raise ValueError("Invalid duration for data collection.")
+
+        columns, frequency, scans_per_read = \
+            self._start_stream(inputs, inputs_max_voltages, frequency,
+                               scans_per_read=scans_per_read,
+                               resolution=resolution,
+                               digital_ports=digital_ports, trigger=trigger,
+                               trigger_edge=trigger_edge, verbose=verbose)
+        scans_to_read = None if seconds is None else int(seconds * frequency)
+
+        sinks = list(sinks or [])
+        if sinks:
+            self._open_sinks(sinks, frequency, scans_per_read, resolution)
+            sink_rows = np.empty((scans_per_read, len(columns) + 2))
+
+        scans_read = 0
+        blocks = self._read_blocks(frequency, scans_per_read)
+        with self._closing([blocks] + sinks):
+            for block in blocks:
+                if scans_to_read is not None \
+                        and scans_read + len(block.rows) > scans_to_read:
+                    num_scans = scans_to_read - scans_read
+                    block = block._replace(
+                        rows=block.rows[:num_scans],
+                        device_time=block.device_time[:num_scans])
+
+                if sinks:
+                    rows = sink_rows[:len(block.rows)]
+                    rows[:, :-2] = block.rows
+                    rows[:, -2] = block.device_time
+                    rows[:, -1] = block.host_time
+                    for sink in sinks:
+                        sink.write_block(rows, scans_read)
+
+                scans_read += len(block.rows)
+                yield block
+
+                if scans_to_read is not None and scans_read >= scans_to_read:
+                    break
+
+    def query_envelope(self, channel: Union[str, int], t0: float, t1: float,
+                       max_points=2000) -> Envelope:
+        """
+        Get the min/max/mean envelope of a channel between two device times,
+        in about max_points bins, from the pyramid kept by collect_data
+        with envelope=True. The cost depends on max_points only, not on the
+        length of the run or of the span, as recorded rows are not read.
+        It can be called from another thread while data is collected.
+
+        Parameters
+        ----------
+        channel : Union[str, int]
+            The name of a channel, as passed to collect_data, or its index.
+        t0, t1 : float
+            The span of device time to cover, in seconds since the start of
+            the run.
+        max_points : int, optional
+            The number of bins to aim for. See EnvelopePyramid.query.
+
+        Returns
+        -------
+        Envelope
+            The start time, minimum, maximum and mean of each bin.
+
+        Raises
+        ------
+        ValueError
+            If no envelope was kept, or channel was not recorded.
+
+        Examples
+        --------
+        Plot the outline of an hour of AIN0 at 1000 points:
+
+        >>> reader.collect_data(["AIN0"], [10.0], 3600, 10000, envelope=True)
+        >>> env = reader.query_envelope("AIN0", 0, 3600, 1000)
+        >>> plt.fill_between(env.time, env.min, env.max)
+        """
+        if self._envelope is None:
+            raise ValueError("No envelope was kept; collect data with"
+                             " envelope=True.")
+        if isinstance(channel, str):
+            if channel not in self._input_channels:
+                raise ValueError("Channel %s was not recorded." % channel)
+            channel = self._input_channels.index(channel)
+        elif not 0 <= channel < self._envelope.num_columns:
+            raise ValueError("Invalid channel index %d." % channel)
+
+        return self._envelope.query(channel, t0, t1, max_points=max_points)
+
+    def to_array(self, mode="all", skipped=None,
+                 **kwargs) -> Union[np.ndarray, None]:
         """
         Return data in latest array.
 
@@ -1720,14 +2923,23 @@ class LabjackReader(object):
             'range'
                 Retrieves a range of rows. Expects the kwargs 'start' and
                 'end'.
+        skipped: str, optional
+            How to return skipped samples, which the device reports as
+            -9999.0. By default they are left as they are. 'nan' replaces
+            them with NaN. 'interpolate' replaces them by linear
+            interpolation, over device time, between the nearest samples
+            of the same channel that were not skipped. Either way, a copy
+            is returned if any sample was skipped.
 
         Returns
         -------
         array_like: numpy.ndarray
             A 2D array in the shape
-            (ceil(1d data len/ (number of channels + 2), number of channels + 2)
+            (number of rows, number of channels + 2)
             Final two columns are the LabJack device's time in nanoseconds, and
-            the host system's time, also in nanoseconds.
+            the host system's time, also in nanoseconds. The array is a
+            read-only view of the internal array rather than a copy; use
+            numpy.copy on it if you need to modify it.
 
         Examples
         --------
@@ -1769,20 +2981,27 @@ class LabjackReader(object):
         -----
         If the internal data array has not been initialized yet, the return
         value of this function will be None.
+
+        Rows are numbered from the start of the run. When data was collected
+        with ring_rows, only the latest rows are held: 'all' returns those,
+        'relative' can reach back as far as the oldest of them, and 'range'
+        must start at or after it. Rows that wrap around the end of the ring
+        are returned as a copy rather than a view.
         """
-        max_row = self.max_index
+        if skipped is not None:
+            return self._fill_skipped(self.to_array(mode, **kwargs), skipped)
+
+        max_row = self.max_row
         if max_row < 0:
             return None
-
-        row_width = len(self._input_channels) + 2
-        max_row = int(max_row / row_width)
+        first_row = self._storage.first_row
 
         if mode == "all" or mode == 'all':
-            return self._reshape_data(0, max_row)
+            return self._reshape_data(first_row, max_row)
         elif mode == "range" or mode == 'range':
             if "start" in kwargs and "end" in kwargs:
                 from_range, to_range = kwargs["start"], kwargs["end"]
-                if 0 <= from_range < to_range and to_range < max_row:
+                if first_row <= from_range < to_range and to_range < max_row:
                     return self._reshape_data(from_range, to_range)
                 else:
                     raise Exception("Invalid range provided of [%d, %d]"
@@ -1792,7 +3011,8 @@ class LabjackReader(object):
                                 " be specified in range mode.")
         elif mode == "relative" or mode == 'relative':
             if "num_rows" in kwargs:
-                if kwargs["num_rows"] < 0 or kwargs["num_rows"] > max_row:
+                if kwargs["num_rows"] < 0 \
+                   or kwargs["num_rows"] > max_row - first_row:
                     raise Exception("Invalid number of rows provided")
                 else:
                     return self._reshape_data(max_row - kwargs["num_rows"],
@@ -1801,6 +3021,39 @@ class LabjackReader(object):
                 raise Exception("Number of rows must be specified in"
                                 " relative mode.")
 
+    @staticmethod
+    def _fill_skipped(data: Union[np.ndarray, None],
+                      method: str) -> Union[np.ndarray, None]:
+        """
+        Replace the skipped samples of rows returned by to_array, as
+        described by its skipped parameter.
+        """
+        if method not in ("nan", "interpolate"):
+            raise ValueError("Invalid method %s for skipped samples."
+                             % str(method))
+
+        if data is None:
+            return None
+        mask = data[:, :-2] == -9999.0
+        if not mask.any():
+            return data
+
+        data = data.copy()
+        if method == "nan":
+            data[:, :-2][mask] = np.nan
+            return data
+
+        device_time = data[:, -2]
+        for column in np.flatnonzero(mask.any(axis=0)):
+            bad = mask[:, column]
+            if bad.all():
+                data[:, column] = np.nan
+            else:
+                data[bad, column] = np.interp(device_time[bad],
+                                              device_time[~bad],
+                                              data[~bad, column])
+        return data
+
     def to_dataframe(self, mode="all", **kwargs):
         """
         Gets this object's recorded data in dataframe form.
@@ -1821,6 +3074,8 @@ class LabjackReader(object):
                 Retrieves a range of rows. Expects the kwargs 'start'
                 and 'end'.
 
+        The kwarg 'skipped' is handled as by to_array.
+
         Returns
         -------
         table: pandas.DataFrame
@@ -1839,8 +3094,597 @@ class LabjackReader(object):
         -----
         If the internal data array has not been initialized yet, behavior
         is undefined.
+
+        The dataframe is built on top of the read-only array returned by
+        to_array, without copying it.
         """
 
         return pd.DataFrame(self.to_array(mode, **kwargs),
                             columns=self._input_channels
-                            + ["Time", "System Time"])
+                            + ["Time", "System Time"], copy=False)
+
+    def read_since(self, cursor=0, max_rows: Union[int, None] = None) \
+            -> Tuple[np.ndarray, int]:
+        """
+        Copy the rows recorded since a cursor, for consumers that poll a run
+        while collect_data records it. Each consumer keeps its own cursor,
+        and pays only for the rows recorded since its last read.
+
+        Parameters
+        ----------
+        cursor : int, optional
+            The number of the first row not yet read, as returned by the
+            previous read. Start from 0.
+        max_rows : int, optional
+            The most rows to return. The rest are left for the next read.
+
+        Returns
+        -------
+        rows : numpy.ndarray
+            A 2D array of a copy of the new rows, laid out as by to_array.
+            Has no rows if nothing was recorded since cursor.
+        cursor : int
+            The cursor to read from next.
+
+        Notes
+        -----
+        The rows returned are consistent even while collect_data is
+        recording: only rows whose write has completed are read. When
+        recording into a ring buffer, rows overwritten before they could be
+        read are skipped, in which case the returned cursor less the number
+        of rows returned is greater than the cursor given. A reader attached
+        to storage written by another process cannot see that process's
+        writes in progress, so it should poll often enough that the rows it
+        reads are not overwritten while it copies them.
+
+        Cursors refer to the rows of the current run. A cursor past the end
+        of the run, such as one from a longer previous run, is returned as
+        is with no rows.
+        """
+        width = len(self._input_channels) + 2
+        storage = self._storage
+        if storage is None:
+            return np.empty((0, width)), cursor
+
+        while True:
+            end = storage.rows_written
+            start = max(cursor, storage.first_intact_row)
+            if max_rows is not None:
+                end = min(end, start + max_rows)
+            if start >= end:
+                return np.empty((0, width)), max(cursor, end)
+
+            try:
+                rows = np.array(storage.view(start, end))
+            except ValueError:
+                # The rows were overwritten before the copy began.
+                continue
+
+            # Rows the writer may have overwritten during the copy.
+            overwritten = storage.first_intact_row - start
+            if overwritten > 0:
+                rows = rows[overwritten:]
+            return rows, end
+
+    def iter_record_batches(self, batch_rows=65536) -> Iterator:
+        """
+        Get this object's recorded data as a sequence of Apache Arrow
+        record batches, built one at a time straight from the internal
+        array. Requires the pyarrow package.
+
+        Parameters
+        ----------
+        batch_rows: int, optional
+            The largest number of rows in each batch.
+
+        Returns
+        -------
+        Iterator[pyarrow.RecordBatch]
+            Batches with the same columns as to_dataframe. Only the rows
+            recorded when iteration starts are included.
+
+        Notes
+        -----
+        Only one batch is held in memory at a time, however long the run.
+        """
+        import pyarrow as pa
+
+        if batch_rows <= 0:
+            raise ValueError("Invalid number of rows per batch.")
+
+        max_row = self.max_row
+        if max_row < 0:
+            return
+
+        schema = self._arrow_schema()
+        for from_row in range(self._storage.first_row, max_row, batch_rows):
+            rows = self._reshape_data(from_row,
+                                      min(from_row + batch_rows, max_row))
+            yield pa.RecordBatch.from_arrays(
+                [pa.array(np.ascontiguousarray(rows[:, i]))
+                 for i in range(rows.shape[1])], schema=schema)
+
+    def export_parquet(self, path: str, row_group_rows=65536,
+                       compression="snappy") -> int:
+        """
+        Write this object's recorded data to a Parquet file, one row group
+        at a time. Requires the pyarrow package.
+
+        Parameters
+        ----------
+        path: str
+            The file to write.
+        row_group_rows: int, optional
+            The largest number of rows in each row group.
+        compression: str, optional
+            The Parquet compression codec to use, such as "snappy", "zstd"
+            or "none".
+
+        Returns
+        -------
+        int
+            The number of rows written.
+
+        Notes
+        -----
+        Memory used while exporting is proportional to one row group, not
+        to the whole run, as no dataframe of the run is built.
+        """
+        import pyarrow.parquet as pq
+
+        num_rows = 0
+        with pq.ParquetWriter(path, self._arrow_schema(),
+                              compression=compression) as writer:
+            for batch in self.iter_record_batches(batch_rows=row_group_rows):
+                writer.write_batch(batch, row_group_size=row_group_rows)
+                num_rows += batch.num_rows
+
+        return num_rows
+
+    def _arrow_schema(self):
+        """
+        Get the Arrow schema of this object's recorded data, with the scan
+        rate stored as schema metadata.
+        """
+        import pyarrow as pa
+
+        columns = list(self._input_channels) + ["Time", "System Time"]
+        metadata = {}
+        if self._storage is not None:
+            metadata["scan_rate"] = str(self._storage.scan_rate)
+        return pa.schema([(name, pa.float64()) for name in columns],
+                         metadata=metadata)
+
+
+class IncrementalFrame(object):
+    """
+    A DataFrame of the rows a LabjackReader records, kept up to date by
+    appending only the rows recorded since the last update.
+
+    The rows are copied into an array with room to grow, so each update
+    costs time proportional to the new rows, and the frame is built on top
+    of the array without copying it.
+
+    Attributes
+    ----------
+    reader : LabjackReader
+        The reader read from.
+    cursor : int
+        The number of the first row not yet read. See
+        LabjackReader.read_since.
+    max_rows : Union[int, None]
+        The most rows kept, or None to keep every row read. The oldest rows
+        are dropped first.
+
+    Examples
+    --------
+    >>> frame = IncrementalFrame(reader)
+    >>> while reader.connection_status:
+    >>>     print(frame.update()["AIN0"].mean())
+    >>>     time.sleep(1)
+    """
+
+    def __init__(self, reader: LabjackReader, cursor=0,
+                 max_rows: Union[int, None] = None) -> None:
+        """
+        Parameters
+        ----------
+        reader : LabjackReader
+            The reader to read from.
+        cursor : int, optional
+            The number of the first row to read.
+        max_rows : int, optional
+            The most rows to keep. Defaults to every row read.
+        """
+        if max_rows is not None and max_rows <= 0:
+            raise ValueError("Invalid maximum number of rows.")
+
+        self.reader = reader
+        self.cursor = cursor
+        self.max_rows = max_rows
+        self._columns = list(reader._input_channels) \
+            + ["Time", "System Time"]
+        # Room for twice the rows kept, so kept rows are only moved once
+        # every max_rows rows appended.
+        self._data = np.empty((2 * max_rows if max_rows else 1024,
+                               len(self._columns)))
+        self._start = 0
+        self._end = 0
+        self._frame = None
+
+    @property
+    def frame(self) -> pd.DataFrame:
+        """
+        Get the rows read so far as a DataFrame, with the columns of
+        LabjackReader.to_dataframe. Do not modify it.
+        """
+        if self._frame is None:
+            self._frame = pd.DataFrame(self._data[self._start:self._end],
+                                       columns=self._columns, copy=False)
+        return self._frame
+
+    def update(self) -> pd.DataFrame:
+        """
+        Append the rows recorded since the last update.
+
+        Returns
+        -------
+        pandas.DataFrame
+            The rows read so far. See frame.
+        """
+        rows, self.cursor = self.reader.read_since(self.cursor)
+        if len(rows):
+            if self.max_rows is not None and len(rows) >= self.max_rows:
+                rows = rows[-self.max_rows:]
+                self._start = self._end
+            self._make_room(len(rows))
+            self._data[self._end:self._end + len(rows)] = rows
+            self._end += len(rows)
+            if self.max_rows is not None:
+                self._start = max(self._start, self._end - self.max_rows)
+            self._frame = None
+        return self.frame
+
+    def _make_room(self, num_rows: int) -> None:
+        """
+        Make sure num_rows more rows fit after the last row kept, moving the
+        kept rows to the front, or into a larger array.
+        """
+        if self._end + num_rows <= len(self._data):
+            return
+
+        kept = self._end - self._start
+        if self.max_rows is not None:
+            # Only the rows still kept after the new ones are appended move.
+            drop = max(0, kept + num_rows - self.max_rows)
+            self._start += drop
+            kept -= drop
+        size = len(self._data)
+        while kept + num_rows > size:
+            size *= 2
+        # Frames handed out keep the old array, so never move rows in place.
+        data = np.empty((size, len(self._columns)))
+        data[:kept] = self._data[self._start:self._end]
+        self._data, self._start, self._end = data, 0, kept
+
+
+class MultiLabjackReader(object):
+    """
+    Streams from several LabJack devices at once, and aligns their data on a
+    common timebase.
+
+    Each device is read by its own LabjackReader, on its own thread; LJM
+    releases the GIL while it waits for a packet, so the devices are read
+    in parallel. Every reader fits the arrival of its packets against scan
+    number (see LabjackReader.host_clock), which places each of its scans on
+    the host's clock. The common timebase is that clock, in seconds since
+    the earliest device started recording.
+
+    Attributes
+    ----------
+    readers : List[LabjackReader]
+        The reader of each device, in the order the devices were given.
+
+    Examples
+    --------
+    Record 60 seconds from AIN0 of two T7s, and get their data with one row
+    per scan of the first device:
+
+    >>> multi = MultiLabjackReader([("T7", "ANY", 470010001),
+                                    ("T7", "ANY", 470010002)])
+    >>> multi.collect_data(["AIN0"], [10.0], 60, 1000)
+    >>> multi.to_array()
+    """
+
+    # Stops every reader of the collect_data run in progress, if any.
+    _stop_event = None
+
+    def __init__(self, devices: list) -> None:
+        """
+        Parameters
+        ----------
+        devices : list
+            One entry per device. Each is a LabjackReader, a device type
+            such as "T7", or a tuple of the arguments of LabjackReader.
+
+        Raises
+        ------
+        ValueError
+            If no devices are given.
+        """
+        if not len(devices):
+            raise ValueError("Expected at least one device.")
+
+        self.readers = []
+        for device in devices:
+            if isinstance(device, LabjackReader):
+                self.readers.append(device)
+            elif isinstance(device, str):
+                self.readers.append(LabjackReader(device))
+            else:
+                self.readers.append(LabjackReader(*device))
+
+    def __len__(self) -> int:
+        return len(self.readers)
+
+    def __getitem__(self, device: int) -> LabjackReader:
+        return self.readers[device]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _per_device(self, value, name: str) -> list:
+        """
+        Expand an argument given either once for every device, or as a list
+        with one entry per device.
+        """
+        if isinstance(value, (list, tuple)) and len(value) \
+                and isinstance(value[0], (list, tuple)):
+            if len(value) != len(self.readers):
+                raise ValueError("Expected %s for each of %d devices."
+                                 % (name, len(self.readers)))
+            return list(value)
+        return [value] * len(self.readers)
+
+    @property
+    def columns(self) -> List[str]:
+        """
+        Get the names of the columns of the merged array: each channel of
+        each device, as "<device>:<channel>", followed by "Time".
+        """
+        return ["%d:%s" % (i, channel)
+                for i, reader in enumerate(self.readers)
+                for channel in reader._input_channels] + ["Time"]
+
+    def collect_data(self, inputs: list, inputs_max_voltages: list,
+                     seconds: float, frequency: int, storage=None,
+                     **kwargs) -> List[Tuple[float, float]]:
+        """
+        Collect data from every device at once, each on its own thread.
+
+        Parameters
+        ----------
+        inputs : list
+            The channels to read, either as one list used for every device,
+            or as a list of lists with one per device.
+        inputs_max_voltages : list
+            The maximum voltage of each channel, given like inputs.
+        seconds : float
+            How long to collect data for.
+        frequency : int
+            The scan rate requested of every device.
+        storage : list, optional
+            Where each device stores its rows, with one entry per device.
+            See LabjackReader.collect_data.
+        kwargs
+            Any other argument of LabjackReader.collect_data, which is
+            passed to every device.
+
+        Returns
+        -------
+        List[Tuple[float, float]]
+            What collect_data returned for each device.
+
+        Raises
+        ------
+        ValueError
+            If inputs, inputs_max_voltages or storage do not match the
+            number of devices.
+        Exception
+            The first exception raised while reading any device. Every
+            other device is stopped when one fails.
+        """
+        inputs = self._per_device(inputs, "inputs")
+        inputs_max_voltages = self._per_device(inputs_max_voltages,
+                                               "inputs_max_voltages")
+        if storage is None:
+            storage = [None] * len(self.readers)
+        elif len(storage) != len(self.readers):
+            raise ValueError("Expected storage for each of %d devices."
+                             % len(self.readers))
+
+        results = [None] * len(self.readers)
+        errors = []
+
+        # Set before any thread starts, so a device that fails stops every
+        # other, even those still setting up their stream.
+        self._stop_event = threading.Event()
+        for reader in self.readers:
+            reader._shared_stop = self._stop_event
+
+        def run(i: int) -> None:
+            try:
+                results[i] = self.readers[i].collect_data(
+                    inputs[i], inputs_max_voltages[i], seconds, frequency,
+                    storage=storage[i], **kwargs)
+            except Exception as e:
+                errors.append(e)
+                self.stop()
+
+        threads = [threading.Thread(target=run, args=(i,), daemon=True)
+                   for i in range(len(self.readers))]
+        try:
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            for reader in self.readers:
+                reader._shared_stop = None
+            self._stop_event = None
+
+        if errors:
+            raise errors[0]
+        return results
+
+    def stop(self) -> None:
+        """
+        Stop every device's stream once the packet being read is stored,
+        including those of a collect_data run that are still starting.
+
+        Returns
+        -------
+        None
+        """
+        if self._stop_event is not None:
+            self._stop_event.set()
+        for reader in self.readers:
+            reader.stop()
+
+    def close(self) -> None:
+        """
+        Close every device.
+
+        Returns
+        -------
+        None
+        """
+        for reader in self.readers:
+            reader.close()
+
+    @property
+    def start_offsets(self) -> np.ndarray:
+        """
+        Get how many seconds each device started recording after the
+        earliest one did.
+        """
+        starts = np.array([reader._start_time for reader in self.readers],
+                          dtype=np.float64)
+        return starts - starts.min()
+
+    def timebase(self, device: int) -> Union[np.ndarray, None]:
+        """
+        Get the common time of every row a device holds, as returned by its
+        reader's to_array(mode="all").
+
+        Parameters
+        ----------
+        device : int
+            The index of the device.
+
+        Returns
+        -------
+        numpy.ndarray
+            The time of each row in seconds, or None if the device has not
+            recorded anything.
+
+        Raises
+        ------
+        ValueError
+            If the device was not recorded by collect_data.
+        """
+        reader = self.readers[device]
+        if reader.host_clock is None or reader._start_time is None:
+            raise ValueError("Device %d has no host clock fit." % device)
+        if reader.max_row < 0:
+            return None
+
+        first_row = reader._storage.first_row
+        times = reader.host_clock.predict(first_row,
+                                          reader.max_row - first_row)
+        times += self.start_offsets[device]
+        return times
+
+    def to_array(self, frequency: Union[float, None] = None,
+                 method="previous") -> Union[np.ndarray, None]:
+        """
+        Get the data of every device, resampled onto one common time grid.
+
+        The grid covers the time every device was recording, at frequency.
+        Each device's data is read off it by either holding the device's
+        latest sample at each grid time, or interpolating between the
+        samples either side. Skipped samples are left as -9999.0; use each
+        reader's to_array(skipped=...) to handle them before resampling.
+
+        Parameters
+        ----------
+        frequency : float, optional
+            The rate of the grid in Hz. Defaults to the lowest actual scan
+            rate among the devices.
+        method : str, optional
+            "previous" takes each device's latest sample at or before each
+            grid time, which keeps digital lines at 0 or 1. "linear"
+            interpolates linearly between samples.
+
+        Returns
+        -------
+        numpy.ndarray
+            A 2D array with a column per channel of each device, in the
+            order of the columns property, and the common time last. None
+            if a device has not recorded anything.
+
+        Raises
+        ------
+        ValueError
+            If method is not valid.
+        """
+        if method not in ("previous", "linear"):
+            raise ValueError("Invalid method %s." % str(method))
+
+        times = [self.timebase(i) for i in range(len(self.readers))]
+        if any(device_times is None for device_times in times):
+            return None
+        if frequency is None:
+            frequency = min(reader._storage.scan_rate
+                            for reader in self.readers)
+
+        start = max(device_times[0] for device_times in times)
+        end = min(device_times[-1] for device_times in times)
+        num_rows = int((end - start) * frequency) + 1 if end >= start else 0
+        grid = start + np.arange(num_rows) / frequency
+
+        merged = np.empty((num_rows, len(self.columns)))
+        merged[:, -1] = grid
+        column = 0
+        for reader, device_times in zip(self.readers, times):
+            data = reader.to_array()
+            num_channels = len(reader._input_channels)
+            if method == "previous":
+                rows = np.searchsorted(device_times, grid, side="right") - 1
+                merged[:, column:column + num_channels] = \
+                    data[np.maximum(rows, 0), :num_channels]
+            else:
+                for channel in range(num_channels):
+                    merged[:, column + channel] = np.interp(
+                        grid, device_times, data[:, channel])
+            column += num_channels
+        return merged
+
+    def to_dataframe(self, frequency: Union[float, None] = None,
+                     method="previous") -> Union[pd.DataFrame, None]:
+        """
+        Get the merged data of every device as a pandas DataFrame. See
+        to_array.
+
+        Returns
+        -------
+        pandas.DataFrame
+            The merged data, with the columns of the columns property.
+        """
+        merged = self.to_array(frequency=frequency, method=method)
+        if merged is None:
+            return None
+        return pd.DataFrame(merged, columns=self.columns)
@@ -0,0 +1,437 @@
+import multiprocessing
+import os
+import signal
+import sys
+import threading
+import traceback
+from typing import List, Tuple, Union
+
+from .labtools import LabjackReader
+from .storage import SampleBuffer
+
+"""
+A module that provides ReaderProcess, which streams from a LabJack in a
+child process of its own, so that nothing the rest of the program does can
+hold up the stream.
+"""
+
+
+def _child_status(reader: LabjackReader) -> dict:
+    """
+    Describe the run a child process is recording.
+    """
+    storage = reader._storage
+    return {"rows_written": storage.rows_written if storage else 0,
+            "skipped": storage.gaps.num_skipped if storage else 0}
+
+
+def _run_reader(device_args: Tuple[str, str, str], collect_args: tuple,
+                collect_kwargs: dict, conn) -> None:
+    """
+    Record one run in a child process, answering control messages from the
+    parent on conn until it says to exit. Must be a module-level function
+    to be run by a spawned process.
+    """
+    # Interrupting the parent, such as with Ctrl-C, should not also
+    # interrupt the run; the parent stops it.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    reader = LabjackReader(*device_args)
+    # Unlike reader.stop, this also ends a run asked to stop before its
+    # stream started.
+    stop = threading.Event()
+    reader._shared_stop = stop
+    send_lock = threading.Lock()
+
+    def send(message: tuple) -> None:
+        with send_lock:
+            conn.send(message)
+
+    def listen() -> None:
+        ready = False
+        while True:
+            # Tell the parent once the run's shared memory exists with its
+            # header written, the earliest it can attach to it.
+            if not ready and reader._storage is not None:
+                send(("ready", None))
+                ready = True
+
+            try:
+                if not conn.poll(0.05):
+                    continue
+                request = conn.recv()
+            except EOFError:
+                # The parent has gone.
+                stop.set()
+                return
+            if request == "stop":
+                stop.set()
+            elif request == "status":
+                send(("status", _child_status(reader)))
+            elif request == "exit":
+                return
+
+    listener = threading.Thread(target=listen, daemon=True)
+    listener.start()
+
+    try:
+        total_time, _ = reader.collect_data(*collect_args, **collect_kwargs)
+    except BaseException:
+        send(("error", traceback.format_exc()))
+        exit_code = 1
+    else:
+        status = _child_status(reader)
+        status["total_time"] = total_time
+        send(("finished", status))
+        exit_code = 0
+    finally:
+        if reader.connection_status:
+            reader.close()
+
+    # The run's shared memory is removed once the reader is freed, so wait
+    # until the parent has attached to it.
+    listener.join()
+    reader = None
+    sys.exit(exit_code)
+
+
+class ReaderProcess(object):
+    """
+    Streams from a LabJack in a dedicated child process, which records into
+    shared memory that the parent reads without copying.
+
+    The child does nothing but read the stream, so its timing does not
+    depend on the work the parent does with the data, however much of the
+    GIL that takes. The parent controls the child with start, stop and
+    status messages, and restarts it if it crashes or its run fails, up to
+    max_restarts times. Each restart begins a new run, numbered from row 0.
+
+    Attributes
+    ----------
+    device_args : Tuple[str, str, str]
+        The device type, connection type and identifier the child opens.
+    storage : str
+        The shared memory the child records into, as "shm:<name>".
+    max_restarts : int
+        The most times the child is restarted.
+    restart_delay : float
+        The time in seconds to wait before restarting the child.
+    restarts : int
+        The number of times the child has been restarted.
+    error : Union[str, None]
+        The traceback of the last failed run, or a description of how the
+        child last crashed, or None.
+
+    Examples
+    --------
+    Record AIN0 at 10 kHz in the background until stopped, keeping the
+    latest minute, and plot it as it arrives:
+
+    >>> process = ReaderProcess("T7", name="session")
+    >>> process.start(["AIN0"], [10.0], 10000, ring_rows=60 * 10000)
+    >>> cursor = 0
+    >>> while plotting:
+    >>>     rows, cursor = process.reader.read_since(cursor)
+    >>>     plot(rows)
+    >>> process.stop()
+    """
+
+    # How long, in seconds, to wait for the child to answer a status
+    # request.
+    status_timeout = 1.0
+
+    def __init__(self, device_type: str, connection_type="ANY",
+                 identifier="ANY", name: Union[str, None] = None,
+                 max_restarts=5, restart_delay=1.0,
+                 start_method="spawn") -> None:
+        """
+        Parameters
+        ----------
+        device_type, connection_type, identifier : str
+            The device to open. See LabjackReader.
+        name : str, optional
+            The name of the shared memory segment to record into. Defaults
+            to one made from this process' ID. Other processes can read the
+            run with LabjackReader.attach("shm:<name>"). A segment of the
+            same name left by an earlier run is replaced.
+        max_restarts : int, optional
+            The most times to restart the child after it crashes.
+        restart_delay : float, optional
+            The time in seconds to wait before each restart.
+        start_method : str, optional
+            How to start the child. See multiprocessing.get_context. The
+            default of "spawn" starts it from a fresh interpreter, sharing
+            no state, such as LJM's, with this process.
+
+        Raises
+        ------
+        ValueError
+            If an option is not valid.
+        """
+        if max_restarts < 0:
+            raise ValueError("Invalid maximum number of restarts.")
+        if restart_delay < 0:
+            raise ValueError("Invalid restart delay.")
+
+        self.device_args = (device_type, connection_type, identifier)
+        if name is None:
+            name = "labjackcontroller_%d_%x" % (os.getpid(), id(self))
+        self.storage = "shm:" + name
+        self.max_restarts = max_restarts
+        self.restart_delay = restart_delay
+        self.restarts = 0
+        self.error = None
+        self._name = name
+        self._context = multiprocessing.get_context(start_method)
+        self._process = None
+        self._conn = None
+        self._send_lock = threading.Lock()
+        self._supervisor = None
+        self._stopping = threading.Event()
+        self._reader = None
+        self._last_status = {}
+        self._status_reply = None
+        self._status_ready = threading.Event()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    @property
+    def reader(self) -> Union[LabjackReader, None]:
+        """
+        Get a read-only LabjackReader of the run the child is recording, or
+        last recorded, or None if it has not started recording. Is replaced
+        by a reader of the new run when the child is restarted.
+        """
+        return self._reader
+
+    @property
+    def running(self) -> bool:
+        """
+        Whether a child is recording, or is being restarted.
+        """
+        return self._supervisor is not None and self._supervisor.is_alive()
+
+    def start(self, inputs: List[str], inputs_max_voltages: List[float],
+              frequency: int, seconds: Union[float, None] = None,
+              **kwargs) -> None:
+        """
+        Start a child process streaming, and supervise it.
+
+        Parameters
+        ----------
+        inputs, inputs_max_voltages, frequency, seconds
+            See LabjackReader.collect_data.
+        kwargs
+            Any other argument of LabjackReader.collect_data but storage.
+            Everything passed must be picklable.
+
+        Raises
+        ------
+        RuntimeError
+            If a child is already running.
+        ValueError
+            If an argument is not valid.
+        """
+        if self.running:
+            raise RuntimeError("The reader process is already running.")
+        if "storage" in kwargs:
+            raise ValueError("The reader process always records into"
+                             " shared memory.")
+        if seconds is None and kwargs.get("ring_rows") is None:
+            raise ValueError("Runs without a duration need ring_rows to be"
+                             " specified.")
+
+        collect_args = (inputs, inputs_max_voltages, seconds, frequency)
+        collect_kwargs = dict(kwargs, storage=self.storage)
+        self.restarts = 0
+        self.error = None
+        self._stopping.clear()
+        self._reset_run()
+        self._supervisor = threading.Thread(
+            target=self._supervise, args=(collect_args, collect_kwargs),
+            daemon=True)
+        self._supervisor.start()
+
+    def stop(self, timeout: Union[float, None] = None) -> bool:
+        """
+        Ask the child to end its run once it has stored the packet it is
+        reading, and wait for it to exit. The run stays readable from
+        reader.
+
+        Parameters
+        ----------
+        timeout : float, optional
+            The most time in seconds to wait. Waits as long as it takes by
+            default.
+
+        Returns
+        -------
+        bool
+            True if the child has exited.
+        """
+        self._stopping.set()
+        self._send("stop")
+        return self.wait(timeout)
+
+    def wait(self, timeout: Union[float, None] = None) -> bool:
+        """
+        Wait for the run to end, and the child to exit without being
+        restarted.
+
+        Parameters
+        ----------
+        timeout : float, optional
+            The most time in seconds to wait. Waits as long as it takes by
+            default.
+
+        Returns
+        -------
+        bool
+            True if the child has exited.
+        """
+        if self._supervisor is not None:
+            self._supervisor.join(timeout)
+        return not self.running
+
+    def status(self) -> dict:
+        """
+        Ask the child how its run is going.
+
+        Returns
+        -------
+        dict
+            "running", whether a child is recording, or is being
+            restarted. "pid", the child's process ID, or None.
+            "restarts", the number of restarts. "error", the last error.
+            "rows_written" and "skipped", the rows recorded and scans
+            skipped so far in the current run, or at its end.
+        """
+        with self._send_lock:
+            process, restarts = self._process, self.restarts
+        status = {"running": self.running,
+                  "pid": process.pid if process is not None else None,
+                  "restarts": restarts, "error": self.error}
+
+        self._status_ready.clear()
+        if self._send("status") \
+           and self._status_ready.wait(self.status_timeout):
+            self._last_status = self._status_reply
+        status.update(self._last_status)
+        return status
+
+    def _send(self, message) -> bool:
+        """
+        Send a message to the child, if there is one to send it to.
+        """
+        with self._send_lock:
+            if self._conn is None:
+                return False
+            try:
+                self._conn.send(message)
+            except (OSError, ValueError):
+                return False
+        return True
+
+    def _attach(self) -> None:
+        """
+        Attach to the child's run, once it says its storage is ready, or
+        once the run has ended, if it got as far as creating it.
+        """
+        try:
+            self._reader = LabjackReader.attach(self.storage)
+        except (FileNotFoundError, ValueError):
+            pass
+
+    def _reset_run(self) -> None:
+        """
+        Forget the reader and status of the last run, so none of it is
+        reported as that of the next one.
+        """
+        self._reader = None
+        self._last_status = {}
+        self._status_reply = None
+
+    def _supervise(self, collect_args: tuple, collect_kwargs: dict) -> None:
+        """
+        Run the child, restarting it whenever it fails, until its run
+        finishes, it is stopped, or it has been restarted max_restarts
+        times.
+        """
+        restarting = False
+        while True:
+            # A child that crashed leaves its shared memory behind.
+            SampleBuffer.unlink_shm(self._name)
+            self._reset_run()
+
+            conn, child_conn = self._context.Pipe()
+            process = self._context.Process(
+                target=_run_reader,
+                args=(self.device_args, collect_args, collect_kwargs,
+                      child_conn),
+                daemon=True)
+            process.start()
+            child_conn.close()
+            with self._send_lock:
+                self._process, self._conn = process, conn
+                # Count a restart along with its child, so status never
+                # pairs it with the pid of the child that failed.
+                if restarting:
+                    self.restarts += 1
+            if self._stopping.is_set():
+                self._send("stop")
+
+            failed = self._monitor(process, conn)
+
+            with self._send_lock:
+                self._conn = None
+            conn.close()
+            if not failed or self._stopping.is_set() \
+               or self.restarts >= self.max_restarts:
+                return
+            if self._stopping.wait(self.restart_delay):
+                return
+            restarting = True
+
+    def _monitor(self, process, conn) -> bool:
+        """
+        Handle the messages of a child until it exits, attaching to its run
+        once the child says it is ready.
+
+        Returns
+        -------
+        bool
+            True if the child failed.
+        """
+        while True:
+            try:
+                message = conn.recv() if conn.poll(0.05) else None
+            except (EOFError, OSError):
+                message = None
+            if message is None:
+                if not process.is_alive():
+                    process.join()
+                    self.error = "The reader process exited with code %s." \
+                        % str(process.exitcode)
+                    return True
+                continue
+
+            kind, payload = message
+            if kind == "ready":
+                self._attach()
+            elif kind == "status":
+                self._status_reply = payload
+                self._status_ready.set()
+            elif kind in ("finished", "error"):
+                if self._reader is None:
+                    self._attach()
+                if kind == "finished":
+                    self._last_status = payload
+                else:
+                    self.error = payload
+                self._send("exit")
+                process.join()
+                return kind == "error"
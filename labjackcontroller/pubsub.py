@@ -0,0 +1,507 @@
+import collections
+import json
+import os
+import select
+import socket
+import struct
+import threading
+from typing import List, Tuple, Union
+
+import numpy as np
+
+from .sinks import Sink
+
+"""
+A module that provides Publisher, a sink that broadcasts every block of a
+run to other processes over a local socket, and Subscriber, which receives
+them, so several tools can share one device's stream.
+"""
+
+# Every frame starts with a magic number, its kind, and the length of the
+# payload that follows.
+_FRAME = struct.Struct("<4sB3xQ")
+_FRAME_MAGIC = b"LJCP"
+
+# A metadata frame's payload is the run's metadata, as a JSON object. A
+# block frame's payload is this header followed by the rows, as row-major
+# little-endian float64. An end frame has no payload.
+_METADATA, _BLOCK, _END = 1, 2, 3
+_BLOCK_HEADER = struct.Struct("<QII")
+
+# The largest payload a Subscriber accepts, so that a corrupt frame cannot
+# make it allocate gigabytes. Far more than a block of any real stream.
+_MAX_PAYLOAD = 256 * 1024 * 1024
+
+PublishedBlock = collections.namedtuple("PublishedBlock",
+                                        ["rows", "start_row"])
+PublishedBlock.__doc__ = """
+One block of rows received by a Subscriber.
+
+Attributes
+----------
+rows : numpy.ndarray
+    A 2D array of the rows, laid out as by LabjackReader.to_array, with one
+    column per channel followed by the device and host time columns.
+start_row : int
+    The number of the first row, counted from the start of the run. Blocks
+    a publisher discarded for a slow subscriber leave a gap in row numbers.
+"""
+
+
+def _parse_address(address: str) -> Tuple[int, Union[str, tuple]]:
+    """
+    Split an address, "unix:<path>" or "tcp:<host>:<port>", into a socket
+    family and the address to bind or connect to.
+    """
+    kind, _, location = str(address).partition(":")
+    if kind == "unix" and location:
+        return socket.AF_UNIX, location
+    if kind == "tcp":
+        host, _, port = location.rpartition(":")
+        if host and port.isdigit():
+            return socket.AF_INET, (host, int(port))
+
+    raise ValueError("Invalid address %s, expected \"unix:<path>\" or"
+                     " \"tcp:<host>:<port>\"" % str(address))
+
+
+def _recv_exactly(sock: socket.socket, num_bytes: int) -> bytearray:
+    """
+    Receive exactly num_bytes from a socket.
+
+    Raises
+    ------
+    EOFError
+        If the connection closes first.
+    """
+    data = bytearray(num_bytes)
+    view = memoryview(data)
+    received = 0
+    while received < num_bytes:
+        count = sock.recv_into(view[received:])
+        if not count:
+            raise EOFError("The connection was closed.")
+        received += count
+    return data
+
+
+class _Connection(object):
+    """
+    One subscriber of a Publisher, with the frames waiting to be sent to it
+    and the thread that sends them.
+    """
+
+    def __init__(self, sock: socket.socket, publisher: "Publisher") -> None:
+        self.closed = False
+        self._socket = sock
+        self._publisher = publisher
+        self._frames = collections.deque()
+        self._ready = threading.Condition()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def put(self, frame: Union[tuple, None], is_block=False) -> None:
+        """
+        Queue a frame, as a tuple of buffers, without waiting. None closes
+        the connection once every frame before it is sent.
+        """
+        publisher = self._publisher
+        with self._ready:
+            if self.closed:
+                return
+            if is_block and len(self._frames) >= publisher.max_queued_blocks:
+                if publisher.overflow_policy == "disconnect":
+                    publisher._count("dropped", 1)
+                    self._close()
+                    return
+                # Keep the metadata and end frames, and discard the blocks.
+                kept = [(queued, queued_block)
+                        for queued, queued_block in self._frames
+                        if not queued_block]
+                publisher._count("coalesced", len(self._frames) - len(kept))
+                self._frames = collections.deque(kept)
+            self._frames.append((frame, is_block))
+            self._ready.notify()
+
+    def close(self) -> None:
+        with self._ready:
+            self._close()
+
+    def _close(self) -> None:
+        if not self.closed:
+            self.closed = True
+            self._frames.clear()
+            self._ready.notify()
+            try:
+                self._socket.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            self._socket.close()
+
+    def _run(self) -> None:
+        """
+        Send queued frames until the connection is closed.
+        """
+        while True:
+            with self._ready:
+                while not self._frames and not self.closed:
+                    self._ready.wait()
+                if self.closed:
+                    return
+                frame, _ = self._frames.popleft()
+            if frame is None:
+                # The publisher is shutting down.
+                self.close()
+                return
+
+            try:
+                for buffer in frame:
+                    self._socket.sendall(buffer)
+            except OSError:
+                self.close()
+                return
+
+
+class Publisher(Sink):
+    """
+    A sink that broadcasts the metadata and every block of a run to the
+    Subscribers connected to it, over a Unix domain socket or TCP.
+
+    LJM lets only one process read a device's stream, so this is how other
+    processes, such as a recorder, a live viewer and a behaviour
+    controller, can all follow it. The publisher listens from when it is
+    created until shutdown, across any number of runs. Subscribers that
+    connect during a run are sent its metadata, then the blocks recorded
+    after they connected.
+
+    Every subscriber has its own queue of frames and its own thread sending
+    them, so write_block only copies a block once and never waits on a
+    subscriber. A subscriber with max_queued_blocks blocks already waiting
+    is too slow to keep up: by overflow_policy, it is either disconnected,
+    or its waiting blocks are discarded so that it next gets the newest.
+
+    Attributes
+    ----------
+    address : str
+        The address subscribers connect to. For TCP, gives the port bound
+        when port 0 was asked for.
+    max_queued_blocks : int
+        The most blocks waiting to be sent to any one subscriber.
+    overflow_policy : str
+        "coalesce" or "disconnect". See __init__.
+    dropped : int
+        The number of subscribers disconnected for being too slow.
+    coalesced : int
+        The number of blocks discarded for slow subscribers.
+
+    Examples
+    --------
+    Share a run with other processes:
+
+    >>> with Publisher("unix:/tmp/labjack.sock") as publisher:
+    >>>     reader.collect_data(["AIN0"], [10.0], 600, 10000,
+                                sinks=[publisher])
+
+    And, in each of them:
+
+    >>> with Subscriber("unix:/tmp/labjack.sock") as subscriber:
+    >>>     for block in subscriber:
+    >>>         print(block.start_row, block.rows[:, 0].mean())
+    """
+
+    def __init__(self, address: str, max_queued_blocks=64,
+                 overflow_policy="coalesce") -> None:
+        """
+        Parameters
+        ----------
+        address : str
+            Where to listen: "unix:<path>" for a Unix domain socket at path,
+            replacing any file there, or "tcp:<host>:<port>", normally with
+            host 127.0.0.1.
+        max_queued_blocks : int, optional
+            The most blocks waiting to be sent to any one subscriber.
+        overflow_policy : str, optional
+            What to do when another block is published for a subscriber
+            with max_queued_blocks waiting. "coalesce" discards its waiting
+            blocks, so it skips ahead to the newest. "disconnect" closes its
+            connection.
+
+        Raises
+        ------
+        ValueError
+            If an option is not valid.
+        OSError
+            If the address cannot be listened on.
+        """
+        if max_queued_blocks <= 0:
+            raise ValueError("Invalid maximum number of queued blocks.")
+        if overflow_policy not in ("coalesce", "disconnect"):
+            raise ValueError("Invalid overflow policy %s."
+                             % str(overflow_policy))
+
+        family, location = _parse_address(address)
+        self.max_queued_blocks = max_queued_blocks
+        self.overflow_policy = overflow_policy
+        self.dropped = 0
+        self.coalesced = 0
+        self._path = None
+        self._lock = threading.Lock()
+        self._counts_lock = threading.Lock()
+        self._connections = []
+        self._metadata_frame = None
+
+        self._socket = socket.socket(family, socket.SOCK_STREAM)
+        if family == socket.AF_UNIX:
+            if os.path.exists(location):
+                os.unlink(location)
+            self._path = location
+            self.address = "unix:" + location
+        else:
+            self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._socket.bind(location)
+        self._socket.listen()
+        if family != socket.AF_UNIX:
+            self.address = "tcp:%s:%d" % self._socket.getsockname()[:2]
+
+        self._accept_thread = threading.Thread(target=self._accept,
+                                               daemon=True)
+        self._accept_thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.shutdown()
+
+    @property
+    def num_subscribers(self) -> int:
+        """
+        Get the number of subscribers connected.
+        """
+        with self._lock:
+            self._prune()
+            return len(self._connections)
+
+    def _prune(self) -> None:
+        """
+        Forget the subscribers that have disconnected. Must be called with
+        _lock held.
+        """
+        self._connections = [connection for connection in self._connections
+                             if not connection.closed]
+
+    def _count(self, counter: str, value: int) -> None:
+        with self._counts_lock:
+            setattr(self, counter, getattr(self, counter) + value)
+
+    def _accept(self) -> None:
+        """
+        Accept subscribers until shutdown.
+        """
+        while True:
+            try:
+                sock, _ = self._socket.accept()
+            except OSError:
+                return
+            if sock.family != socket.AF_UNIX:
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+            connection = _Connection(sock, self)
+            with self._lock:
+                if self._metadata_frame is not None:
+                    connection.put(self._metadata_frame)
+                self._prune()
+                self._connections.append(connection)
+
+    def _broadcast(self, frame: tuple, is_block=False) -> None:
+        with self._lock:
+            self._prune()
+            connections = list(self._connections)
+        for connection in connections:
+            connection.put(frame, is_block)
+
+    def open(self, metadata: dict) -> None:
+        payload = json.dumps(metadata, default=str).encode("utf-8")
+        frame = (_FRAME.pack(_FRAME_MAGIC, _METADATA, len(payload)),
+                 payload)
+        with self._lock:
+            self._metadata_frame = frame
+        self._broadcast(frame)
+
+    def write_block(self, rows: np.ndarray, start_row: int) -> None:
+        data = np.ascontiguousarray(rows, dtype="<f8").tobytes()
+        header = _BLOCK_HEADER.pack(start_row, rows.shape[0], rows.shape[1])
+        frame = (_FRAME.pack(_FRAME_MAGIC, _BLOCK, len(header) + len(data))
+                 + header, data)
+        self._broadcast(frame, is_block=True)
+
+    def close(self) -> None:
+        with self._lock:
+            self._metadata_frame = None
+        self._broadcast((_FRAME.pack(_FRAME_MAGIC, _END, 0),))
+
+    def shutdown(self, timeout=1.0) -> None:
+        """
+        Stop listening, and disconnect every subscriber once the frames
+        already queued for it are sent.
+
+        Parameters
+        ----------
+        timeout : float, optional
+            The most time in seconds to wait for each subscriber's queued
+            frames to be sent before disconnecting it anyway.
+        """
+        # Shutting the socket down wakes the thread waiting to accept.
+        try:
+            self._socket.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self._socket.close()
+        self._accept_thread.join()
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for connection in connections:
+            connection.put(None)
+        for connection in connections:
+            connection._thread.join(timeout)
+            connection.close()
+        if self._path is not None and os.path.exists(self._path):
+            os.unlink(self._path)
+
+
+class Subscriber(object):
+    """
+    Receives the runs a Publisher broadcasts.
+
+    Attributes
+    ----------
+    address : str
+        The address of the publisher.
+    metadata : Union[dict, None]
+        The metadata of the run being received, as given to Sink.open, or
+        None between runs.
+    closed : bool
+        True once the publisher has disconnected.
+    """
+
+    def __init__(self, address: str,
+                 timeout: Union[float, None] = None) -> None:
+        """
+        Parameters
+        ----------
+        address : str
+            The address the publisher listens on. See Publisher.
+        timeout : float, optional
+            The most time in seconds to wait to connect.
+
+        Raises
+        ------
+        ValueError
+            If address is not valid.
+        OSError
+            If the publisher cannot be connected to.
+        """
+        family, location = _parse_address(address)
+        self.address = address
+        self.metadata = None
+        self.closed = False
+        self._socket = socket.socket(family, socket.SOCK_STREAM)
+        self._socket.settimeout(timeout)
+        self._socket.connect(location)
+        self._socket.settimeout(None)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __iter__(self):
+        """
+        Iterate over the blocks of the current, or next, run until it ends.
+        """
+        while True:
+            block = self.read()
+            if block is None:
+                return
+            yield block
+
+    @property
+    def columns(self) -> Union[List[str], None]:
+        """
+        Get the names of the columns of the rows received, or None between
+        runs.
+        """
+        return None if self.metadata is None else self.metadata["columns"]
+
+    def read(self, timeout: Union[float, None] = None) \
+            -> Union[PublishedBlock, None]:
+        """
+        Receive the next block, updating metadata if a run starts first.
+
+        Parameters
+        ----------
+        timeout : float, optional
+            The most time in seconds to wait for the publisher to send
+            something. Waits as long as it takes by default.
+
+        Returns
+        -------
+        Union[PublishedBlock, None]
+            The next block, or None if the run ended or the publisher
+            disconnected, in which case closed is True.
+
+        Raises
+        ------
+        TimeoutError
+            If nothing was received within timeout.
+        ValueError
+            If what was received is not a frame sent by a Publisher, in
+            which case the connection is closed, as the frames after it
+            cannot be found.
+        """
+        while not self.closed:
+            if timeout is not None \
+               and not select.select([self._socket], [], [], timeout)[0]:
+                raise TimeoutError("Nothing was published within %g"
+                                   " seconds." % timeout)
+            try:
+                magic, kind, length = _FRAME.unpack(
+                    _recv_exactly(self._socket, _FRAME.size))
+                # Check the frame before allocating room for its payload.
+                if magic != _FRAME_MAGIC \
+                   or kind not in (_METADATA, _BLOCK, _END) \
+                   or length > _MAX_PAYLOAD \
+                   or (kind == _BLOCK and length < _BLOCK_HEADER.size):
+                    self.close()
+                    raise ValueError("Received data that was not published"
+                                     " by a Publisher.")
+                payload = _recv_exactly(self._socket, length)
+            except (EOFError, OSError):
+                self.close()
+                return None
+
+            if kind == _METADATA:
+                self.metadata = json.loads(payload.decode("utf-8"))
+            elif kind == _BLOCK:
+                start_row, num_rows, num_columns = \
+                    _BLOCK_HEADER.unpack_from(payload)
+                if length != _BLOCK_HEADER.size + num_rows * num_columns * 8:
+                    self.close()
+                    raise ValueError("Received a block whose size does not"
+                                     " match its number of rows.")
+                rows = np.frombuffer(payload, dtype="<f8",
+                                     offset=_BLOCK_HEADER.size) \
+                    .reshape(num_rows, num_columns)
+                return PublishedBlock(rows, start_row)
+            elif kind == _END:
+                self.metadata = None
+                return None
+        return None
+
+    def close(self) -> None:
+        """
+        Disconnect from the publisher.
+        """
+        self.closed = True
+        self._socket.close()
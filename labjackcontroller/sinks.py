@@ -0,0 +1,448 @@
+import numpy as np
+from typing import Dict, Union
+import queue
+import threading
+import time
+
+try:
+    import h5py
+except ImportError:
+    h5py = None
+
+"""
+A module that provides sinks: objects LabjackReader.collect_data hands every
+block of rows to as they are recorded, such as to save them to disk.
+"""
+
+
+class Sink(object):
+    """
+    The interface collect_data uses to pass recorded rows on. Subclass this
+    and override its methods to consume a stream as it is recorded.
+
+    Rows are handed over in the same format as LabjackReader.to_array: one
+    column per channel, followed by the device and host time columns.
+    """
+
+    def open(self, metadata: dict) -> None:
+        """
+        Called once before a run starts.
+
+        Parameters
+        ----------
+        metadata : dict
+            Describes the run, with the keys
+
+            channels : List[str]
+                Names of the channels recorded, in column order.
+            columns : List[str]
+                Names of every column in the blocks that will be written.
+            scan_rate : float
+                The actual rate in Hz rows are recorded at.
+            scans_per_read : int
+                The number of rows read from the device per packet.
+            resolution : int
+                The resolution index of the stream.
+            device_type : str
+                The model of the device, such as "T7".
+            serial_number : int
+                The serial number of the device.
+
+        Returns
+        -------
+        None
+        """
+        pass
+
+    def write_block(self, rows: np.ndarray, start_row: int) -> None:
+        """
+        Called once for every block of rows recorded. This happens on the
+        thread that reads the stream, so it should return quickly.
+
+        Parameters
+        ----------
+        rows : numpy.ndarray
+            A read-only 2D array of the rows recorded. It is only valid
+            during this call; copy anything that needs to be kept.
+        start_row : int
+            The number of the first row in rows, counted from the start of
+            the run.
+
+        Returns
+        -------
+        None
+        """
+        pass
+
+    def close(self) -> None:
+        """
+        Called once after a run ends, even if it ends due to an error.
+
+        Returns
+        -------
+        None
+        """
+        pass
+
+
+class BackgroundWriter(Sink):
+    """
+    A sink that writes rows out on a background thread, so that the thread
+    reading the stream never waits on disk.
+
+    Blocks are copied into the front of two staging buffers. Once it holds
+    chunk_rows rows, or flush_interval seconds have passed, it is swapped
+    with the back buffer and handed to the background thread. If the
+    background thread is still writing out the back buffer at that point, a
+    new buffer is allocated rather than waiting for it, up to max_buffers
+    buffers in all. Past that, the background thread has fallen too far
+    behind, such as on a stalled disk, and overflow_policy decides what
+    happens.
+
+    Subclasses implement _open_file, _write_rows and _close_file, which are
+    called in that order.
+
+    Attributes
+    ----------
+    chunk_rows : int
+        The number of rows in each staging buffer.
+    flush_interval : float
+        The longest time in seconds rows are staged before being written.
+    max_buffers : int
+        The most staging buffers held at once.
+    overflow_policy : str
+        "block", "drop" or "raise". See __init__.
+    extra_buffers : int
+        The number of times a staging buffer had to be allocated because
+        the background thread had fallen behind.
+    dropped_rows : int
+        The number of rows discarded by the "drop" overflow_policy.
+    """
+
+    def __init__(self, chunk_rows=4096, flush_interval=1.0, max_buffers=16,
+                 overflow_policy="block") -> None:
+        """
+        Parameters
+        ----------
+        chunk_rows : int, optional
+            The number of rows in each staging buffer.
+        flush_interval : float, optional
+            The longest time in seconds rows are staged before being written.
+        max_buffers : int, optional
+            The most staging buffers to hold at once, at least 2. Bounds the
+            memory held for a background thread that has fallen behind to
+            max_buffers * chunk_rows rows.
+        overflow_policy : str, optional
+            What to do with a full staging buffer when max_buffers are
+            already held. "block", the default, waits for the background
+            thread to finish writing one, which delays reading the stream.
+            "drop" discards the rows of the full buffer, counting them in
+            dropped_rows, so the stream is never held up. "raise" raises a
+            RuntimeError, which ends the run.
+
+        Raises
+        ------
+        ValueError
+            If an option is not valid.
+        """
+        if chunk_rows <= 0:
+            raise ValueError("Invalid number of rows per chunk.")
+        if max_buffers < 2:
+            raise ValueError("Invalid maximum number of buffers.")
+        if overflow_policy not in ("block", "drop", "raise"):
+            raise ValueError("Invalid overflow policy %s."
+                             % str(overflow_policy))
+
+        self.chunk_rows = chunk_rows
+        self.flush_interval = flush_interval
+        self.max_buffers = max_buffers
+        self.overflow_policy = overflow_policy
+        self.extra_buffers = 0
+        self.dropped_rows = 0
+        self._thread = None
+        self._error = None
+
+    def _open_file(self, metadata: dict) -> None:
+        raise NotImplementedError
+
+    def _write_rows(self, rows: np.ndarray) -> None:
+        raise NotImplementedError
+
+    def _close_file(self) -> None:
+        raise NotImplementedError
+
+    def open(self, metadata: dict) -> None:
+        width = len(metadata["columns"])
+        self._front = np.empty((self.chunk_rows, width))
+        self._front_rows = 0
+        self._spare = queue.Queue()
+        self._spare.put(np.empty((self.chunk_rows, width)))
+        self._num_buffers = 2
+        self._pending = queue.Queue()
+        self._last_swap = time.monotonic()
+        self._error = None
+
+        self._open_file(metadata)
+
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def write_block(self, rows: np.ndarray, start_row: int) -> None:
+        if self._error is not None:
+            raise self._error
+
+        offset = 0
+        while offset < len(rows):
+            count = min(len(rows) - offset, self.chunk_rows - self._front_rows)
+            self._front[self._front_rows:self._front_rows + count] = \
+                rows[offset:offset + count]
+            self._front_rows += count
+            offset += count
+
+            if self._front_rows == self.chunk_rows:
+                self._swap()
+
+        if self._front_rows \
+           and time.monotonic() - self._last_swap >= self.flush_interval:
+            self._swap()
+
+    def close(self) -> None:
+        if self._thread is None:
+            return
+
+        if self._front_rows:
+            # Never discard the last rows of a run.
+            self._swap(wait=True)
+        self._pending.put(None)
+        self._thread.join()
+        self._thread = None
+
+        self._close_file()
+
+        if self._error is not None:
+            raise self._error
+
+    def _swap(self, wait=False) -> None:
+        """
+        Hand the front buffer to the background thread, and replace it. If
+        no buffer is free and max_buffers are held, wait for one when wait
+        is True, and otherwise follow overflow_policy.
+        """
+        try:
+            front = self._spare.get_nowait()
+        except queue.Empty:
+            front = None
+            if self._num_buffers < self.max_buffers:
+                front = np.empty_like(self._front)
+                self._num_buffers += 1
+                self.extra_buffers += 1
+            elif wait or self.overflow_policy == "block":
+                front = self._spare.get()
+            elif self.overflow_policy == "drop":
+                # Reuse the front buffer, discarding its rows.
+                self.dropped_rows += self._front_rows
+            else:
+                raise RuntimeError("The background writer fell %d buffers"
+                                   " behind." % self.max_buffers)
+
+        if front is not None:
+            self._pending.put((self._front, self._front_rows))
+            self._front = front
+        self._front_rows = 0
+        self._last_swap = time.monotonic()
+
+    def _run(self) -> None:
+        """
+        Write out staged buffers until close is called.
+        """
+        while True:
+            staged = self._pending.get()
+            if staged is None:
+                break
+
+            buffer, num_rows = staged
+            if self._error is None:
+                try:
+                    self._write_rows(buffer[:num_rows])
+                except Exception as e:
+                    self._error = e
+            self._spare.put(buffer)
+
+
+class HDF5Writer(BackgroundWriter):
+    """
+    A sink that appends rows to a chunked, resizable dataset in an HDF5
+    file from a background thread. Requires the h5py package.
+
+    The dataset has one column per entry of its "columns" attribute. The
+    channel names, scan rate, resolution, device type and serial number of
+    the run are stored as attributes too.
+
+    Examples
+    --------
+    Record 10 minutes of data to disk as it is collected:
+
+    >>> reader = LabjackReader("T7")
+    >>> reader.collect_data(["AIN0", "AIN1"], [10.0, 10.0], 600, 10000,
+                            sinks=[HDF5Writer("run.h5")])
+    """
+
+    def __init__(self, path: str, dataset="data", chunk_rows=4096,
+                 flush_interval=1.0,
+                 compression: Union[str, None] = None, max_buffers=16,
+                 overflow_policy="block") -> None:
+        """
+        Parameters
+        ----------
+        path : str
+            The file to write. An existing file is overwritten.
+        dataset : str, optional
+            The name of the dataset to write rows to.
+        chunk_rows : int, optional
+            The number of rows in each HDF5 chunk, and in each write.
+        flush_interval : float, optional
+            The longest time in seconds rows are held before being written.
+        compression : str, optional
+            A compression filter h5py supports, such as "gzip" or "lzf".
+        max_buffers, overflow_policy
+            How far writing may fall behind, and what happens past that.
+            See BackgroundWriter.
+
+        Raises
+        ------
+        ImportError
+            If h5py is not installed.
+        ValueError
+            If an option is not valid.
+        """
+        if h5py is None:
+            raise ImportError("HDF5Writer requires the h5py package.")
+
+        super(HDF5Writer, self).__init__(chunk_rows=chunk_rows,
+                                         flush_interval=flush_interval,
+                                         max_buffers=max_buffers,
+                                         overflow_policy=overflow_policy)
+        self.path = path
+        self.dataset = dataset
+        self.compression = compression
+        self._file = None
+
+    def _open_file(self, metadata: dict) -> None:
+        self._file = h5py.File(self.path, "w")
+        self._data = self._file.create_dataset(
+            self.dataset, shape=(0, len(metadata["columns"])),
+            maxshape=(None, len(metadata["columns"])),
+            chunks=(self.chunk_rows, len(metadata["columns"])),
+            dtype=np.float64, compression=self.compression)
+
+        for key, value in metadata.items():
+            if value is not None:
+                self._data.attrs[key] = value
+
+    def _write_rows(self, rows: np.ndarray) -> None:
+        num_rows = self._data.shape[0]
+        self._data.resize(num_rows + len(rows), axis=0)
+        self._data[num_rows:] = rows
+        self._file.flush()
+
+    def _close_file(self) -> None:
+        self._file.close()
+        self._file = None
+
+
+class CSVWriter(BackgroundWriter):
+    """
+    A sink that appends rows to a CSV file from a background thread, so
+    the file grows as a run is recorded, and can be followed with a
+    labjackcontroller.tail.CSVTailReader.
+
+    Each write only formats and appends the rows staged since the last one,
+    a whole buffer at a time, and flushes them to disk. The file starts
+    with a header of the column names.
+
+    Channels can be converted from analog to digital as they are written,
+    by giving them a threshold: values above it are written as 1, and
+    others as 0. Skipped samples stay -9999.
+
+    Examples
+    --------
+    Record to a CSV, updated four times a second, reading AIN0 as a
+    digital line:
+
+    >>> reader = LabjackReader("T7")
+    >>> reader.collect_data(["AIN0", "AIN1"], [10.0, 10.0], 600, 100,
+                            sinks=[CSVWriter("run.csv",
+                                             thresholds={"AIN0": 2.5},
+                                             flush_interval=0.25)])
+    """
+
+    def __init__(self, path: str,
+                 thresholds: Union[Dict[str, float], None] = None,
+                 fmt="%.9g", delimiter=",", chunk_rows=4096,
+                 flush_interval=1.0, max_buffers=16,
+                 overflow_policy="block") -> None:
+        """
+        Parameters
+        ----------
+        path : str
+            The file to write. An existing file is overwritten.
+        thresholds : Dict[str, float], optional
+            For each channel to write as digital, the value above which it
+            is 1.
+        fmt : str, optional
+            The printf-style format of every value.
+        delimiter : str, optional
+            The character separating values.
+        chunk_rows : int, optional
+            The most rows formatted and written at once.
+        flush_interval : float, optional
+            The longest time in seconds rows are held before being written.
+        max_buffers, overflow_policy
+            How far writing may fall behind, and what happens past that.
+            See BackgroundWriter.
+
+        Raises
+        ------
+        ValueError
+            If an option is not valid.
+        """
+        super(CSVWriter, self).__init__(chunk_rows=chunk_rows,
+                                        flush_interval=flush_interval,
+                                        max_buffers=max_buffers,
+                                        overflow_policy=overflow_policy)
+        self.path = path
+        self.thresholds = dict(thresholds or {})
+        self.fmt = fmt
+        self.delimiter = delimiter
+        self._file = None
+
+    def _open_file(self, metadata: dict) -> None:
+        columns = metadata["columns"]
+        for channel in self.thresholds:
+            if channel not in columns:
+                raise ValueError("Cannot threshold channel %s, which is not"
+                                 " recorded." % channel)
+        self._threshold_columns = [columns.index(channel)
+                                   for channel in self.thresholds]
+        self._threshold_values = np.array(list(self.thresholds.values()))
+
+        self._file = open(self.path, "w", newline="")
+        self._file.write(self.delimiter.join(columns) + "\n")
+        self._file.flush()
+
+    def _write_rows(self, rows: np.ndarray) -> None:
+        if self._threshold_columns:
+            # rows is a view of a staging buffer, which write_block copied
+            # the stream's rows into and which is not reused until this
+            # returns, so converting in place never touches the stream's
+            # data, and saves a copy of every block.
+            values = rows[:, self._threshold_columns]
+            rows[:, self._threshold_columns] = np.where(
+                values == -9999.0, values, values > self._threshold_values)
+
+        np.savetxt(self._file, rows, fmt=self.fmt, delimiter=self.delimiter)
+        self._file.flush()
+
+    def _close_file(self) -> None:
+        self._file.close()
+        self._file = None
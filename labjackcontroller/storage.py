@@ -0,0 +1,1344 @@
+import numpy as np
+from typing import List, Tuple, Union
+import collections
+import json
+import os
+import struct
+import time
+import weakref
+
+try:
+    from multiprocessing import resource_tracker, shared_memory
+except ImportError:
+    # Shared memory storage needs Python 3.8 or later.
+    resource_tracker = shared_memory = None
+
+"""
+A module that provides the storage LabjackReader records stream data into.
+"""
+
+# Storage placed outside of this process' memory, such as in a file, starts
+# with a header of this many bytes. It holds everything needed to read the
+# rows that follow it, so data can be recovered by another process, or after
+# the recording process has crashed.
+HEADER_SIZE = 4096
+
+_HEADER_MAGIC = b"LJCBUF01"
+
+# Magic, capacity, number of columns, ring flag, scan rate, rows written.
+# Channel names follow, as a length-prefixed JSON list.
+_HEADER = struct.Struct("<8sQQQdQ")
+_ROWS_WRITTEN_OFFSET = _HEADER.size - 8
+_NAMES_LENGTH = struct.Struct("<I")
+
+# The shared memory segments this process created for buffers and has not
+# released yet, by name.
+_OWNED_SEGMENTS = {}
+
+
+def _allocate(shape, dtype=np.float64) -> np.ndarray:
+    """
+    Allocate a zeroed array, touching every page now rather than page
+    faulting during a stream, which np.zeros would leave to happen on first
+    write.
+    """
+    array = np.empty(shape, dtype=dtype)
+    array.fill(0)
+    return array
+
+
+def _write_header(memory: np.ndarray, capacity: int, num_columns: int,
+                  ring: bool, scan_rate: float, channels: List[str]) -> None:
+    """
+    Write a storage header to the start of a uint8 array.
+    """
+    names = json.dumps(list(channels)).encode("utf-8")
+    if _HEADER.size + _NAMES_LENGTH.size + len(names) > HEADER_SIZE:
+        raise ValueError("Too many channel names to fit in a header.")
+
+    header = _HEADER.pack(_HEADER_MAGIC, capacity, num_columns, int(ring),
+                          scan_rate, 0) \
+        + _NAMES_LENGTH.pack(len(names)) + names
+    memory[:len(header)] = np.frombuffer(header, dtype=np.uint8)
+
+
+def _read_header(memory: np.ndarray) -> Tuple[int, int, bool, float,
+                                              List[str]]:
+    """
+    Read the storage header at the start of a uint8 array.
+    """
+    magic, capacity, num_columns, ring, scan_rate, _ = \
+        _HEADER.unpack(memory[:_HEADER.size].tobytes())
+    if magic != _HEADER_MAGIC:
+        raise ValueError("Not a labjackcontroller sample buffer.")
+
+    offset = _HEADER.size + _NAMES_LENGTH.size
+    names_length, = _NAMES_LENGTH.unpack(
+        memory[_HEADER.size:offset].tobytes())
+    channels = json.loads(memory[offset:offset + names_length].tobytes()
+                          .decode("utf-8"))
+
+    return capacity, num_columns, bool(ring), scan_rate, channels
+
+
+def _require_shared_memory() -> None:
+    """
+    Check that this Python has shared memory.
+
+    Raises
+    ------
+    ImportError
+        If it does not, as before Python 3.8.
+    """
+    if shared_memory is None:
+        raise ImportError("Shared memory storage requires Python 3.8 or"
+                          " later.")
+
+
+if shared_memory is not None:
+    class _Segment(shared_memory.SharedMemory):
+        """
+        A shared memory segment that stays mapped for as long as arrays made
+        with np.frombuffer(segment.buf) exist, even once the segment itself
+        is freed. SharedMemory would otherwise unmap it from under them.
+        """
+
+        def __del__(self) -> None:
+            try:
+                self.close()
+            except (OSError, BufferError):
+                # Arrays still view the segment. It is unmapped once they
+                # are freed.
+                pass
+
+
+def _attach_segment(name: str) -> "_Segment":
+    """
+    Open an existing shared memory segment without taking ownership of it.
+    """
+    try:
+        return _Segment(name, track=False)
+    except TypeError:
+        pass
+
+    # Before Python 3.13, opening a segment also registers it with the
+    # resource tracker, which would unlink it when this process exits, as if
+    # this process had created it.
+    segment = _Segment(name)
+    resource_tracker.unregister(segment._name, "shared_memory")
+    return segment
+
+
+def _unlink_segment(name: str, segment: "_Segment") -> None:
+    """
+    Unlink a segment this process created, unless it has already been
+    replaced.
+    """
+    if _OWNED_SEGMENTS.get(name) is segment:
+        del _OWNED_SEGMENTS[name]
+        segment.unlink()
+
+
+def parse_storage(storage: Union[str, None]) -> Tuple[str, str]:
+    """
+    Split a storage specification, as taken by LabjackReader.collect_data,
+    into its kind and location.
+
+    Parameters
+    ----------
+    storage : Union[str, None]
+        None for memory private to this process, "mmap:<path>" for a
+        memory-mapped file at path, or "shm:<name>" for a shared memory
+        segment with the given name.
+
+    Returns
+    -------
+    kind : str
+        One of "memory", "mmap" or "shm".
+    location : str
+        Where the storage is, or an empty string for "memory".
+
+    Raises
+    ------
+    ValueError
+        If the specification is not understood.
+    """
+    if storage is None:
+        return "memory", ""
+
+    kind, _, location = str(storage).partition(":")
+    if kind in ("mmap", "shm") and location:
+        return kind, location
+
+    raise ValueError("Invalid storage %s, expected None, \"mmap:<path>\" or"
+                     " \"shm:<name>\"" % str(storage))
+
+
+class GapIndex(object):
+    """
+    A record of the runs of scans a stream skipped. LJM fills every channel
+    of a skipped scan with -9999.0, which happens after a buffer overflows,
+    once auto-recovery ends.
+
+    Gaps are kept as a compact structured array, growing as needed, with
+    one entry per run of consecutive skipped scans. A run that spans two
+    blocks is recorded as one gap.
+
+    Attributes
+    ----------
+    num_skipped : int
+        The total number of scans skipped.
+    """
+
+    dtype = np.dtype([("start_row", "<i8"), ("length", "<i8"),
+                      ("device_time", "<f8")])
+
+    def __init__(self, gaps: Union[np.ndarray, None] = None) -> None:
+        """
+        Parameters
+        ----------
+        gaps : numpy.ndarray, optional
+            Gaps to start with, as returned by to_array.
+        """
+        gaps = np.empty(0, dtype=self.dtype) if gaps is None \
+            else np.asarray(gaps, dtype=self.dtype)
+        self._gaps = np.empty(max(16, len(gaps)), dtype=self.dtype)
+        self._gaps[:len(gaps)] = gaps
+        self._count = len(gaps)
+        self.num_skipped = int(gaps["length"].sum())
+
+    def __len__(self) -> int:
+        return self._count
+
+    def add(self, start_row: int, skipped: np.ndarray,
+            device_time: np.ndarray) -> int:
+        """
+        Record the gaps in a block of scans.
+
+        Parameters
+        ----------
+        start_row : int
+            The number of the first scan of the block.
+        skipped : numpy.ndarray
+            For every scan of the block, whether it was skipped.
+        device_time : numpy.ndarray
+            The device time of every scan of the block.
+
+        Returns
+        -------
+        int
+            The number of scans of the block that were skipped.
+        """
+        # Runs of skipped scans start where skipped goes from False to
+        # True, and end where it goes back.
+        edges = np.diff(skipped.astype(np.int8), prepend=0, append=0)
+        starts = np.flatnonzero(edges == 1)
+        lengths = np.flatnonzero(edges == -1) - starts
+        if not len(starts):
+            return 0
+
+        num_skipped = int(lengths.sum())
+        self.num_skipped += num_skipped
+
+        # Continue a gap that ran up to the end of the previous block.
+        last = self._count - 1
+        if starts[0] == 0 and self._count \
+           and self._gaps["start_row"][last] + self._gaps["length"][last] \
+           == start_row:
+            self._gaps["length"][last] += lengths[0]
+            starts, lengths = starts[1:], lengths[1:]
+
+        if self._count + len(starts) > len(self._gaps):
+            grown = np.empty(2 * (self._count + len(starts)),
+                             dtype=self.dtype)
+            grown[:self._count] = self._gaps[:self._count]
+            self._gaps = grown
+
+        gaps = self._gaps[self._count:self._count + len(starts)]
+        gaps["start_row"] = start_row + starts
+        gaps["length"] = lengths
+        gaps["device_time"] = device_time[starts]
+        self._count += len(starts)
+        return num_skipped
+
+    def to_array(self) -> np.ndarray:
+        """
+        Get the gaps recorded.
+
+        Returns
+        -------
+        numpy.ndarray
+            A read-only structured array with the fields start_row, the
+            number of the first scan skipped, length, the number of scans
+            skipped, and device_time, the device time of the first scan
+            skipped.
+        """
+        gaps = self._gaps[:self._count]
+        gaps.flags.writeable = False
+        return gaps
+
+    def save(self, path: str) -> None:
+        """
+        Write the gaps to a file, replacing it atomically.
+
+        Parameters
+        ----------
+        path : str
+            The file to write.
+        """
+        with open(path + ".tmp", "wb") as file:
+            np.save(file, self._gaps[:self._count])
+        os.replace(path + ".tmp", path)
+
+    @classmethod
+    def load(cls, path: str) -> "GapIndex":
+        """
+        Read gaps written by save.
+
+        Parameters
+        ----------
+        path : str
+            The file to read.
+
+        Returns
+        -------
+        GapIndex
+            The gaps in the file.
+        """
+        with open(path, "rb") as file:
+            return cls(np.load(file))
+
+
+class HostClock(object):
+    """
+    A running linear fit of host time against scan number, which maps the
+    scans of a stream onto the host's clock.
+
+    The host can only note the time once per packet, when the packet
+    arrives, and that time is late by a varying amount. Fitting a line
+    through every arrival averages the jitter out, and its slope follows
+    any drift between the device's and the host's clocks, so per-scan host
+    times can be computed for any scan, without a clock call per scan.
+
+    The fit moves a little with every arrival, so the times predicted for
+    one packet can start before the last of the packet before. stamp gives
+    times for storing that never step backwards.
+
+    Attributes
+    ----------
+    scan_rate : float
+        The nominal scan rate in Hz, used for the slope until two packets
+        have arrived.
+    num_packets : int
+        The number of arrivals fitted.
+    """
+
+    def __init__(self, scan_rate: float) -> None:
+        """
+        Parameters
+        ----------
+        scan_rate : float
+            The nominal scan rate of the stream in Hz.
+        """
+        self.scan_rate = scan_rate
+        self.num_packets = 0
+        self._mean_scan = 0.0
+        self._mean_time = 0.0
+        self._scan_variance = 0.0
+        self._covariance = 0.0
+        # The host time stamp gave the last scan of the last packet.
+        self._last_stamp = None
+
+    def add(self, scan: int, host_time: float) -> None:
+        """
+        Fit the arrival of a packet.
+
+        Parameters
+        ----------
+        scan : int
+            The number of the last scan of the packet, counted from the
+            start of the stream.
+        host_time : float
+            The host time at which the packet arrived.
+        """
+        # Welford's update, which stays accurate however many scans a run
+        # lasts.
+        self.num_packets += 1
+        scan_delta = scan - self._mean_scan
+        self._mean_scan += scan_delta / self.num_packets
+        time_delta = host_time - self._mean_time
+        self._mean_time += time_delta / self.num_packets
+        self._scan_variance += scan_delta * (scan - self._mean_scan)
+        self._covariance += scan_delta * (host_time - self._mean_time)
+
+    @property
+    def slope(self) -> float:
+        """
+        Get the host seconds that pass per scan.
+        """
+        if self._scan_variance > 0:
+            return self._covariance / self._scan_variance
+        return 1.0 / self.scan_rate if self.scan_rate else 0.0
+
+    @property
+    def intercept(self) -> float:
+        """
+        Get the host time of scan 0.
+        """
+        return self._mean_time - self.slope * self._mean_scan
+
+    def predict(self, first_scan: int, num_scans: int) -> np.ndarray:
+        """
+        Get the host times of a range of scans.
+
+        Parameters
+        ----------
+        first_scan : int
+            The number of the first scan.
+        num_scans : int
+            The number of scans.
+
+        Returns
+        -------
+        numpy.ndarray
+            The host time of every scan.
+        """
+        slope = self.slope
+        times = np.arange(num_scans, dtype=np.float64)
+        times *= slope
+        times += self.intercept + slope * first_scan
+        return times
+
+    def stamp(self, first_scan: int, num_scans: int) -> np.ndarray:
+        """
+        Get the host times of the scans of a packet, as predict does, but
+        moved later where needed so that they carry on from the times last
+        stamped, at least one scan's worth apart.
+
+        Parameters
+        ----------
+        first_scan : int
+            The number of the first scan of the packet.
+        num_scans : int
+            The number of scans in the packet.
+
+        Returns
+        -------
+        numpy.ndarray
+            The host time of every scan, later than any stamped before.
+        """
+        times = self.predict(first_scan, num_scans)
+        if not num_scans:
+            return times
+
+        if self._last_stamp is not None:
+            earliest = self._last_stamp + self.slope
+            if times[0] < earliest:
+                times += earliest - times[0]
+        self._last_stamp = times[-1]
+        return times
+
+
+Envelope = collections.namedtuple("Envelope", ["time", "min", "max", "mean"])
+Envelope.__doc__ = """
+The envelope of one channel over a span of a stream, as returned by
+EnvelopePyramid.query, with one entry per bin.
+
+time : numpy.ndarray
+    The device time in seconds of the first scan of each bin.
+min, max, mean : numpy.ndarray
+    The lowest, highest and mean value of the channel over each bin. NaN
+    for bins in which every scan was skipped.
+"""
+
+
+class _EnvelopeLevel(object):
+    """
+    The bins of one level of an EnvelopePyramid, growing as needed.
+    """
+
+    def __init__(self, num_columns: int) -> None:
+        self.min = np.empty((16, num_columns))
+        self.max = np.empty((16, num_columns))
+        self.sum = np.empty((16, num_columns))
+        self.count = np.empty(16, dtype=np.int64)
+        self.num_bins = 0
+        # The number of bins already summarised by the level above.
+        self.num_folded = 0
+
+    def append(self, mins: np.ndarray, maxs: np.ndarray, sums: np.ndarray,
+               counts: np.ndarray) -> None:
+        end = self.num_bins + len(counts)
+        if end > len(self.count):
+            capacity = 2 * end
+            for name in ("min", "max", "sum", "count"):
+                old = getattr(self, name)
+                grown = np.empty((capacity,) + old.shape[1:], dtype=old.dtype)
+                grown[:self.num_bins] = old[:self.num_bins]
+                setattr(self, name, grown)
+
+        self.min[self.num_bins:end] = mins
+        self.max[self.num_bins:end] = maxs
+        self.sum[self.num_bins:end] = sums
+        self.count[self.num_bins:end] = counts
+        # Only count the bins once they are written, so that a query from
+        # another thread never reads one half-written.
+        self.num_bins = end
+
+
+class EnvelopePyramid(object):
+    """
+    A multi-level summary of every channel of a stream, from which the
+    envelope of any span of it can be read at a bounded number of points,
+    such as to plot it at any zoom level.
+
+    Level 0 holds the minimum, maximum and sum of each channel over every
+    bin_rows scans, and each level above summarises factor bins of the one
+    below. Each block of scans added is folded into level 0, and from there
+    up the levels, at a cost proportional to the size of the block. A query
+    reads the finest level that covers its span in at most max_points bins,
+    and never the scans themselves.
+
+    Skipped scans, which the device reports as -9999.0, are left out.
+
+    Attributes
+    ----------
+    num_columns : int
+        The number of channels summarised.
+    scan_rate : float
+        The scan rate of the stream in Hz, which maps scans to device time.
+    bin_rows : int
+        The number of scans in each bin of level 0.
+    factor : int
+        The number of bins of a level summarised by each bin of the next.
+    rows_added : int
+        The number of scans added so far.
+    """
+
+    def __init__(self, num_columns: int, scan_rate: float, bin_rows=16,
+                 factor=4) -> None:
+        """
+        Parameters
+        ----------
+        num_columns : int
+            The number of channels to summarise.
+        scan_rate : float
+            The scan rate of the stream in Hz.
+        bin_rows : int, optional
+            The number of scans in each bin of level 0, and so the finest
+            detail a query can return.
+        factor : int, optional
+            How many bins of a level each bin of the next summarises.
+
+        Raises
+        ------
+        ValueError
+            If a parameter is not valid.
+        """
+        if num_columns <= 0:
+            raise ValueError("Invalid number of columns.")
+        if scan_rate <= 0:
+            raise ValueError("Invalid scan rate.")
+        if bin_rows <= 0:
+            raise ValueError("Invalid number of rows per bin.")
+        if factor < 2:
+            raise ValueError("Invalid factor, must be at least 2.")
+
+        self.num_columns = num_columns
+        self.scan_rate = scan_rate
+        self.bin_rows = bin_rows
+        self.factor = factor
+        self.rows_added = 0
+        self._levels = []
+
+        # Scans added since the last full bin of level 0.
+        self._pending = np.empty((bin_rows, num_columns))
+        self._num_pending = 0
+
+    @property
+    def num_levels(self) -> int:
+        """
+        Get the number of levels built so far.
+        """
+        return len(self._levels)
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Get the number of bytes of memory used by the bins.
+        """
+        return sum(level.min.nbytes + level.max.nbytes + level.sum.nbytes
+                   + level.count.nbytes for level in self._levels)
+
+    def add(self, rows: np.ndarray) -> None:
+        """
+        Summarise a block of scans.
+
+        Parameters
+        ----------
+        rows : numpy.ndarray
+            A 2D array of scans, with one column per channel, following on
+            from the scans added before.
+        """
+        offset = 0
+        if self._num_pending:
+            offset = min(self.bin_rows - self._num_pending, len(rows))
+            self._pending[self._num_pending:self._num_pending + offset] = \
+                rows[:offset]
+            self._num_pending += offset
+            if self._num_pending == self.bin_rows:
+                self._append(0, *self._summarise(self._pending[np.newaxis]))
+                self._num_pending = 0
+
+        num_bins = (len(rows) - offset) // self.bin_rows
+        if num_bins:
+            end = offset + num_bins * self.bin_rows
+            self._append(0, *self._summarise(rows[offset:end].reshape(
+                num_bins, self.bin_rows, self.num_columns)))
+            offset = end
+
+        if offset < len(rows):
+            self._pending[:len(rows) - offset] = rows[offset:]
+            self._num_pending = len(rows) - offset
+        self.rows_added += len(rows)
+
+    @staticmethod
+    def _summarise(bins: np.ndarray) -> Tuple[np.ndarray, np.ndarray,
+                                              np.ndarray, np.ndarray]:
+        """
+        Get the minimum, maximum, sum and number of scans that were not
+        skipped of each of a (bins x scans x channels) array.
+        """
+        # Every channel of a skipped scan is -9999.0, so the first is
+        # enough to find them.
+        valid = bins[:, :, 0] != -9999.0
+        if valid.all():
+            return bins.min(axis=1), bins.max(axis=1), bins.sum(axis=1), \
+                np.full(len(bins), bins.shape[1])
+
+        skipped = ~valid[:, :, np.newaxis]
+        return np.where(skipped, np.inf, bins).min(axis=1), \
+            np.where(skipped, -np.inf, bins).max(axis=1), \
+            np.where(skipped, 0.0, bins).sum(axis=1), valid.sum(axis=1)
+
+    def _append(self, level: int, mins: np.ndarray, maxs: np.ndarray,
+                sums: np.ndarray, counts: np.ndarray) -> None:
+        """
+        Append bins to a level, and fold every complete group of factor
+        bins into the level above.
+        """
+        if level == len(self._levels):
+            self._levels.append(_EnvelopeLevel(self.num_columns))
+        bins = self._levels[level]
+        bins.append(mins, maxs, sums, counts)
+
+        num_groups = (bins.num_bins - bins.num_folded) // self.factor
+        if not num_groups:
+            return
+
+        first = bins.num_folded
+        end = first + num_groups * self.factor
+        shape = (num_groups, self.factor, self.num_columns)
+        self._append(level + 1, bins.min[first:end].reshape(shape).min(1),
+                     bins.max[first:end].reshape(shape).max(1),
+                     bins.sum[first:end].reshape(shape).sum(1),
+                     bins.count[first:end].reshape(num_groups,
+                                                   self.factor).sum(1))
+        bins.num_folded = end
+
+    def query(self, column: int, start_time: float, end_time: float,
+              max_points=2000) -> Envelope:
+        """
+        Get the envelope of a channel between two device times.
+
+        Parameters
+        ----------
+        column : int
+            The index of the channel.
+        start_time, end_time : float
+            The span of device time in seconds to cover.
+        max_points : int, optional
+            The number of bins to aim for. The span is read from the finest
+            level that covers it in at most this many bins. Scans too
+            recent to be summarised at that level yet are read from finer
+            levels, which adds fewer than factor bins per level.
+
+        Returns
+        -------
+        Envelope
+            The envelope of the channel, in time order. Empty if no scan
+            was added in the span.
+
+        Raises
+        ------
+        ValueError
+            If max_points is not positive.
+        """
+        if max_points <= 0:
+            raise ValueError("Invalid number of points.")
+
+        first_scan = max(0, int(np.floor(start_time * self.scan_rate)))
+        end_scan = min(self.rows_added,
+                       int(np.floor(end_time * self.scan_rate)) + 1)
+        if end_scan <= first_scan:
+            return Envelope(*(np.empty(0) for _ in Envelope._fields))
+
+        # The finest level spanning the scans in at most max_points bins.
+        top = len(self._levels) - 1
+        for level in range(len(self._levels)):
+            size = self.bin_rows * self.factor ** level
+            if (end_scan - 1) // size - first_scan // size < max_points:
+                top = level
+                break
+
+        starts, mins, maxs, sums, counts = [], [], [], [], []
+        scan = first_scan
+        for level in range(top, -1, -1):
+            bins = self._levels[level]
+            size = self.bin_rows * self.factor ** level
+            first = scan // size
+            end = min(bins.num_bins, (end_scan - 1) // size + 1)
+            if first < end:
+                starts.append(np.arange(first, end) * size)
+                mins.append(bins.min[first:end, column])
+                maxs.append(bins.max[first:end, column])
+                sums.append(bins.sum[first:end, column])
+                counts.append(bins.count[first:end])
+                scan = end * size
+
+        # The last few scans are not in a bin yet.
+        if scan < end_scan:
+            pending_start = self.rows_added - self._num_pending
+            rows = self._pending[scan - pending_start:end_scan - pending_start]
+            summary = self._summarise(rows[np.newaxis])
+            starts.append(np.array([scan]))
+            mins.append(summary[0][:, column])
+            maxs.append(summary[1][:, column])
+            sums.append(summary[2][:, column])
+            counts.append(summary[3])
+
+        counts = np.concatenate(counts)
+        empty = counts == 0
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = np.concatenate(sums) / counts
+        envelope = Envelope(np.concatenate(starts) / self.scan_rate,
+                            np.concatenate(mins), np.concatenate(maxs), mean)
+        if empty.any():
+            for values in envelope[1:]:
+                values[empty] = np.nan
+        return envelope
+
+
+class SampleBuffer(object):
+    """
+    A preallocated 2D array of recorded rows. Each row holds one scan of
+    every channel, followed by the device time and host time of the scan.
+
+    Rows are numbered from the start of a run. In ring mode, the buffer
+    wraps around once full, so only the latest `capacity` rows are held and
+    memory use does not depend on how long a run lasts.
+
+    Attributes
+    ----------
+    capacity : int
+        The number of rows the buffer can hold.
+    width : int
+        The number of columns in every row.
+    rows_written : int
+        The number of rows that have been recorded.
+    first_row : int
+        The number of the oldest row still held.
+    ring : bool
+        True if the buffer wraps around when full.
+    channels : List[str]
+        Names of the channels recorded, in column order.
+    scan_rate : float
+        The rate in Hz that the rows were recorded at.
+    gaps : GapIndex
+        The runs of skipped scans among the rows written.
+    host_clock : Union[HostClock, None]
+        If not None, host times are not stored, but computed from this when
+        rows are viewed.
+    """
+
+    # Keep a mapped file from being flushed more often than this, in
+    # seconds.
+    flush_interval = 1.0
+
+    # The number of rows there will be once the write in progress, if any,
+    # completes. Only known to the process writing.
+    _rows_reserved = 0
+
+    def __init__(self, num_rows: int, num_columns: int, ring=False,
+                 channels=None, scan_rate=0.0,
+                 host_clock: Union[HostClock, None] = None) -> None:
+        """
+        Allocate a buffer.
+
+        Parameters
+        ----------
+        num_rows : int
+            The number of rows the buffer can hold.
+        num_columns : int
+            The number of columns in every row, including both time columns.
+        ring : bool, optional
+            If True, overwrite the oldest rows once the buffer is full rather
+            than refusing to write more rows.
+        channels : List[str], optional
+            Names of the channels recorded, in column order.
+        scan_rate : float, optional
+            The rate in Hz that the rows are recorded at.
+        host_clock : HostClock, optional
+            If given, the host time column is not stored, saving 8 bytes
+            per row. Views compute it from host_clock instead, and so are
+            always copies.
+
+        Returns
+        -------
+        SampleBuffer
+            A new, empty buffer.
+        """
+        self.host_clock = host_clock
+        self._data = _allocate((num_rows,
+                                num_columns - (host_clock is not None)))
+        self._rows_written = np.zeros(1, dtype=np.uint64)
+        self._ring = ring
+        self._mapping = None
+        self._last_flush = 0.0
+        self._gaps_path = None
+        self._gaps_saved = 0
+        self.channels = list(channels or [])
+        self.scan_rate = scan_rate
+        self.gaps = GapIndex()
+
+    @classmethod
+    def _on_memory(cls, memory: np.ndarray) -> "SampleBuffer":
+        """
+        Place a buffer on a uint8 array that starts with a storage header,
+        sharing the array's memory rather than copying it.
+        """
+        capacity, num_columns, ring, scan_rate, channels = \
+            _read_header(memory)
+
+        buffer = cls.__new__(cls)
+        buffer._data = np.ndarray((capacity, num_columns), dtype=np.float64,
+                                  buffer=memory, offset=HEADER_SIZE)
+        buffer._rows_written = np.ndarray((1,), dtype=np.uint64,
+                                          buffer=memory,
+                                          offset=_ROWS_WRITTEN_OFFSET)
+        buffer._ring = ring
+        buffer._mapping = memory
+        buffer._last_flush = time.monotonic()
+        buffer._gaps_path = None
+        buffer._gaps_saved = 0
+        buffer.channels = channels
+        buffer.scan_rate = scan_rate
+        buffer.gaps = GapIndex()
+        buffer.host_clock = None
+        return buffer
+
+    @classmethod
+    def create_mmap(cls, path: str, num_rows: int, num_columns: int,
+                    ring=False, channels=None,
+                    scan_rate=0.0) -> "SampleBuffer":
+        """
+        Create a buffer backed by a memory-mapped file instead of RAM.
+
+        The file starts with a header of HEADER_SIZE bytes recording the
+        channels, scan rate and number of rows written, followed by the rows
+        themselves. The header is kept current as rows are written, and the
+        file is flushed to disk at most every flush_interval seconds, so a
+        run that ends unexpectedly leaves a file that open_mmap can read.
+        Gaps are saved alongside it, to path + ".gaps", as they are found.
+
+        Parameters
+        ----------
+        path : str
+            Where to create the file. An existing file is overwritten.
+        num_rows, num_columns, ring, channels, scan_rate
+            See SampleBuffer.
+
+        Returns
+        -------
+        SampleBuffer
+            A new, empty buffer.
+        """
+        memory = np.memmap(path, dtype=np.uint8, mode="w+",
+                           shape=(HEADER_SIZE + num_rows * num_columns * 8,))
+        _write_header(memory, num_rows, num_columns, ring, scan_rate,
+                      channels or [])
+        memory.flush()
+
+        buffer = cls._on_memory(memory)
+        buffer._gaps_path = path + ".gaps"
+        buffer.gaps.save(buffer._gaps_path)
+        return buffer
+
+    @classmethod
+    def create_shm(cls, name: str, num_rows: int, num_columns: int,
+                   ring=False, channels=None,
+                   scan_rate=0.0) -> "SampleBuffer":
+        """
+        Create a buffer in a named shared memory segment, laid out as by
+        create_mmap, that other processes can view without copying with
+        open_shm.
+
+        The segment lasts until the buffer is freed, or this process exits,
+        although processes that have opened it can still read it after.
+        Creating another buffer with the same name in this process replaces
+        the name of the earlier one. Gaps are not shared.
+
+        Parameters
+        ----------
+        name : str
+            The name of the segment.
+        num_rows, num_columns, ring, channels, scan_rate
+            See SampleBuffer.
+
+        Returns
+        -------
+        SampleBuffer
+            A new, empty buffer.
+
+        Raises
+        ------
+        ValueError
+            If another process has a segment with the same name.
+        ImportError
+            If this Python has no shared memory, as before 3.8.
+        """
+        _require_shared_memory()
+        previous = _OWNED_SEGMENTS.pop(name, None)
+        if previous is not None:
+            previous.unlink()
+
+        try:
+            segment = _Segment(
+                name, create=True,
+                size=HEADER_SIZE + num_rows * num_columns * 8)
+        except FileExistsError:
+            raise ValueError("A shared memory segment named %s already"
+                             " exists." % name)
+        _OWNED_SEGMENTS[name] = segment
+
+        memory = np.frombuffer(segment.buf, dtype=np.uint8)
+        _write_header(memory, num_rows, num_columns, ring, scan_rate,
+                      channels or [])
+        buffer = cls._on_memory(memory)
+        weakref.finalize(buffer, _unlink_segment, name, segment)
+        return buffer
+
+    @classmethod
+    def open_shm(cls, name: str) -> "SampleBuffer":
+        """
+        Open, read-only, a segment created by create_shm, likely in another
+        process. Rows are read straight from the shared memory, and
+        rows_written follows the progress of the process writing.
+
+        Parameters
+        ----------
+        name : str
+            The name of the segment.
+
+        Returns
+        -------
+        SampleBuffer
+            A read-only buffer. It has no gaps.
+
+        Raises
+        ------
+        ImportError
+            If this Python has no shared memory, as before 3.8.
+        """
+        _require_shared_memory()
+        segment = _attach_segment(name)
+        memory = np.frombuffer(segment.buf, dtype=np.uint8)
+        memory.flags.writeable = False
+        return cls._on_memory(memory)
+
+    @staticmethod
+    def unlink_shm(name: str) -> bool:
+        """
+        Remove a segment created by create_shm in a process that ended
+        without removing it, such as one that crashed, so its name can be
+        used again. Processes that have it open can still read it.
+
+        Parameters
+        ----------
+        name : str
+            The name of the segment.
+
+        Returns
+        -------
+        bool
+            True if there was a segment to remove.
+
+        Raises
+        ------
+        ImportError
+            If this Python has no shared memory, as before 3.8.
+        """
+        _require_shared_memory()
+        # Opened tracked, so that unlinking it unregisters it in turn.
+        try:
+            segment = shared_memory.SharedMemory(name)
+        except FileNotFoundError:
+            return False
+        segment.close()
+        segment.unlink()
+        return True
+
+    @classmethod
+    def open_mmap(cls, path: str) -> "SampleBuffer":
+        """
+        Open, read-only, a file created by create_mmap. The file may still
+        be being written to by another process, in which case rows_written
+        follows its progress.
+
+        Parameters
+        ----------
+        path : str
+            The file to open.
+
+        Returns
+        -------
+        SampleBuffer
+            A read-only buffer. Its gaps are those saved when it was
+            opened.
+        """
+        buffer = cls._on_memory(np.memmap(path, dtype=np.uint8, mode="r"))
+        if os.path.exists(path + ".gaps"):
+            buffer.gaps = GapIndex.load(path + ".gaps")
+        return buffer
+
+    def flush(self) -> None:
+        """
+        Write any rows not yet on disk to the file backing the buffer, if
+        there is one.
+        """
+        if isinstance(self._mapping, np.memmap) \
+           and self._mapping.flags.writeable:
+            self._mapping.flush()
+        if self._gaps_path is not None and len(self.gaps) != self._gaps_saved:
+            self.gaps.save(self._gaps_path)
+            self._gaps_saved = len(self.gaps)
+        self._last_flush = time.monotonic()
+
+    @property
+    def capacity(self) -> int:
+        """
+        Get the number of rows the buffer can hold.
+        """
+        return self._data.shape[0]
+
+    @property
+    def width(self) -> int:
+        """
+        Get the number of columns in every row.
+        """
+        return self._data.shape[1] + (self.host_clock is not None)
+
+    @property
+    def rows_written(self) -> int:
+        """
+        Get or set the number of rows that have been recorded.
+        """
+        return int(self._rows_written[0])
+
+    @rows_written.setter
+    def rows_written(self, value: int) -> None:
+        if value < 0 or (value > self.capacity and not self._ring):
+            raise ValueError("Invalid number of rows provided, must be in"
+                             " [0, %d]." % self.capacity)
+        self._rows_written[0] = value
+
+    @property
+    def first_row(self) -> int:
+        """
+        Get the number of the oldest row still held.
+        """
+        return max(0, self.rows_written - self.capacity)
+
+    @property
+    def first_intact_row(self) -> int:
+        """
+        Get the number of the oldest row that is not being overwritten by a
+        write in progress. Only differs from first_row in ring mode, in the
+        process writing to the buffer.
+        """
+        return max(0, max(self.rows_written, self._rows_reserved)
+                   - self.capacity)
+
+    @property
+    def ring(self) -> bool:
+        """
+        Get whether the buffer wraps around when full.
+        """
+        return self._ring
+
+    def write(self, values: np.ndarray, device_time: np.ndarray,
+              host_time: Union[np.ndarray, float]) -> Tuple[int, int]:
+        """
+        Append a block of scans to the buffer.
+
+        Parameters
+        ----------
+        values : numpy.ndarray
+            A 2D array of shape (scans, channels).
+        device_time : numpy.ndarray
+            The device time of every scan.
+        host_time : Union[numpy.ndarray, float]
+            The host time of every scan, or one time for all of them.
+
+        Returns
+        -------
+        first_row : int
+            The index of the first row written.
+        num_rows : int
+            The number of rows written. Is smaller than the number of scans
+            given when the buffer has run out of space, or in ring mode, when
+            there are more scans than the buffer can hold.
+        """
+        first_row = self.rows_written
+        num_rows = len(values)
+        skip = 0
+        if not self._ring:
+            num_rows = min(num_rows, self.capacity - first_row)
+        elif num_rows > self.capacity:
+            # The oldest scans would be overwritten by this same block.
+            skip = num_rows - self.capacity
+        if num_rows <= 0:
+            return first_row, 0
+
+        scalar_host_time = np.isscalar(host_time)
+        self._rows_reserved = first_row + num_rows
+
+        # Write in at most two segments, split where the ring wraps around.
+        offset = skip
+        while offset < num_rows:
+            index = (first_row + offset) % self.capacity
+            count = min(self.capacity - index, num_rows - offset)
+
+            self._store(index, values[offset:offset + count],
+                        device_time[offset:offset + count],
+                        host_time if scalar_host_time
+                        else host_time[offset:offset + count])
+
+            offset += count
+
+        # Only publish the rows once they are completely written.
+        self._rows_written[0] = first_row + num_rows
+
+        # LJM fills every channel of a skipped scan, so one is enough to
+        # check.
+        skipped = values[skip:num_rows, 0] == -9999.0
+        if skipped.any():
+            self.gaps.add(first_row + skip, skipped,
+                          device_time[skip:num_rows])
+
+        if self._mapping is not None \
+           and time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+        return first_row + skip, num_rows - skip
+
+    def view(self, from_row: int, to_row: int) -> np.ndarray:
+        """
+        Get a range of recorded rows without copying them.
+
+        Parameters
+        ----------
+        from_row : int
+            The first row to include, inclusive.
+        to_row : int
+            The last row to include, non-inclusive. Is clipped to the number
+            of rows recorded.
+
+        Returns
+        -------
+        array_like: numpy.ndarray
+            A read-only 2D view of the rows. When the rows wrap around the
+            end of a ring buffer, they are instead copied into a new
+            (also read-only) array.
+
+        Raises
+        ------
+        ValueError
+            If from_row has already been overwritten.
+        """
+        if from_row < self.first_row:
+            raise ValueError("Row %d is no longer held in the buffer; the"
+                             " oldest row held is %d."
+                             % (from_row, self.first_row))
+
+        num_rows = max(0, min(to_row, self.rows_written) - from_row)
+        index = from_row % self.capacity if self.capacity else 0
+        if index + num_rows <= self.capacity:
+            rows = self._load(index, num_rows)
+        else:
+            rows = np.concatenate((
+                self._load(index, self.capacity - index),
+                self._load(0, index + num_rows - self.capacity)))
+        if self.host_clock is not None:
+            rows = np.column_stack((rows, self.host_clock.predict(from_row,
+                                                                  num_rows)))
+        rows.flags.writeable = False
+        return rows
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Get the number of bytes used to hold rows.
+        """
+        return self._data.nbytes
+
+    def _store(self, index: int, values: np.ndarray, device_time: np.ndarray,
+               host_time: Union[np.ndarray, float]) -> None:
+        """
+        Write rows at a position in the underlying array, without wrapping.
+        """
+        num_channels = self.width - 2
+        block = self._data[index:index + len(values)]
+        block[:, :num_channels] = values
+        block[:, num_channels] = device_time
+        if self.host_clock is None:
+            block[:, num_channels + 1] = host_time
+
+    def _load(self, index: int, num_rows: int) -> np.ndarray:
+        """
+        Get rows at a position in the underlying array, without wrapping.
+        """
+        return self._data[index:index + num_rows]
+
+
+class ColumnarSampleBuffer(SampleBuffer):
+    """
+    A SampleBuffer that stores every kind of column in its own compact
+    array, rather than every value as a float64 in one 2D array.
+
+    Analog channels share one array of a chosen float type. Digital
+    channels, which only take the values 0 and 1, are stored as one uint8
+    per value, or packed as bits into one integer per row. The device and
+    host times are each kept in their own float64 array.
+
+    Rows are rebuilt in the usual (rows x channels + 2) float64 layout only
+    when view is called, so views are always copies.
+    """
+
+    # Stands in for a skipped (-9999.0) value of an unpacked digital channel.
+    _DIGITAL_SKIPPED = 255
+
+    def __init__(self, num_rows: int, num_columns: int, ring=False,
+                 channels=None, scan_rate=0.0, digital=None,
+                 analog_dtype=np.float32, pack_digital=False,
+                 host_clock: Union[HostClock, None] = None) -> None:
+        """
+        Allocate a buffer.
+
+        Parameters
+        ----------
+        num_rows, num_columns, ring, channels, scan_rate, host_clock
+            See SampleBuffer.
+        digital : sequence of bool, optional
+            For each channel, whether it is a digital line. By default, no
+            channel is.
+        analog_dtype : numpy.dtype, optional
+            The type analog channels are stored as.
+        pack_digital : bool, optional
+            If True, store all digital channels of a row as bits of one
+            integer. Skipped values of digital channels then read back as 0.
+
+        Returns
+        -------
+        ColumnarSampleBuffer
+            A new, empty buffer.
+        """
+        num_channels = num_columns - 2
+        digital = list(digital) if digital is not None \
+            else [False] * num_channels
+        if len(digital) != num_channels:
+            raise ValueError("Expected one digital flag per channel.")
+
+        self._width = num_columns
+        self._analog_columns = [i for i in range(num_channels)
+                                if not digital[i]]
+        self._digital_columns = [i for i in range(num_channels)
+                                 if digital[i]]
+
+        self._analog = _allocate((num_rows, len(self._analog_columns)),
+                                 dtype=analog_dtype)
+        if pack_digital:
+            num_bits = max(8, 1 << (len(self._digital_columns) - 1)
+                           .bit_length())
+            self._bits = np.arange(len(self._digital_columns),
+                                   dtype=np.dtype("uint%d" % num_bits))
+            self._digital = _allocate(num_rows, dtype=self._bits.dtype)
+        else:
+            self._bits = None
+            self._digital = _allocate((num_rows, len(self._digital_columns)),
+                                      dtype=np.uint8)
+        self._device_time = _allocate(num_rows)
+        self._host_time = _allocate(num_rows if host_clock is None else 0)
+        self.host_clock = host_clock
+
+        self._rows_written = np.zeros(1, dtype=np.uint64)
+        self._ring = ring
+        self._mapping = None
+        self._last_flush = 0.0
+        self._gaps_path = None
+        self._gaps_saved = 0
+        self.channels = list(channels or [])
+        self.scan_rate = scan_rate
+        self.gaps = GapIndex()
+
+    @property
+    def capacity(self) -> int:
+        return len(self._device_time)
+
+    @property
+    def width(self) -> int:
+        return self._width
+
+    @property
+    def nbytes(self) -> int:
+        return self._analog.nbytes + self._digital.nbytes \
+            + self._device_time.nbytes + self._host_time.nbytes
+
+    def _store(self, index: int, values: np.ndarray, device_time: np.ndarray,
+               host_time: Union[np.ndarray, float]) -> None:
+        stop = index + len(values)
+        self._analog[index:stop] = values[:, self._analog_columns]
+
+        lines = values[:, self._digital_columns]
+        if self._bits is not None:
+            # Shift each line's bit into place, and combine them per row.
+            bits = (lines > 0).astype(self._bits.dtype) << self._bits
+            np.bitwise_or.reduce(bits, axis=1, out=self._digital[index:stop])
+        else:
+            digital = self._digital[index:stop]
+            digital[:] = lines > 0
+            digital[lines < 0] = self._DIGITAL_SKIPPED
+
+        self._device_time[index:stop] = device_time
+        if self.host_clock is None:
+            self._host_time[index:stop] = host_time
+
+    def _load(self, index: int, num_rows: int) -> np.ndarray:
+        stop = index + num_rows
+        num_channels = self._width - 2
+        rows = np.empty((num_rows, self._width
+                         - (self.host_clock is not None)))
+        rows[:, self._analog_columns] = self._analog[index:stop]
+
+        if self._bits is not None:
+            rows[:, self._digital_columns] = \
+                (self._digital[index:stop, None] >> self._bits) & 1
+        else:
+            digital = self._digital[index:stop]
+            rows[:, self._digital_columns] = np.where(
+                digital == self._DIGITAL_SKIPPED, -9999.0, digital)
+
+        rows[:, num_channels] = self._device_time[index:stop]
+        if self.host_clock is None:
+            rows[:, num_channels + 1] = self._host_time[index:stop]
+        return rows
@@ -0,0 +1,168 @@
+import io
+import os
+import numpy as np
+import pandas as pd
+from typing import Tuple
+
+"""
+A module that provides CSVTailReader, which follows a CSV file as another
+process appends rows to it, such as a recording being written out.
+"""
+
+
+class CSVTailReader(object):
+    """
+    Reads the rows appended to a growing CSV file since the last read.
+
+    The reader remembers the header and the byte offset just past the last
+    complete line it parsed, and each read parses only the complete lines
+    written after it, so polling costs time proportional to the bytes
+    appended rather than to the size of the file. A line still being
+    written is left for the next read.
+
+    If the file is replaced, truncated, or rewritten with different
+    content, the next read starts over from the top of the new file and
+    says so, so a consumer can discard what it read before.
+
+    Attributes
+    ----------
+    path : str
+        The file followed.
+    columns : Union[List[str], None]
+        The names of the columns, from the header, or None until a header
+        has been read.
+    offset : int
+        The byte offset just past the last line read.
+    rows_read : int
+        The number of rows read since the file was last started over.
+
+    Examples
+    --------
+    Plot a recording as it is written:
+
+    >>> tail = CSVTailReader("STREAMING_CSV.csv")
+    >>> while True:
+    >>>     rows, restarted = tail.read()
+    >>>     if restarted:
+    >>>         plot.clear()
+    >>>     plot.append(rows)
+    >>>     time.sleep(1)
+    """
+
+    # The number of bytes before offset kept to check that the file has not
+    # been rewritten since the last read.
+    check_bytes = 64
+
+    def __init__(self, path: str, delimiter=",",
+                 dtype=np.float64) -> None:
+        """
+        Parameters
+        ----------
+        path : str
+            The CSV file to follow. It need not exist yet.
+        delimiter : str, optional
+            The character separating values.
+        dtype : numpy.dtype, optional
+            The type of every value. Rows are returned as a 2D array of it.
+        """
+        self.path = path
+        self.delimiter = delimiter
+        self.dtype = dtype
+        self._restart()
+
+    def _restart(self) -> None:
+        """
+        Forget everything read, so the next read starts at the header.
+        """
+        self.columns = None
+        self.offset = 0
+        self.rows_read = 0
+        self._header = b""
+        self._tail = b""
+        self._inode = None
+
+    def _changed(self, file, stat: os.stat_result) -> bool:
+        """
+        Whether the file was replaced, truncated or rewritten since the
+        last read.
+        """
+        if self.columns is None:
+            return False
+        if stat.st_ino != self._inode or stat.st_size < self.offset:
+            return True
+
+        file.seek(0)
+        if file.read(len(self._header)) != self._header:
+            return True
+        file.seek(self.offset - len(self._tail))
+        return file.read(len(self._tail)) != self._tail
+
+    def read(self) -> Tuple[np.ndarray, bool]:
+        """
+        Parse the complete lines appended since the last read.
+
+        Returns
+        -------
+        rows : numpy.ndarray
+            A 2D array of the new rows, with one column per entry of
+            columns. Has no rows if nothing new was appended, or the file
+            does not exist yet.
+        restarted : bool
+            True if the file was replaced, truncated or rewritten, in which
+            case rows start from the top of the new file, and everything
+            read before should be discarded.
+
+        Raises
+        ------
+        ValueError
+            If an appended line cannot be parsed.
+        """
+        try:
+            file = open(self.path, "rb")
+        except FileNotFoundError:
+            restarted = self.columns is not None
+            self._restart()
+            return self._empty(), restarted
+
+        with file:
+            stat = os.fstat(file.fileno())
+            restarted = self._changed(file, stat)
+            if restarted:
+                self._restart()
+
+            if self.columns is None:
+                file.seek(0)
+                header = file.readline()
+                if not header.endswith(b"\n"):
+                    return self._empty(), restarted
+                self.columns = header.decode("utf-8").strip() \
+                    .split(self.delimiter)
+                self._header = header
+                self._inode = stat.st_ino
+                self.offset = len(header)
+                self._tail = header[-self.check_bytes:]
+
+            file.seek(self.offset)
+            appended = file.read(stat.st_size - self.offset)
+
+        # Only parse up to the end of the last complete line.
+        end = appended.rfind(b"\n") + 1
+        if not end:
+            return self._empty(), restarted
+
+        rows = self._parse(appended[:end])
+        self.offset += end
+        self._tail = (self._tail + appended[:end])[-self.check_bytes:]
+        self.rows_read += len(rows)
+        return rows, restarted
+
+    def _parse(self, lines: bytes) -> np.ndarray:
+        """
+        Parse complete lines into a 2D array.
+        """
+        return pd.read_csv(io.BytesIO(lines), header=None,
+                           names=self.columns, sep=self.delimiter,
+                           dtype=self.dtype, engine="c").to_numpy()
+
+    def _empty(self) -> np.ndarray:
+        return np.empty((0, len(self.columns or [])), dtype=self.dtype)
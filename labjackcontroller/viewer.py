@@ -0,0 +1,254 @@
+import argparse
+import numpy as np
+from typing import List, Tuple, Union
+
+from .labtools import LabjackReader
+from .storage import EnvelopePyramid
+
+try:
+    from bokeh.models import ColumnDataSource
+    from bokeh.palettes import Category10_10
+    from bokeh.plotting import figure
+    from bokeh.server.server import Server
+except ImportError:
+    Server = None
+
+"""
+A module that provides a live Bokeh viewer of a run being recorded into
+storage another process can attach to. Launch it with
+
+    python -m labjackcontroller.viewer mmap:<path>
+
+Requires the bokeh package.
+"""
+
+
+class LiveViewer(object):
+    """
+    A Bokeh app that plots a run while LabjackReader.collect_data records it
+    into shared storage, such as "mmap:<path>".
+
+    Every period, each browser session is sent the rows recorded since its
+    last update, reduced to the min, max and mean of each channel over bins
+    of bin_rows scans, with ColumnDataSource.stream. Sessions keep the
+    latest rollover bins. The cost of an update depends only on the number
+    of rows recorded since the last one, however long the run has lasted.
+
+    Attributes
+    ----------
+    reader : LabjackReader
+        The reader attached to the storage.
+    channels : List[str]
+        The channels plotted.
+    bin_rows : int
+        The number of scans each plotted point summarises.
+    rollover : int
+        The most points each session keeps.
+    period : float
+        The time between updates in seconds.
+    """
+
+    def __init__(self, storage: str, channels: Union[List[str], None] = None,
+                 points_per_second=200, rollover=20000,
+                 period=0.1) -> None:
+        """
+        Parameters
+        ----------
+        storage : str
+            The storage collect_data records into, as given to it, such as
+            "mmap:<path>". See LabjackReader.attach.
+        channels : List[str], optional
+            The channels to plot. Defaults to every channel recorded.
+        points_per_second : float, optional
+            The number of points per second of the run to plot.
+        rollover : int, optional
+            The most points each session keeps. Older points are dropped.
+        period : float, optional
+            The time between updates in seconds.
+
+        Raises
+        ------
+        ValueError
+            If storage cannot be attached to, a channel was not recorded,
+            or another parameter is not valid.
+        """
+        if points_per_second <= 0:
+            raise ValueError("Invalid number of points per second.")
+        if rollover <= 0:
+            raise ValueError("Invalid rollover.")
+        if period <= 0:
+            raise ValueError("Invalid update period.")
+
+        self.reader = LabjackReader.attach(storage)
+        recorded = list(self.reader._input_channels)
+        self.channels = recorded if channels is None else list(channels)
+        for channel in self.channels:
+            if channel not in recorded:
+                raise ValueError("Channel %s was not recorded." % channel)
+        self._columns = [recorded.index(channel) for channel in self.channels]
+
+        scan_rate = self.reader._storage.scan_rate
+        self.bin_rows = max(1, int(round(scan_rate / points_per_second)))
+        self.rollover = rollover
+        self.period = period
+
+    @property
+    def fields(self) -> List[str]:
+        """
+        Get the names of the columns of the data poll returns.
+        """
+        return ["time"] + ["%s_%s" % (channel, stat)
+                           for channel in self.channels
+                           for stat in ("min", "max", "mean")]
+
+    def latest_cursor(self) -> int:
+        """
+        Get the cursor a new session starts polling from, so that its first
+        update holds the latest rollover points.
+
+        Returns
+        -------
+        int
+            A row number to pass to poll.
+        """
+        storage = self.reader._storage
+        return max(storage.first_row,
+                   storage.rows_written - self.rollover * self.bin_rows)
+
+    def poll(self, cursor: int) -> Tuple[Union[dict, None], int]:
+        """
+        Reduce the rows recorded since a cursor to plotted points. Only
+        whole bins are reduced; the rows of a bin still being recorded are
+        left for the next poll.
+
+        Parameters
+        ----------
+        cursor : int
+            The number of the first row not yet plotted.
+
+        Returns
+        -------
+        data : Union[dict, None]
+            The new points, as a dict of 1D arrays keyed by fields, or None
+            if not a whole bin has been recorded since cursor. "time" is the
+            device time of the first scan of each bin.
+        cursor : int
+            The cursor to poll from next.
+        """
+        storage = self.reader._storage
+        # Rows a ring buffer has already overwritten cannot be plotted.
+        cursor = max(cursor, storage.first_row)
+        num_bins = (storage.rows_written - cursor) // self.bin_rows
+        if num_bins <= 0:
+            return None, cursor
+
+        end = cursor + num_bins * self.bin_rows
+        rows = self.reader._reshape_data(cursor, end)
+        bins = rows.reshape(num_bins, self.bin_rows, rows.shape[1])
+        mins, maxs, sums, counts = \
+            EnvelopePyramid._summarise(bins[:, :, self._columns])
+        with np.errstate(invalid="ignore", divide="ignore"):
+            means = sums / counts[:, np.newaxis]
+        empty = counts == 0
+        for values in (mins, maxs, means):
+            values[empty] = np.nan
+
+        data = {"time": bins[:, 0, -2].copy()}
+        for i, channel in enumerate(self.channels):
+            data[channel + "_min"] = mins[:, i]
+            data[channel + "_max"] = maxs[:, i]
+            data[channel + "_mean"] = means[:, i]
+        return data, end
+
+    def modify_doc(self, doc) -> None:
+        """
+        Build a session's plot, and schedule its updates. This is the Bokeh
+        application handler.
+
+        Parameters
+        ----------
+        doc : bokeh.document.Document
+            The document of the session.
+        """
+        source = ColumnDataSource({field: [] for field in self.fields})
+        plot = figure(title=", ".join(self.channels),
+                      x_axis_label="Device Time (s)",
+                      sizing_mode="stretch_both")
+        for i, channel in enumerate(self.channels):
+            color = Category10_10[i % len(Category10_10)]
+            plot.varea(x="time", y1=channel + "_min", y2=channel + "_max",
+                       source=source, color=color, fill_alpha=0.3)
+            plot.line(x="time", y=channel + "_mean", source=source,
+                      color=color, legend_label=channel)
+        doc.add_root(plot)
+
+        cursor = [self.latest_cursor()]
+
+        def update() -> None:
+            data, cursor[0] = self.poll(cursor[0])
+            if data is not None:
+                source.stream(data, rollover=self.rollover)
+
+        doc.add_periodic_callback(update, int(self.period * 1000))
+
+
+def serve(storage: str, port=5006, show=True, **kwargs) -> None:
+    """
+    Run a Bokeh server with a LiveViewer of storage until interrupted.
+
+    Parameters
+    ----------
+    storage : str
+        The storage to view. See LiveViewer.
+    port : int, optional
+        The port to serve on.
+    show : bool, optional
+        Open the viewer in a browser.
+    kwargs
+        Any other argument of LiveViewer.
+
+    Raises
+    ------
+    ImportError
+        If bokeh is not installed.
+    """
+    if Server is None:
+        raise ImportError("The live viewer requires the bokeh package.")
+
+    viewer = LiveViewer(storage, **kwargs)
+    server = Server({"/": viewer.modify_doc}, port=port, num_procs=1)
+    server.start()
+    if show:
+        server.io_loop.add_callback(server.show, "/")
+    server.io_loop.start()
+
+
+def main(argv: Union[List[str], None] = None) -> None:
+    """
+    The command line entry point of the viewer.
+    """
+    parser = argparse.ArgumentParser(
+        prog="python -m labjackcontroller.viewer",
+        description="Plot a run live as collect_data records it.")
+    parser.add_argument("storage",
+                        help="the storage the run is recorded into, such as"
+                             " mmap:<path> or shm:<name>")
+    parser.add_argument("--channels", nargs="+",
+                        help="the channels to plot (default: all)")
+    parser.add_argument("--port", type=int, default=5006)
+    parser.add_argument("--points-per-second", type=float, default=200)
+    parser.add_argument("--rollover", type=int, default=20000,
+                        help="the most points to keep on screen")
+    parser.add_argument("--period", type=float, default=0.1,
+                        help="seconds between updates")
+    parser.add_argument("--no-show", action="store_true",
+                        help="do not open a browser")
+    args = parser.parse_args(argv)
+
+    serve(args.storage, port=args.port, show=not args.no_show,
+          channels=args.channels, points_per_second=args.points_per_second,
+          rollover=args.rollover, period=args.period)
+
+
+if __name__ == "__main__":
+    main()
@@ -6,11 +6,7 @@
 import pandas as pd
 import matplotlib.pyplot as plt
 from labjackcontroller.labtools import LabjackReader
-
-from multiprocessing.managers import BaseManager
-from multiprocessing import Process
-
-import time
+from labjackcontroller.sinks import CSVWriter
 
 from bokeh.models.widgets import DataTable, TableColumn
 from bokeh.models import ColumnDataSource
@@ -18,61 +14,6 @@ from bokeh.models import ColumnDataSource
 from bokeh.palettes import Spectral11 as SpectralColorScheme
 from bokeh.plotting import figure, show, gridplot
 
-## Function definitions:
-def backup(labjack: LabjackReader, basename: str, num_seconds: int) -> None:
-	"""
-	Simple function to backup all data into a pickle.
-
-	Parameters
-	----------
-	labjack: LabjackReader
-		A LabjackReader that is collecting data at the
-		time of this function's call.
-	basename: str
-		The name of the file to write to.
-		If it does not exist yet, it will be created.
-	num_seconds: int
-		The number of seconds to try live backup.
-		After this time, write any remaining data in
-		the labjack's buffer.
-
-	Returns
-	-------
-	None
-
-	"""
-	start_time = time.time()
-	# Write data until time is up.
-	while time.time() - start_time <= num_seconds:
-		time.sleep(0.25) # Waste a second before updating the .csv again
-		curr_time = time.time()
-		curr_rel_time = curr_time - start_time
-		# if not (curr_rel_time) % 60:
-		# if (curr_rel_time) % 60:
-		
-		curr_df = labjack.to_dataframe()
-		if (len(curr_df.columns) > 2):
-			# Convert the analog columns into digital
-			# print("test channels access: {}\n should_discretize: {}".format(channels, should_discretize_analog_channel))
-			if is_pho_home_config:
-				## TODO: See https://pandas.pydata.org/pandas-docs/stable/user_guide/indexing.html#returning-a-view-versus-a-copy to fix annoying error
-				sub_df = curr_df.iloc[:, 0:4] # TODO: hardcoded the analog channels 0:4
-				# print("test: {}".format(sub_df))
-				found_idx = sub_df.gt(2.5).copy()
-				# This should update curr_df too, since sub_df is not a copy
-				sub_df.iloc[found_idx] = 1
-				sub_df.iloc[~found_idx] = 0
-			
-			# curr_df.to_pickle(basename + '.pkl')
-			csv_output_final_filename = basename + '.csv'
-
-			print("Backup at", time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime()))
-			curr_df.to_csv(csv_output_final_filename, encoding='utf-8', index=False)
-			print('\t updated {}'.format(csv_output_final_filename))
-		else:
-			print('\t Input not set up yet at', time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime()))
-
-
 ##
 #################### END FUNCTION DEFININTIONS BLOCK
 
@@ -106,34 +47,16 @@ analog_voltages = [10.0]  # i.e. read input analog_voltages from -10 to 10 volts
 
 num_channels = len(channels)
 
-# BaseManagers can be used to share complex objects, attributes and all, across multiple processes.
-BaseManager.register('LabjackReader', LabjackReader)
-
 def labjackAcqMain():
-	manager = BaseManager()
-	manager.start()
-
-	# Instantiate a shared LabjackReader
-	my_lj = manager.LabjackReader(device_type, connection_type=connection_type)
-
-	## declare the functions we want to run in parallel:
-	#    Declare a data-gathering process
-	data_proc = Process(target=my_lj.collect_data,
-						args=(channels, analog_voltages, duration, freq),
-						kwargs={'resolution': 1, 'scans_per_read': 1})
-
-	#    Declare a data backup process
-	backup_proc = Process(target=backup, args=(my_lj, streaming_csv_output_basename, duration))
+	my_lj = LabjackReader(device_type, connection_type=connection_type)
 
+	# Append each packet's rows to the .csv within a quarter second of being recorded, rather than rewriting the whole run.
+	# Convert the analog columns into digital as they are written.
+	thresholds = {channel: 2.5 for channel in channels[0:4]} if is_pho_home_config else None # TODO: hardcoded the analog channels 0:4
+	csv_writer = CSVWriter(streaming_csv_output_basename + '.csv', thresholds=thresholds, flush_interval=0.25)
 
 	## BEGIN MAIN RUN:
-	# Start all threads, and join when finished.
-	data_proc.start()
-	backup_proc.start()
-
-	## .join() waits for both processes to be complete before moving on with the code's execution
-	data_proc.join()
-	backup_proc.join()
+	my_lj.collect_data(channels, analog_voltages, duration, freq, resolution=1, scans_per_read=1, sinks=[csv_writer])
 
 	# datarun = my_lj.to_dataframe()
 	# # Get all data recorded as a 2D Numpy array
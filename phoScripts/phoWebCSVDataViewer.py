@@ -14,6 +14,7 @@
 import pandas as pd
 import matplotlib.pyplot as plt
 from labjackcontroller.labtools import LabjackReader
+from labjackcontroller.tail import CSVTailReader
 
 from multiprocessing.managers import BaseManager
 from multiprocessing import Process
@@ -162,9 +163,10 @@ def add_vlinked_crosshairs(figs):
 
 # p = figure(plot_width=1024, plot_height=400)
 
-# Read CSV to start to get the names
-read_df = pd.read_csv(csv_watch_path)
-data_columns = read_df.columns[:-2].values # Get all but the last two elements, which are the times
+# Read CSV to start to get the names. The tail reader remembers where it stopped, so later updates only parse the rows appended since.
+csv_tail = CSVTailReader(csv_watch_path)
+initial_rows, _ = csv_tail.read()
+data_columns = csv_tail.columns[:-2] # Get all but the last two elements, which are the times
 num_columns = len(data_columns)
 # print(data_columns)
 
@@ -221,47 +223,29 @@ add_vlinked_crosshairs(figure_list)
 # 	ds2.trigger('data', ds2.data, ds2.data)
 
 
-@linear()
-def update_live_plot(step):
-	read_df = pd.read_csv(csv_watch_path)
-
-	# print(read_df.columns)
-	data_columns = read_df.columns[:-2].values # Get all but the last two elements, which are the times
-	num_columns = len(data_columns)
-
-	# print(data_columns)
-	# print(data_columns)
-	# Get python dictionary from dataframe:
-	# new_data = dict()
-	# new_data['x'] = read_df['System Time']
-	# new_data['y'] = read_df['AIN0']
-	# # new_data['y'] = read_df[['AIN0','AIN1']]
-	# ds1.data = new_data
-
-	# new_data = dict()
-	# new_data['x'] = read_df['System Time']
-	# # new_data['y'] = read_df['AIN0']
-	# new_data['y'] = read_df['AIN1']
-	# ds1.data = new_data
-
-	# # ds1.data['x'].append(step)
-	# # ds1.data['y'].append(randint(0,100))
-	# # ds2.data['x'].append(step)
-	# # ds2.data['y'].append(randint(0,100))  
-	# ds1.trigger('data', ds1.data, ds1.data)
-	# ds2.trigger('data', ds2.data, ds2.data)
-
-
-	# for column_name in data_columns:
-	# for i in range(num_columns):
+def stream_rows(rows, restarted):
+	# Append new rows to each plot, or replace what they show if the csv was rewritten.
+	if csv_tail.columns is None:
+		return # The csv is being rewritten, and has no header yet.
+	system_time = rows[:, csv_tail.columns.index('System Time')]
 	for i, curr_col_name in enumerate(data_columns):
-		# curr_col_name = data_columns[i]
 		curr_new_data = dict()
-		curr_new_data['x'] = read_df['System Time']
-		curr_new_data['y'] = read_df[curr_col_name]
-		datasource_list[i].data = curr_new_data
-		datasource_list[i].trigger('data', datasource_list[i].data, datasource_list[i].data)
+		curr_new_data['x'] = system_time
+		curr_new_data['y'] = rows[:, i]
+		if restarted:
+			datasource_list[i].data = curr_new_data
+		elif len(rows):
+			datasource_list[i].stream(curr_new_data)
+
+
+@linear()
+def update_live_plot(step):
+	# Only parse the rows appended to the csv since the last update.
+	new_rows, restarted = csv_tail.read()
+	stream_rows(new_rows, restarted)
+
 
+stream_rows(initial_rows, True)
 
 ## Build Live Plot:
 # curdoc().add_root(p)
@@ -0,0 +1,65 @@
+import threading
+
+import pytest
+import numpy as np
+from labjackcontroller.executors import CallbackExecutor
+
+
+def make_block(num_rows):
+    return np.arange(num_rows * 3, dtype=np.float64).reshape((-1, 3))
+
+
+@pytest.mark.parametrize("mode", ["inline", "thread"])
+def test_every_row_called(mode):
+    rows = []
+    executor = CallbackExecutor(rows.append, mode=mode, num_workers=1,
+                                max_pending=4)
+    for _ in range(5):
+        executor.submit(make_block(7))
+    stats = executor.close()
+
+    assert stats == {"completed": 35, "dropped": 0, "coalesced": 0}
+    assert rows == make_block(7).tolist() * 5
+
+
+@pytest.mark.parametrize("policy", ["drop_oldest", "coalesce"])
+def test_overflow_policies(policy):
+    release = threading.Event()
+    rows = []
+
+    def callback(row):
+        release.wait()
+        rows.append(row)
+
+    executor = CallbackExecutor(callback, mode="thread", num_workers=1,
+                                max_pending=10, overflow_policy=policy)
+    executor.submit(make_block(1))
+    # Give the worker time to take the first row off the queue.
+    while executor._pending:
+        pass
+    executor.submit(make_block(25))
+    release.set()
+    stats = executor.close()
+
+    discarded = stats["dropped"] + stats["coalesced"]
+    assert stats["completed"] + discarded == 26
+    assert discarded > 0
+    # The newest row is always kept.
+    assert rows[-1] == make_block(25)[-1].tolist()
+
+
+def test_callback_errors_raised():
+    def callback(row):
+        raise RuntimeError("callback failed")
+
+    executor = CallbackExecutor(callback, mode="thread")
+    executor.submit(make_block(3))
+    with pytest.raises(RuntimeError):
+        executor.close()
+
+
+def test_invalid_options():
+    with pytest.raises(ValueError):
+        CallbackExecutor(print, mode="fiber")
+    with pytest.raises(ValueError):
+        CallbackExecutor(print, mode="inline", overflow_policy="ignore")
@@ -1,7 +1,17 @@
 import pytest
+import asyncio
 import itertools
+import os
+import signal
+import threading
+import time
 import numpy as np
-from labjackcontroller.labtools import LabjackReader, LJMLibrary
+from labjackcontroller import labtools
+from labjackcontroller.labtools import LabjackReader, LJMLibrary, \
+    IncrementalFrame, MultiLabjackReader, merge_digital_lines
+from labjackcontroller.process import ReaderProcess
+from labjackcontroller.pubsub import Publisher, Subscriber
+from labjackcontroller.storage import SampleBuffer
 
 
 @pytest.fixture(scope='session')
@@ -132,6 +142,31 @@ def test_callbacks(get_ljm_devices):
 
         # Should return back our 3 data column and 2 time columns.
         assert np.shape(curr_device.to_array(mode="all")) == (10, 5)
+        assert curr_device.callback_stats == {"completed": 10, "dropped": 0,
+                                              "coalesced": 0}
+
+
+def test_block_callbacks(get_ljm_devices):
+    for device_args in get_ljm_devices:
+        curr_device = LabjackReader(*device_args[:3])
+
+        blocks = []
+
+        def block_callback(block, start_row, device_time, host_time):
+            assert np.shape(block)[1] == 4
+            assert device_time == block[0, -2]
+            blocks.append((start_row, len(block)))
+
+        # Scan for 2 seconds at 10 Hz, 5 scans per packet.
+        curr_device.collect_data(["AIN0", "AIN2"], 2 * [10.0], 2, 10,
+                                 scans_per_read=5,
+                                 block_callback=block_callback)
+
+        # Every row is handed over once, in order.
+        assert blocks[0][0] == 0
+        for (start, length), (next_start, _) in zip(blocks, blocks[1:]):
+            assert next_start == start + length
+        assert sum(length for _, length in blocks) == 20
 
 
 def new_callback(row):
@@ -140,6 +175,90 @@ def new_callback(row):
     assert len(row) == 5
 
 
+def legacy_ingest(packet, packet_num, num_channels, scans_per_read,
+                  frequency):
+    """
+    The per-sample loop collect_data ran on each packet before block
+    ingestion, less host times. Returns the rows and the scans skipped.
+    """
+    rows = []
+    for i in range(0, len(packet), num_channels):
+        curr_time = (scans_per_read / frequency) \
+            * (packet_num + (i / len(packet)))
+        rows.append(list(packet[i:i + num_channels]) + [curr_time])
+
+    curr_skip = 0
+    for value in packet:
+        if value == -9999.0:
+            curr_skip += 1
+    return rows, curr_skip / num_channels
+
+
+def test_block_ingest(get_ljm_devices):
+    num_channels, scans_per_read, frequency = 3, 10, 100
+    packets = np.random.RandomState(0).uniform(
+        -10, 10, (4, scans_per_read * num_channels))
+    # Skip two scans within a packet, and a run of three across two.
+    packets[1, 3 * num_channels:5 * num_channels] = -9999.0
+    packets[2, -num_channels:] = -9999.0
+    packets[3, :2 * num_channels] = -9999.0
+
+    for device_args in get_ljm_devices:
+        curr_device = LabjackReader(*device_args[:3])
+        curr_device._storage = SampleBuffer(len(packets) * scans_per_read,
+                                            num_channels + 2)
+        curr_device._scan_width = num_channels
+        curr_device._scan_times = np.arange(scans_per_read) / frequency
+        curr_device._packet_times = np.empty(scans_per_read)
+
+        expected = []
+        num_skipped = 0
+        for packet_num, packet in enumerate(packets):
+            scans, device_time = curr_device._packet_block(
+                packet, packet_num, scans_per_read / frequency)
+            curr_device._store_block(scans, device_time, 0.0)
+
+            rows, curr_skip = legacy_ingest(packet, packet_num, num_channels,
+                                            scans_per_read, frequency)
+            expected += rows
+            num_skipped += curr_skip
+
+        # Blocks hold the same rows as the per-sample loop wrote, and skips
+        # are counted the same.
+        expected = np.array(expected)
+        stored = curr_device._storage.view(0, len(expected))
+        assert np.array_equal(stored[:, :num_channels],
+                              expected[:, :num_channels])
+        assert np.allclose(stored[:, num_channels], expected[:, -1])
+        assert curr_device._storage.gaps.num_skipped == num_skipped == 5
+        assert len(curr_device._storage.gaps) == 2
+
+
+def test_stream_read_buffers(get_ljm_devices):
+    library = LJMLibrary()
+    for device_args in get_ljm_devices:
+        handle = library.connection_open(*device_args[:3])
+        library.stream_start(handle, ["AIN0"], 100, 10)
+        try:
+            first = library.stream_read(handle)[0]
+            kept = first.copy()
+            assert not first.flags.writeable
+
+            # A packet stays intact through the next read, which fills the
+            # other buffer...
+            second = library.stream_read(handle)[0]
+            assert not np.shares_memory(first, second)
+            assert np.array_equal(first, kept)
+
+            # ...and its buffer is only reused by the read after that.
+            third = library.stream_read(handle)[0]
+            assert np.shares_memory(first, third)
+            assert not np.shares_memory(second, third)
+        finally:
+            library.stream_stop(handle)
+            library.connection_close(handle)
+
+
 def test_to_array(get_ljm_devices):
     for device_args in get_ljm_devices:
         # First test with no data stored.
@@ -173,3 +292,486 @@ def test_to_array(get_ljm_devices):
 
         with pytest.raises(Exception):
             curr_device.to_array(mode='range', start=-30, end=4)
+
+
+def test_to_array_skipped(get_ljm_devices):
+    for device_args in get_ljm_devices:
+        curr_device = LabjackReader(*device_args[:3])
+        curr_device.collect_data(["AIN0"], [10.0], 1, 10)
+
+        # Without skipped samples, nothing needs replacing.
+        assert len(curr_device.gaps) == 0
+        assert curr_device.to_array(skipped="nan") is not None
+        assert not np.isnan(curr_device.to_array(skipped="nan")).any()
+        assert np.array_equal(curr_device.to_array(skipped="interpolate"),
+                              curr_device.to_array())
+
+        with pytest.raises(ValueError):
+            curr_device.to_array(skipped="zero")
+
+
+def test_collect_data_host_time(get_ljm_devices):
+    for device_args in get_ljm_devices:
+        curr_device = LabjackReader(*device_args[:3])
+
+        for host_time in ["stored", "export"]:
+            curr_device.collect_data(["AIN0"], [10.0], 2, 10,
+                                     scans_per_read=5, host_time=host_time)
+
+            # Host times are fitted per scan, so they always increase.
+            data = curr_device.to_array()
+            assert np.shape(data) == (20, 3)
+            assert np.all(np.diff(data[:, -1]) > 0)
+            assert curr_device.host_clock.num_packets == 4
+
+
+def test_collect_data_trigger(get_ljm_devices):
+    for device_args in get_ljm_devices:
+        curr_device = LabjackReader(*device_args[:3])
+        if curr_device.device_type != "T7":
+            continue
+
+        for trigger, trigger_edge in [("DIO_EF8", "rising"),
+                                      ("FIO0", "rising"),
+                                      ("DIO_EF0", "both")]:
+            with pytest.raises(ValueError):
+                curr_device.collect_data(["AIN0"], [10.0], 1, 10,
+                                         trigger=trigger,
+                                         trigger_edge=trigger_edge)
+
+        # With nothing driving DIO0, the stream waits for the trigger
+        # without timing out, until stopped.
+        timer = threading.Timer(2, curr_device.stop)
+        timer.start()
+        curr_device.collect_data(["AIN0"], [10.0], None, 10,
+                                 scans_per_read=5, ring_rows=10,
+                                 trigger="DIO_EF0")
+        timer.join()
+        assert curr_device.to_array() is None
+
+        # Untriggered streams are unaffected afterwards.
+        curr_device.collect_data(["AIN0"], [10.0], 1, 10, scans_per_read=5)
+        assert np.shape(curr_device.to_array()) == (10, 3)
+
+
+def test_collect_data_trigger_shared(get_ljm_devices):
+    if len(get_ljm_devices) < 2:
+        pytest.skip("Needs two LabJack devices.")
+
+    # The LJM settings triggered streams read with are only put back once
+    # the last of them ends.
+    multi = MultiLabjackReader([device_args[:3]
+                                for device_args in get_ljm_devices[:2]])
+    thread = threading.Thread(target=multi.collect_data,
+                              args=(["AIN0"], [10.0], None, 10),
+                              kwargs={"scans_per_read": 5, "ring_rows": 10,
+                                      "trigger": "DIO_EF0"})
+    thread.start()
+    while labtools._triggered_streams < 2:
+        time.sleep(0.01)
+    multi[0].stop()
+    while multi[0]._trigger is not None:
+        time.sleep(0.01)
+    assert labtools._triggered_streams == 1
+    multi.stop()
+    thread.join()
+    assert labtools._triggered_streams == 0
+
+
+def test_query_envelope(get_ljm_devices):
+    for device_args in get_ljm_devices:
+        curr_device = LabjackReader(*device_args[:3])
+        curr_device.collect_data(["AIN0"], [10.0], 2, 100, scans_per_read=50,
+                                 envelope=True)
+        data = curr_device.to_array()
+        assert curr_device.envelope.rows_added == len(data)
+
+        envelope = curr_device.query_envelope("AIN0", 0, 2, max_points=10)
+        assert 0 < len(envelope.time) <= 10
+        assert envelope.min.min() == data[:, 0].min()
+        assert envelope.max.max() == data[:, 0].max()
+
+        with pytest.raises(ValueError):
+            curr_device.query_envelope("AIN1", 0, 2)
+
+        curr_device.collect_data(["AIN0"], [10.0], 1, 100)
+        with pytest.raises(ValueError):
+            curr_device.query_envelope("AIN0", 0, 1)
+
+
+def test_to_array_views(get_ljm_devices):
+    for device_args in get_ljm_devices:
+        curr_device = LabjackReader(*device_args[:3])
+
+        # Scan for 1 second at 10 Hz.
+        curr_device.collect_data(["AIN0"], [10.0], 1, 10)
+
+        all_rows = curr_device.to_array(mode="all")
+        some_rows = curr_device.to_array(mode='range', start=2, end=4)
+
+        # Data is shared with the reader, and cannot be modified through it.
+        assert np.shares_memory(all_rows, some_rows)
+        assert not all_rows.flags.writeable
+        with pytest.raises(ValueError):
+            some_rows[0, 0] = 1.0
+
+        assert np.array_equal(np.asarray(curr_device), all_rows)
+        assert np.shares_memory(np.asarray(curr_device), all_rows)
+
+
+def test_collect_data_ring(get_ljm_devices):
+    for device_args in get_ljm_devices:
+        curr_device = LabjackReader(*device_args[:3])
+
+        # Scan for 2 seconds at 10 Hz, holding only the last 15 rows.
+        curr_device.collect_data(["AIN0"], [10.0], 2, 10, ring_rows=15)
+
+        assert curr_device.max_row == 20
+        assert np.shape(curr_device.to_array(mode="all")) == (15, 3)
+
+        # Rows come back in order, even across the wraparound.
+        device_times = curr_device.to_array(mode='relative', num_rows=15)[:, 1]
+        assert np.all(np.diff(device_times) > 0)
+
+        assert np.shape(curr_device
+                        .to_array(mode='range', start=6, end=9)) == (3, 3)
+
+        # Rows that have been overwritten are unavailable.
+        with pytest.raises(Exception):
+            curr_device.to_array(mode='relative', num_rows=16)
+
+        with pytest.raises(Exception):
+            curr_device.to_array(mode='range', start=2, end=9)
+
+        # Runs without a duration need somewhere bounded to put data.
+        with pytest.raises(ValueError):
+            curr_device.collect_data(["AIN0"], [10.0], None, 10)
+
+
+def test_collect_data_columnar(get_ljm_devices):
+    for device_args in get_ljm_devices:
+        curr_device = LabjackReader(*device_args[:3])
+
+        for pack_digital in [False, True]:
+            curr_device.collect_data(["AIN0", "DIO0"], [10.0], 2, 10,
+                                     layout="columnar",
+                                     pack_digital=pack_digital)
+
+            assert curr_device.max_row == 20
+            data = curr_device.to_array()
+            assert np.shape(data) == (20, 4)
+            assert np.all(np.isin(data[:, 1], [0, 1, -9999]))
+            assert np.all(np.diff(data[:, 2]) > 0)
+
+        # Columnar storage only lives in memory.
+        with pytest.raises(ValueError):
+            curr_device.collect_data(["AIN0"], [10.0], 2, 10,
+                                     layout="columnar", storage="mmap:x")
+
+
+def test_merge_digital_lines():
+    scan_list, source, shift = merge_digital_lines(["AIN0", "FIO0", "FIO2",
+                                                    "EIO1"])
+    assert scan_list == ["AIN0", "FIO_EIO_STATE"]
+    assert list(source) == [0, 1, 1, 1]
+    assert list(shift) == [-1, 0, 2, 9]
+
+    # Lines alone on their port, or from one port, need no wider register.
+    assert merge_digital_lines(["FIO0", "CIO0", "CIO3"])[0] \
+        == ["FIO0", "CIO_STATE"]
+
+
+def test_collect_data_digital_ports(get_ljm_devices):
+    for device_args in get_ljm_devices:
+        curr_device = LabjackReader(*device_args[:3])
+
+        inputs = ["AIN0", "DIO0", "DIO1"]
+        curr_device.collect_data(inputs, [10.0], 2, 10)
+        data = curr_device.to_array()
+        assert np.shape(data) == (20, 5)
+        assert np.all(np.isin(data[:, 1:3], [0, 1, -9999]))
+
+        # Packed, the port is one column holding both lines as bits.
+        curr_device.collect_data(inputs, [10.0], 2, 10,
+                                 digital_ports="packed")
+        packed = curr_device.to_array()
+        assert np.shape(packed) == (20, 4)
+        assert np.all(np.isin(packed[:, 1] % 4, [0, 1, 2, 3]))
+
+
+def test_iter_blocks(get_ljm_devices):
+    for device_args in get_ljm_devices:
+        curr_device = LabjackReader(*device_args[:3])
+
+        # Stream for 2 seconds at 10 Hz, 5 scans per packet.
+        num_scans = 0
+        for rows, device_time, host_time, backlog in \
+                curr_device.iter_blocks(["AIN0"], [10.0], 10, seconds=2,
+                                        scans_per_read=5):
+            assert np.shape(rows) == (5, 1)
+            assert np.all(np.diff(device_time) > 0)
+            num_scans += len(rows)
+        assert num_scans == 20
+
+        # Nothing is stored.
+        assert curr_device.to_array() is None
+
+        # Closing the generator early stops the stream.
+        blocks = curr_device.iter_blocks(["AIN0"], [10.0], 10,
+                                         scans_per_read=5)
+        next(blocks)
+        blocks.close()
+
+
+def test_multi_device(get_ljm_devices):
+    if not get_ljm_devices:
+        pytest.skip("No LabJack devices connected.")
+
+    multi = MultiLabjackReader([device_args[:3]
+                                for device_args in get_ljm_devices])
+    results = multi.collect_data(["AIN0"], [10.0], 2, 100)
+    assert len(results) == len(get_ljm_devices)
+    assert multi.columns[-1] == "Time"
+    assert np.all(multi.start_offsets >= 0)
+
+    for i in range(len(multi)):
+        times = multi.timebase(i)
+        assert len(times) == multi[i].max_row
+        assert np.all(np.diff(times) > 0)
+
+    merged = multi.to_array()
+    assert merged.shape[1] == len(get_ljm_devices) + 1
+    assert np.all(np.diff(merged[:, -1]) > 0)
+    assert multi.to_array(method="linear").shape == merged.shape
+    assert list(multi.to_dataframe().columns) == multi.columns
+
+    with pytest.raises(ValueError):
+        multi.to_array(method="nearest")
+    with pytest.raises(ValueError):
+        multi.collect_data([["AIN0"]] * (len(multi) + 1), [10.0], 1, 100)
+
+    # A device failing to set up stops the others, even an open-ended run
+    # that had yet to start streaming.
+    failing = MultiLabjackReader([get_ljm_devices[0][:3]] * 2)
+    for _ in range(5):
+        with pytest.raises(ValueError):
+            failing.collect_data(["AIN0"], [10.0], None, 100,
+                                 storage=["nowhere:", None], ring_rows=100)
+        assert all(reader._shared_stop is None for reader in failing)
+
+
+def test_astream(get_ljm_devices):
+    async def read_blocks(curr_device, num_blocks):
+        blocks = []
+        async with curr_device.astream(["AIN0", "AIN2"], 2 * [10.0], 100,
+                                       scans_per_read=10) as stream:
+            async for block in stream:
+                blocks.append(block)
+                if len(blocks) == num_blocks:
+                    break
+        return blocks
+
+    for device_args in get_ljm_devices:
+        curr_device = LabjackReader(*device_args[:3])
+
+        blocks = asyncio.get_event_loop().run_until_complete(
+            read_blocks(curr_device, 5))
+
+        assert len(blocks) == 5
+        for block in blocks:
+            assert np.shape(block.rows) == (10, 2)
+            assert np.shape(block.device_time) == (10,)
+        # Blocks are copies, and follow on from each other.
+        assert blocks[1].device_time[0] > blocks[0].device_time[-1]
+
+
+def test_collect_data_mmap(get_ljm_devices, tmp_path):
+    for device_args in get_ljm_devices:
+        curr_device = LabjackReader(*device_args[:3])
+        storage = "mmap:" + str(tmp_path / "run.buf")
+
+        # Scan for 1 second at 10 Hz, into a file.
+        curr_device.collect_data(["AIN0"], [10.0], 1, 10, storage=storage)
+        assert np.shape(curr_device.to_array(mode="all")) == (10, 3)
+
+        # Another reader can get the same data back from the file alone.
+        attached = LabjackReader.attach(storage)
+        assert attached.max_row == 10
+        assert list(attached.to_dataframe().columns) == \
+            ["AIN0", "Time", "System Time"]
+        assert np.array_equal(attached.to_array(mode="all"),
+                              curr_device.to_array(mode="all"))
+
+    with pytest.raises(ValueError):
+        LabjackReader.attach("nowhere")
+
+
+def test_attach_read_only(tmp_path):
+    path = str(tmp_path / "run.buf")
+    SampleBuffer.create_mmap(path, 10, 3, channels=["AIN0"], scan_rate=10.0)
+
+    # A reader attached to storage describes it, and has no device.
+    with LabjackReader.attach("mmap:" + path) as reader:
+        assert repr(reader) == str(reader) \
+            == "LabjackReader(attached to mmap:%s)" % path
+        assert not reader.connection_status
+        with pytest.raises(RuntimeError):
+            reader.open()
+    reader.close()
+
+
+def test_read_since(tmp_path):
+    path = str(tmp_path / "run.buf")
+    buffer = SampleBuffer.create_mmap(path, 50, 3, ring=True,
+                                      channels=["AIN0"], scan_rate=10.0)
+    buffer.write(np.arange(20.0)[:, np.newaxis], np.arange(20) / 10.0, 0.0)
+    reader = LabjackReader.attach("mmap:" + path)
+
+    # Each consumer has its own cursor.
+    rows, cursor = reader.read_since(0, max_rows=15)
+    assert cursor == 15 and rows[:, 0].tolist() == list(range(15))
+    rows, cursor = reader.read_since(cursor)
+    assert cursor == 20 and rows[:, 0].tolist() == list(range(15, 20))
+    rows, cursor = reader.read_since(cursor)
+    assert cursor == 20 and np.shape(rows) == (0, 3)
+
+    # Rows a ring buffer overwrote are skipped.
+    frame = IncrementalFrame(reader, max_rows=30)
+    assert frame.update()["AIN0"].tolist() == list(range(20))
+    buffer.write(np.arange(20.0, 80.0)[:, np.newaxis],
+                 np.arange(20, 80) / 10.0, 0.0)
+    rows, cursor = reader.read_since(cursor)
+    assert cursor == 80 and rows[0, 0] == 30.0
+    assert frame.update()["AIN0"].tolist() == list(range(50, 80))
+    assert list(frame.frame.columns) == ["AIN0", "Time", "System Time"]
+
+
+def test_read_since_live(get_ljm_devices):
+    for device_args in get_ljm_devices:
+        curr_device = LabjackReader(*device_args[:3])
+        thread = threading.Thread(target=curr_device.collect_data,
+                                  args=(["AIN0"], [10.0], 1, 1000),
+                                  kwargs={"scans_per_read": 100})
+        thread.start()
+
+        # Polling while recording gets every row exactly once.
+        while curr_device.max_row <= 0:
+            time.sleep(0.01)
+        frame = IncrementalFrame(curr_device)
+        while thread.is_alive():
+            frame.update()
+        thread.join()
+        frame.update()
+        assert frame.cursor == 1000
+        assert np.array_equal(frame.frame.values,
+                              curr_device.to_array(mode="all"))
+
+
+def test_collect_data_shm(get_ljm_devices):
+    for device_args in get_ljm_devices:
+        curr_device = LabjackReader(*device_args[:3])
+        storage = "shm:ljc_test_run"
+
+        # Scan for 1 second at 10 Hz, into shared memory.
+        curr_device.collect_data(["AIN0"], [10.0], 1, 10, storage=storage)
+
+        # Another reader sees the same rows, without a copy being made.
+        attached = LabjackReader.attach(storage)
+        assert attached.max_row == 10
+        assert np.array_equal(attached.to_array(mode="all"),
+                              curr_device.to_array(mode="all"))
+        del attached
+
+    with pytest.raises(FileNotFoundError):
+        LabjackReader.attach("shm:ljc_test_nowhere")
+
+
+def wait_until(condition, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def test_reader_process(get_ljm_devices):
+    for device_args in get_ljm_devices:
+        process = ReaderProcess(*device_args[:3], restart_delay=0.1)
+        try:
+            # Runs are bounded, so a child left behind still exits.
+            process.start(["AIN0"], [10.0], 1000, 30, ring_rows=5000,
+                          scans_per_read=100)
+            assert wait_until(lambda: process.reader is not None)
+            # The parent only attaches once the child has written the
+            # header.
+            assert process.reader._storage.capacity == 5000
+            assert process.reader._input_channels == ["AIN0"]
+            assert wait_until(lambda: process.reader.max_row > 0)
+            status = process.status()
+            assert status["running"] and status["rows_written"] > 0
+
+            # A child that crashes is restarted, and a new run begins.
+            os.kill(status["pid"], signal.SIGKILL)
+            assert wait_until(lambda: process.restarts > 0
+                              and process.reader is not None)
+            restarted = process.status()
+            assert restarted["pid"] != status["pid"]
+            assert restarted["restarts"] == 1
+            assert "exited" in process.error
+
+            assert process.stop(timeout=10)
+            assert not process.status()["running"]
+            assert process.reader.max_row > 0
+
+            with pytest.raises(ValueError):
+                process.start(["AIN0"], [10.0], 1000)
+
+            # A stop that reaches the child before its stream starts ends
+            # the run too.
+            process.start(["AIN0"], [10.0], 1000, 30, ring_rows=5000)
+            assert process.stop(timeout=10)
+        finally:
+            process.stop(timeout=10)
+
+
+def test_collect_data_publish(get_ljm_devices, tmp_path):
+    for device_args in get_ljm_devices:
+        curr_device = LabjackReader(*device_args[:3])
+        address = "unix:" + str(tmp_path / "pub.sock")
+
+        with Publisher(address) as publisher:
+            subscriber = Subscriber(address, timeout=5)
+            while publisher.num_subscribers == 0:
+                time.sleep(0.01)
+            # Scan for 1 second at 100 Hz, publishing every packet.
+            curr_device.collect_data(["AIN0"], [10.0], 1, 100,
+                                     sinks=[publisher])
+
+            blocks = []
+            block = subscriber.read(timeout=5)
+            assert subscriber.columns == ["AIN0", "Time", "System Time"]
+            while block is not None:
+                blocks.append(block)
+                block = subscriber.read(timeout=5)
+
+        assert np.array_equal(np.concatenate([block.rows
+                                              for block in blocks]),
+                              curr_device.to_array(mode="all"))
+
+
+def test_export_parquet(get_ljm_devices, tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+
+    for device_args in get_ljm_devices:
+        curr_device = LabjackReader(*device_args[:3])
+
+        # Scan for 1 second at 100 Hz, and save it in row groups of 30.
+        curr_device.collect_data(["AIN0"], [10.0], 1, 100)
+        path = str(tmp_path / "run.parquet")
+        assert curr_device.export_parquet(path, row_group_rows=30) == 100
+
+        exported = pq.ParquetFile(path)
+        assert exported.metadata.num_row_groups == 4
+        assert np.array_equal(exported.read().to_pandas().values,
+                              curr_device.to_array(mode="all"))
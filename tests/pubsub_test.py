@@ -0,0 +1,122 @@
+import pytest
+import socket
+import time
+import numpy as np
+from labjackcontroller.pubsub import Publisher, Subscriber, _BLOCK, \
+    _BLOCK_HEADER, _END, _FRAME, _FRAME_MAGIC
+
+
+METADATA = {"channels": ["AIN0"],
+            "columns": ["AIN0", "Time", "System Time"],
+            "scan_rate": 100.0}
+
+
+def wait_for_subscribers(publisher, num_subscribers):
+    while publisher.num_subscribers < num_subscribers:
+        time.sleep(0.001)
+
+
+@pytest.mark.parametrize("address", ["unix:{tmp}/pub.sock",
+                                     "tcp:127.0.0.1:0"])
+def test_publish_subscribe(tmp_path, address):
+    with Publisher(address.format(tmp=tmp_path)) as publisher:
+        subscriber = Subscriber(publisher.address, timeout=5)
+        wait_for_subscribers(publisher, 1)
+
+        # Blocks arrive with the run's metadata and their row numbers.
+        publisher.open(METADATA)
+        rows = np.arange(30.0).reshape(10, 3)
+        publisher.write_block(rows[:4], 0)
+        publisher.write_block(rows[4:], 4)
+        publisher.close()
+
+        assert [block.start_row for block in subscriber] == [0, 4]
+        assert subscriber.metadata is None
+
+        # A subscriber joining mid-run is sent its metadata first.
+        publisher.open(METADATA)
+        late = Subscriber(publisher.address, timeout=5)
+        wait_for_subscribers(publisher, 2)
+        publisher.write_block(rows, 10)
+        block = late.read(timeout=5)
+        assert late.columns == METADATA["columns"]
+        assert block.start_row == 10 and np.array_equal(block.rows, rows)
+        with pytest.raises(TimeoutError):
+            late.read(timeout=0.01)
+
+    # Subscribers are disconnected once the publisher shuts down.
+    assert subscriber.read(timeout=5).start_row == 10
+    assert subscriber.read(timeout=5) is None and subscriber.closed
+
+
+@pytest.mark.parametrize("overflow_policy", ["coalesce", "disconnect"])
+def test_publish_slow_subscriber(tmp_path, overflow_policy):
+    address = "unix:" + str(tmp_path / "pub.sock")
+    with Publisher(address, max_queued_blocks=2,
+                   overflow_policy=overflow_policy) as publisher:
+        slow = Subscriber(address, timeout=5)
+        wait_for_subscribers(publisher, 1)
+        publisher.open(METADATA)
+
+        # Blocks too big for the socket's buffers to absorb, published
+        # without being read, never hold up the publisher.
+        block = np.zeros((50000, 3))
+        for i in range(20):
+            publisher.write_block(block, i * len(block))
+
+        starts = []
+        while True:
+            received = slow.read(timeout=5)
+            if received is None:
+                break
+            starts.append(received.start_row)
+            if starts[-1] == 19 * len(block):
+                break
+
+    if overflow_policy == "coalesce":
+        assert publisher.coalesced > 0 and starts[-1] == 19 * len(block)
+        assert len(starts) < 20
+    else:
+        assert publisher.dropped == 1 and slow.closed
+    assert publisher.num_subscribers == 0
+
+    with pytest.raises(ValueError):
+        Publisher("udp:localhost:5000")
+
+
+def test_publish_subscriber_churn(tmp_path):
+    address = "unix:" + str(tmp_path / "pub.sock")
+    with Publisher(address) as publisher:
+        publisher.open(METADATA)
+        for _ in range(20):
+            with Subscriber(address, timeout=5):
+                wait_for_subscribers(publisher, 1)
+
+            # Publishing finds the subscriber gone, and forgets it.
+            deadline = time.monotonic() + 5
+            while publisher._connections and time.monotonic() < deadline:
+                publisher.write_block(np.zeros((1, 3)), 0)
+                time.sleep(0.001)
+            assert not publisher._connections
+
+
+@pytest.mark.parametrize("frame", [
+    # Claims a 1 TiB payload.
+    _FRAME.pack(_FRAME_MAGIC, _BLOCK, 1 << 40),
+    # Claims more rows than the frame holds.
+    _FRAME.pack(_FRAME_MAGIC, _BLOCK, _BLOCK_HEADER.size + 8)
+    + _BLOCK_HEADER.pack(0, 1000, 3) + bytes(8),
+    _FRAME.pack(b"XXXX", _END, 0)],
+    ids=["oversized", "truncated", "not_a_frame"])
+def test_subscribe_corrupt_frame(tmp_path, frame):
+    path = str(tmp_path / "pub.sock")
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as server:
+        server.bind(path)
+        server.listen()
+        subscriber = Subscriber("unix:" + path, timeout=5)
+        connection, _ = server.accept()
+        with connection:
+            connection.sendall(frame)
+            with pytest.raises(ValueError):
+                subscriber.read(timeout=5)
+    assert subscriber.closed
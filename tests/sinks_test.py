@@ -0,0 +1,119 @@
+import pytest
+import time
+import tracemalloc
+import numpy as np
+from labjackcontroller.sinks import BackgroundWriter, CSVWriter, HDF5Writer
+
+
+@pytest.fixture
+def metadata():
+    return {"channels": ["AIN0"],
+            "columns": ["AIN0", "Time", "System Time"],
+            "scan_rate": 100.0,
+            "scans_per_read": 7,
+            "resolution": 1,
+            "device_type": "T7",
+            "serial_number": 470000000}
+
+
+def make_blocks(num_blocks, rows_per_block):
+    rows = np.arange(num_blocks * rows_per_block * 3, dtype=np.float64) \
+        .reshape((-1, 3))
+    return [rows[i:i + rows_per_block]
+            for i in range(0, len(rows), rows_per_block)]
+
+
+class SlowWriter(BackgroundWriter):
+    """
+    A writer that counts the rows it is given, slower than they arrive.
+    """
+
+    def _open_file(self, metadata) -> None:
+        self.rows_written = 0
+
+    def _write_rows(self, rows) -> None:
+        time.sleep(0.01)
+        self.rows_written += len(rows)
+
+    def _close_file(self) -> None:
+        pass
+
+
+@pytest.mark.parametrize("policy", ["block", "drop", "raise"])
+def test_background_writer_bounded(metadata, policy):
+    # Each block fills a 240 KB staging buffer, so an unbounded writer
+    # would hold about 12 MB by the end.
+    block = np.zeros((10000, 3))
+    writer = SlowWriter(chunk_rows=10000, max_buffers=4,
+                        overflow_policy=policy)
+    writer.open(metadata)
+
+    tracemalloc.start()
+    try:
+        if policy == "raise":
+            with pytest.raises(RuntimeError):
+                for i in range(50):
+                    writer.write_block(block, i * 10000)
+        else:
+            for i in range(50):
+                writer.write_block(block, i * 10000)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    writer.close()
+
+    assert writer._num_buffers <= 4
+    assert peak < 4 * block.nbytes
+    if policy == "block":
+        assert writer.rows_written == 50 * 10000
+        assert writer.dropped_rows == 0
+    elif policy == "drop":
+        assert writer.dropped_rows > 0
+        assert writer.rows_written + writer.dropped_rows == 50 * 10000
+
+    with pytest.raises(ValueError):
+        SlowWriter(max_buffers=1)
+    with pytest.raises(ValueError):
+        SlowWriter(overflow_policy="wait")
+
+
+def test_hdf5_writer(tmp_path, metadata):
+    h5py = pytest.importorskip("h5py")
+    path = str(tmp_path / "run.h5")
+
+    # Blocks that do not line up with chunks still all get written.
+    blocks = make_blocks(30, 7)
+    writer = HDF5Writer(path, chunk_rows=16)
+    writer.open(metadata)
+    for i, block in enumerate(blocks):
+        writer.write_block(block, i * 7)
+    writer.close()
+
+    with h5py.File(path, "r") as f:
+        assert np.array_equal(f["data"][:], np.concatenate(blocks))
+        assert f["data"].attrs["scan_rate"] == 100.0
+        assert list(f["data"].attrs["columns"]) == metadata["columns"]
+
+
+def test_csv_writer(tmp_path, metadata):
+    path = str(tmp_path / "run.csv")
+    blocks = make_blocks(30, 7)
+    blocks[0][2, 0] = -9999.0
+
+    writer = CSVWriter(path, thresholds={"AIN0": 100.0}, chunk_rows=16)
+    writer.open(metadata)
+    for i, block in enumerate(blocks):
+        writer.write_block(block, i * 7)
+    writer.close()
+
+    expected = np.concatenate(blocks)
+    skipped = expected[:, 0] == -9999.0
+    expected[~skipped, 0] = expected[~skipped, 0] > 100.0
+
+    with open(path) as file:
+        assert file.readline().strip() == "AIN0,Time,System Time"
+    assert np.array_equal(np.loadtxt(path, delimiter=",", skiprows=1),
+                          expected)
+
+    with pytest.raises(ValueError):
+        CSVWriter(path, thresholds={"AIN1": 1.0}).open(metadata)
@@ -0,0 +1,181 @@
+import pytest
+import multiprocessing
+import os
+import sys
+import numpy as np
+from labjackcontroller import storage
+from labjackcontroller.storage import EnvelopePyramid, GapIndex, HostClock, \
+    SampleBuffer
+
+
+def test_gap_index():
+    gaps = GapIndex()
+    assert gaps.add(0, np.array([0, 1, 1, 0, 0, 1], dtype=bool),
+                    np.arange(6.0)) == 3
+    # A gap running into the next block is continued, not duplicated.
+    assert gaps.add(6, np.array([1, 1, 0, 1], dtype=bool),
+                    np.arange(6.0, 10.0)) == 3
+
+    assert gaps.to_array().tolist() == [(1, 2, 1.0), (5, 3, 5.0),
+                                        (9, 1, 9.0)]
+    assert gaps.num_skipped == 6
+
+
+def test_sample_buffer_gaps(tmp_path):
+    path = str(tmp_path / "run.buf")
+    values = np.ones((10, 2))
+    values[4:7] = -9999.0
+
+    buffer = SampleBuffer.create_mmap(path, 100, 4)
+    for _ in range(3):
+        buffer.write(values, np.arange(10.0), 0.0)
+    buffer.flush()
+
+    assert buffer.gaps.to_array()["start_row"].tolist() == [4, 14, 24]
+    assert buffer.gaps.num_skipped == 9
+
+    # Gaps are saved alongside a memory-mapped file.
+    assert len(SampleBuffer.open_mmap(path).gaps) == 3
+
+
+def test_host_clock():
+    clock = HostClock(1000.0)
+    # Before any packet arrives, the nominal scan rate is used.
+    assert clock.slope == pytest.approx(0.001)
+
+    # Packets of 100 scans, by a host clock running 100 ppm fast, arriving
+    # 5 ms late give or take 0.1 ms.
+    jitter = np.random.RandomState(0).uniform(-0.0001, 0.0001, 200)
+    for packet in range(200):
+        last_scan = 100 * packet + 99
+        clock.add(last_scan, last_scan * 0.0010001 + 0.005 + jitter[packet])
+
+    assert clock.slope == pytest.approx(0.0010001, rel=1e-6)
+    assert clock.predict(0, 3) == pytest.approx(
+        [0.005, 0.0060001, 0.0070002], abs=1e-4)
+
+
+def test_host_clock_stamp():
+    # Packets of 100 scans at 10 kHz, arriving 1 to 5 ms late. Refitting at
+    # every arrival moves the line, but stamped times never step back.
+    clock = HostClock(10000.0)
+    delays = np.random.RandomState(0).uniform(0.001, 0.005, 2000)
+    times = []
+    for packet in range(2000):
+        first_scan = 100 * packet
+        clock.add(first_scan + 99, (first_scan + 99) / 10000.0
+                  + delays[packet])
+        times.append(clock.stamp(first_scan, 100))
+    times = np.concatenate(times)
+
+    assert np.all(np.diff(times) > 0)
+    assert times[-1] == pytest.approx(clock.predict(199999, 1)[0], abs=0.005)
+
+
+def test_sample_buffer_host_clock():
+    clock = HostClock(100.0)
+    buffer = SampleBuffer(10, 3, ring=True, host_clock=clock)
+    assert buffer.width == 3
+    assert buffer.nbytes == 10 * 2 * 8
+
+    buffer.write(np.ones((15, 1)), np.arange(15.0), 0.0)
+    rows = buffer.view(5, 15)
+    assert rows.shape == (10, 3)
+    assert np.allclose(rows[:, -1], np.arange(5, 15) / 100.0)
+
+
+def test_envelope_pyramid():
+    data = np.random.RandomState(0).normal(size=(10005, 2))
+    data[100:200] = -9999.0
+
+    pyramid = EnvelopePyramid(2, 100.0, bin_rows=10, factor=2)
+    # Blocks that do not line up with bins are summarised all the same.
+    for start in range(0, len(data), 333):
+        pyramid.add(data[start:start + 333])
+    assert pyramid.rows_added == len(data)
+
+    # Every bin but the last of a span of 50 seconds at 100 points.
+    envelope = pyramid.query(1, 0, 50, max_points=100)
+    assert 50 <= len(envelope.time) <= 100
+    starts = np.round(envelope.time * 100).astype(int)
+    for start, end, low, high, mean in zip(starts, starts[1:], *envelope[1:]):
+        values = data[start:end, 1]
+        values = values[values != -9999.0]
+        assert low == values.min() and high == values.max()
+        assert mean == pytest.approx(values.mean())
+
+    # Bins of nothing but skipped scans are NaN.
+    envelope = pyramid.query(0, 1.0, 1.99, max_points=1000)
+    assert len(envelope.time) == 10
+    assert np.all(np.isnan(envelope.mean))
+
+    # The latest scans are included before they fill a bin.
+    envelope = pyramid.query(0, 100.0, 100.04)
+    assert envelope.time.tolist() == [100.0]
+    assert envelope.max[0] == data[-5:, 0].max()
+
+    assert len(pyramid.query(0, 200, 300).time) == 0
+
+
+def _read_shared(name: str) -> list:
+    buffer = SampleBuffer.open_shm(name)
+    return buffer.view(0, buffer.rows_written)[:, 0].tolist()
+
+
+def test_sample_buffer_shm():
+    name = "ljc_test_%d" % os.getpid()
+    buffer = SampleBuffer.create_shm(name, 10, 3, ring=True,
+                                     channels=["AIN0"], scan_rate=10.0)
+    buffer.write(np.arange(4.0)[:, np.newaxis], np.arange(4) / 10.0, 0.0)
+
+    # Another process sees the rows written, and what it opens is read-only.
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(1) as pool:
+        assert pool.apply(_read_shared, (name,)) == [0.0, 1.0, 2.0, 3.0]
+    opened = SampleBuffer.open_shm(name)
+    assert opened.channels == ["AIN0"] and opened.scan_rate == 10.0
+    buffer.write(np.ones((1, 1)), np.zeros(1), 0.0)
+    assert opened.rows_written == 5
+    with pytest.raises(ValueError):
+        opened.write(np.ones((1, 1)), np.zeros(1), 0.0)
+
+    # Creating a buffer of the same name replaces it.
+    replaced = SampleBuffer.create_shm(name, 5, 3)
+    assert SampleBuffer.open_shm(name).capacity == 5
+    assert buffer.view(0, 5)[:, 0].tolist() == [0.0, 1.0, 2.0, 3.0, 1.0]
+
+    # The name is released once the buffer is freed.
+    del replaced
+    with pytest.raises(FileNotFoundError):
+        SampleBuffer.open_shm(name)
+
+
+def test_sample_buffer_shm_tracking(monkeypatch):
+    resource_tracker = pytest.importorskip("multiprocessing.resource_tracker")
+    name = "ljc_test_%d" % os.getpid()
+    buffer = SampleBuffer.create_shm(name, 10, 3)
+
+    calls = []
+    for method in ("register", "unregister"):
+        original = getattr(resource_tracker, method)
+        monkeypatch.setattr(resource_tracker, method,
+                            lambda name, rtype, method=method,
+                            original=original:
+                            (calls.append(method), original(name, rtype)))
+
+    # Opening a segment leaves it registered only to the process that
+    # created it. Before Python 3.13, that takes undoing its registration.
+    SampleBuffer.open_shm(name)
+    assert calls == ([] if sys.version_info >= (3, 13)
+                     else ["register", "unregister"])
+    del buffer
+
+
+def test_sample_buffer_shm_unavailable(monkeypatch, tmp_path):
+    # Without shared memory, as before Python 3.8, other storage works.
+    monkeypatch.setattr(storage, "shared_memory", None)
+    with pytest.raises(ImportError):
+        SampleBuffer.create_shm("ljc_test_%d" % os.getpid(), 10, 3)
+    with pytest.raises(ImportError):
+        SampleBuffer.open_shm("ljc_test_%d" % os.getpid())
+    SampleBuffer.create_mmap(str(tmp_path / "run.buf"), 10, 3)
@@ -0,0 +1,43 @@
+import os
+import numpy as np
+from labjackcontroller.tail import CSVTailReader
+
+
+def test_csv_tail_reader(tmp_path):
+    path = str(tmp_path / "run.csv")
+    tail = CSVTailReader(path)
+
+    # Nothing is read before the file exists.
+    rows, restarted = tail.read()
+    assert rows.shape == (0, 0) and not restarted
+
+    with open(path, "w") as file:
+        file.write("AIN0,Time\n1.5,0.0\n2.5,0.")
+    rows, restarted = tail.read()
+    assert tail.columns == ["AIN0", "Time"]
+    assert rows.tolist() == [[1.5, 0.0]] and not restarted
+
+    # A line is only read once complete.
+    with open(path, "a") as file:
+        file.write("1\n3.5,0.2\n")
+    rows, restarted = tail.read()
+    assert rows.tolist() == [[2.5, 0.1], [3.5, 0.2]] and not restarted
+    assert tail.read()[0].shape == (0, 2)
+    assert tail.rows_read == 3
+
+    # Rewriting the file in place, as DataFrame.to_csv does, starts over.
+    with open(path, "w") as file:
+        file.write("AIN0,Time\n9.0,0.0\n8.0,0.1\n7.0,0.2\n")
+    rows, restarted = tail.read()
+    assert rows.tolist() == [[9.0, 0.0], [8.0, 0.1], [7.0, 0.2]]
+    assert restarted
+
+    # As does truncating it, or replacing it with another file.
+    with open(path, "w") as file:
+        file.write("AIN1,Time\n")
+    rows, restarted = tail.read()
+    assert rows.shape == (0, 2) and restarted
+    assert tail.columns == ["AIN1", "Time"]
+
+    os.remove(path)
+    assert tail.read()[1]
@@ -0,0 +1,40 @@
+import pytest
+import numpy as np
+from labjackcontroller.storage import SampleBuffer
+from labjackcontroller.viewer import LiveViewer
+
+
+def test_live_viewer_poll(tmp_path):
+    storage = "mmap:" + str(tmp_path / "run.buf")
+    buffer = SampleBuffer.create_mmap(storage[len("mmap:"):], 100, 4,
+                                      ring=True, channels=["AIN0", "AIN1"],
+                                      scan_rate=100.0)
+    values = np.arange(60.0).reshape(30, 2)
+    values[12:14] = -9999.0
+    buffer.write(values, np.arange(30) / 100.0, 0.0)
+    buffer.flush()
+
+    viewer = LiveViewer(storage, channels=["AIN1"], points_per_second=25,
+                        rollover=5)
+    assert viewer.bin_rows == 4
+    assert viewer.fields == ["time", "AIN1_min", "AIN1_max", "AIN1_mean"]
+
+    # Only whole bins are plotted, and skipped scans are left out.
+    data, cursor = viewer.poll(0)
+    assert cursor == 28
+    assert data["time"].tolist() == pytest.approx(
+        [0.0, 0.04, 0.08, 0.12, 0.16, 0.2, 0.24])
+    assert data["AIN1_min"][:2].tolist() == [1.0, 9.0]
+    assert data["AIN1_max"][3] == 31.0
+    assert data["AIN1_mean"][3] == 30.0
+    assert viewer.poll(cursor) == (None, 28)
+
+    # Rows a ring buffer overwrote are skipped.
+    buffer.write(np.ones((200, 2)), np.arange(30, 230) / 100.0, 0.0)
+    data, cursor = viewer.poll(cursor)
+    assert data["time"][0] == pytest.approx(1.3)
+    assert cursor == 230
+    assert viewer.latest_cursor() == 210
+
+    with pytest.raises(ValueError):
+        LiveViewer(storage, channels=["AIN2"])